@@ -7,19 +7,28 @@
 # - Auto-retry on timeout or rate-limit
 # - Graceful empty-response handling
 # - Detailed logging
+# - Optional streaming with early cut-off at [CMD_END]
+# - Lazy imports and cached key verification for fast start-up
 
 import os
 import re
 import time
-import httpx
-from typing import List, Dict, Any, Optional
-from openai import OpenAI
+from typing import List, Dict, Any
 
-client: Optional[OpenAI] = None
+import key_cache
 
+# openai and httpx are imported on first use; they dominate start-up time.
+client = None  # openai.OpenAI once initialize_client() succeeded
+last_error = ""  # why the last initialize_client() failed
+last_call = {}  # token usage, timing and retries of the most recent request (read by metrics.py)
 
-def _make_httpx_client(timeout_seconds=300):
+BASE_URL = os.environ.get("OPENAI_BASE_URL", "https://api.openai.com/v1")
+DEFAULT_MODEL = os.environ.get("OPENAI_CHAT_MODEL", "gpt-5")  # used when no model_name is passed
+
+
+def _make_httpx_client(timeout_seconds=300, quiet=False):
     """Create httpx.Client with proxy support and extended timeout."""
+    import httpx
     proxy = (
         os.environ.get("https_proxy")
         or os.environ.get("HTTPS_PROXY")
@@ -27,29 +36,40 @@ def _make_httpx_client(timeout_seconds=300):
         or os.environ.get("HTTP_PROXY")
     )
     if proxy:
-        print(f"[INFO] Proxy detected: {proxy}")
+        if not quiet:
+            print(f"[INFO] Proxy detected: {proxy}")
         return httpx.Client(proxies=proxy, timeout=timeout_seconds)
     return httpx.Client(timeout=timeout_seconds)
 
 
-def initialize_client(api_key: str) -> bool:
-    """Initialize OpenAI client with provided key."""
-    global client
+def initialize_client(api_key: str, verify: bool = True, quiet: bool = False) -> bool:
+    """Initialize OpenAI client with provided key (verification is cached, see key_cache.py)."""
+    global client, last_error
+    say = (lambda *a: None) if quiet else print
 
     if not api_key.strip():
-        print("[ERROR] API key is missing.")
+        last_error = "API key is missing."
+        say(f"[ERROR] {last_error}")
         return False
 
     try:
-        http_client = _make_httpx_client()
-        base_url = os.environ.get("OPENAI_BASE_URL", "https://api.openai.com/v1")
+        from openai import OpenAI
 
-        client = OpenAI(api_key=api_key, base_url=base_url, http_client=http_client)
+        http_client = _make_httpx_client(quiet=quiet)
+        client = OpenAI(api_key=api_key, base_url=BASE_URL, http_client=http_client)
+        if not verify:
+            say("[INFO] OpenAI client initialized (key verification skipped).")
+            return True
+        if key_cache.is_verified(api_key, BASE_URL):
+            say("[SUCCESS] OpenAI client initialized (key verified recently).")
+            return True
         client.models.list()  # Sanity check
-        print("[SUCCESS] OpenAI client initialized and key verified.")
+        key_cache.remember(api_key, BASE_URL)
+        say("[SUCCESS] OpenAI client initialized and key verified.")
         return True
     except Exception as e:
-        print(f"[ERROR] Failed to initialize OpenAI client: {e}")
+        last_error = f"Failed to initialize OpenAI client: {e}"
+        say(f"[ERROR] {last_error}")
         client = None
         return False
 
@@ -72,12 +92,9 @@ def _sanitize_history(history: List[Dict[str, Any]]) -> List[Dict[str, str]]:
     return sanitized
 
 
-def get_ai_response_with_history(system_prompt: str, history: list, model_name: str = None) -> str:
-    """Send conversation to OpenAI and return the assistant's reply."""
-    if not client:
-        return "[ERROR] OpenAI client not initialized."
-
-    model = model_name or os.environ.get("OPENAI_CHAT_MODEL", "gpt-5")
+def _build_params(system_prompt: str, history: list, model_name: str = None) -> Dict[str, Any]:
+    """Assemble chat.completions parameters for the selected model."""
+    model = model_name or DEFAULT_MODEL
     messages = [{"role": "system", "content": system_prompt}]
     messages += _sanitize_history(history)
 
@@ -91,54 +108,194 @@ def get_ai_response_with_history(system_prompt: str, history: list, model_name:
             params["temperature"] = float(os.environ.get("OPENAI_TEMPERATURE", "0.7"))
         except ValueError:
             params["temperature"] = 0.7
+    return params
 
-    def _try_request(p: Dict[str, Any], retry_on_timeout=True, retry_on_rate=True):
-        try:
-            return client.chat.completions.create(**p)
-        except httpx.ReadTimeout:
-            if retry_on_timeout:
-                print("[WARN] Request timed out, retrying once...")
-                return _try_request(p, retry_on_timeout=False, retry_on_rate=retry_on_rate)
-            print("[ERROR] Request timed out.")
-            return None
-        except Exception as e:
-            msg = str(e)
-
-            # --- Handle rate limits ---
-            if "rate_limit_exceeded" in msg:
-                if retry_on_rate:
-                    wait_time = 10  # default
-                    m = re.search(r"try again in ([0-9.]+)s", msg)
-                    if m:
-                        wait_time = float(m.group(1)) + 0.5
-                    print(f"[WARN] Rate limit hit, waiting {wait_time:.1f}s before retry...")
-                    time.sleep(wait_time)
-                    return _try_request(p, retry_on_timeout=retry_on_timeout, retry_on_rate=False)
-                print("[ERROR] Rate limit hit again, aborting.")
-                return None
-
-            # --- Param auto-fix ---
-            if "max_tokens" in msg and "Unsupported" in msg:
-                p.pop("max_tokens", None)
-                p["max_completion_tokens"] = 8192
-                print("[WARN] Switched to max_completion_tokens.")
-                return _try_request(p, retry_on_timeout, retry_on_rate)
-            if "max_completion_tokens" in msg and "Unsupported" in msg:
-                p.pop("max_completion_tokens", None)
-                p["max_tokens"] = 8192
-                print("[WARN] Switched to max_tokens.")
-                return _try_request(p, retry_on_timeout, retry_on_rate)
-            if "temperature" in msg and "Unsupported" in msg:
-                p.pop("temperature", None)
-                print("[WARN] Removed temperature param.")
-                return _try_request(p, retry_on_timeout, retry_on_rate)
-
-            print(f"[ERROR] API call failed: {msg}")
+
+def _try_request(p: Dict[str, Any], retry_on_timeout=True, retry_on_rate=True):
+    """Call the API, retrying on timeouts/rate limits and auto-fixing unsupported params."""
+    import httpx
+    try:
+        return client.chat.completions.create(**p)
+    except httpx.ReadTimeout:
+        if retry_on_timeout:
+            print("[WARN] Request timed out, retrying once...")
+            last_call["retries"] = last_call.get("retries", 0) + 1
+            return _try_request(p, retry_on_timeout=False, retry_on_rate=retry_on_rate)
+        print("[ERROR] Request timed out.")
+        return None
+    except Exception as e:
+        msg = str(e)
+
+        # --- Handle rate limits ---
+        if "rate_limit_exceeded" in msg:
+            if retry_on_rate:
+                wait_time = 10  # default
+                m = re.search(r"try again in ([0-9.]+)s", msg)
+                if m:
+                    wait_time = float(m.group(1)) + 0.5
+                print(f"[WARN] Rate limit hit, waiting {wait_time:.1f}s before retry...")
+                time.sleep(wait_time)
+                last_call["retries"] = last_call.get("retries", 0) + 1
+                return _try_request(p, retry_on_timeout=retry_on_timeout, retry_on_rate=False)
+            print("[ERROR] Rate limit hit again, aborting.")
             return None
 
+        # --- Param auto-fix ---
+        if "max_tokens" in msg and "Unsupported" in msg:
+            p.pop("max_tokens", None)
+            p["max_completion_tokens"] = 8192
+            print("[WARN] Switched to max_completion_tokens.")
+            last_call["retries"] = last_call.get("retries", 0) + 1
+            return _try_request(p, retry_on_timeout, retry_on_rate)
+        if "max_completion_tokens" in msg and "Unsupported" in msg:
+            p.pop("max_completion_tokens", None)
+            p["max_tokens"] = 8192
+            print("[WARN] Switched to max_tokens.")
+            last_call["retries"] = last_call.get("retries", 0) + 1
+            return _try_request(p, retry_on_timeout, retry_on_rate)
+        if "temperature" in msg and "Unsupported" in msg:
+            p.pop("temperature", None)
+            print("[WARN] Removed temperature param.")
+            last_call["retries"] = last_call.get("retries", 0) + 1
+            return _try_request(p, retry_on_timeout, retry_on_rate)
+        if "stream_options" in msg and "stream_options" in p:
+            p.pop("stream_options", None)
+            last_call["retries"] = last_call.get("retries", 0) + 1
+            return _try_request(p, retry_on_timeout, retry_on_rate)
+        # Streaming needs a verified organization for some models; fall back to a plain request
+        if p.get("stream") and "stream" in msg:
+            p.pop("stream", None)
+            print("[WARN] Streaming not available, falling back to a blocking request.")
+            last_call["retries"] = last_call.get("retries", 0) + 1
+            return _try_request(p, retry_on_timeout, retry_on_rate)
+
+        print(f"[ERROR] API call failed: {msg}")
+        return None
+
+
+# Command block markers, mirrored from cli_tool.py.
+START_MARKER = "[CMD_START]"
+END_MARKER = "[CMD_END]"
+# A parallel batch ([PARALLEL_START] ... several commands ... [PARALLEL_END]) ends at its own marker
+PARALLEL_START = "[PARALLEL_START]"
+PARALLEL_END = "[PARALLEL_END]"
+
+
+def _until_command_end(pieces):
+    """Pass chunks through until the first [CMD_END] after a [CMD_START] (or [PARALLEL_END]), then stop."""
+    received = ""
+    start_index = -1
+    end_marker = END_MARKER
+    for piece in pieces:
+        if not piece:
+            continue
+        # Only rescan the tail that may hold a marker split across chunks
+        search_from = len(received)
+        received += piece
+        if start_index == -1:
+            start_index = received.find(START_MARKER, max(0, search_from - len(START_MARKER)))
+            if start_index != -1:
+                end_marker = PARALLEL_END if PARALLEL_START in received[:start_index] else END_MARKER
+        if start_index != -1:
+            end_index = received.find(end_marker, max(search_from - len(end_marker), start_index + len(START_MARKER)))
+            if end_index != -1:
+                cut = end_index + len(end_marker)
+                yield piece[:len(piece) - (len(received) - cut)]
+                return
+        yield piece
+
+
+def _begin_call(model: str, streamed: bool) -> float:
+    """Reset last_call for a new request and return its start time."""
+    global last_call
+    last_call = {"model": model, "stream": streamed, "retries": 0, "ttft_s": None,
+                 "latency_s": None, "prompt_tokens": None, "completion_tokens": None, "error": ""}
+    return time.perf_counter()
+
+
+def _record_usage(usage):
+    if usage is not None:
+        last_call["prompt_tokens"] = getattr(usage, "prompt_tokens", None)
+        last_call["completion_tokens"] = getattr(usage, "completion_tokens", None)
+
+
+def _chunk_texts(resp):
+    """Text deltas of a stream; the usage-only final chunk is recorded in last_call."""
+    for chunk in resp:
+        _record_usage(getattr(chunk, "usage", None))
+        if chunk.choices:
+            yield chunk.choices[0].delta.content
+
+
+def stream_ai_response_with_history(system_prompt: str, history: list, model_name: str = None,
+                                    stop_at_command_end: bool = True):
+    """Stream the assistant's reply chunk by chunk, aborting after the first command block."""
+    if not client:
+        yield "[ERROR] OpenAI client not initialized."
+        return
+
+    import httpx
+    params = _build_params(system_prompt, history, model_name)
+    params["stream"] = True
+    params["stream_options"] = {"include_usage": True}
+
+    started = _begin_call(params["model"], True)
+    resp = _try_request(params)
+    if not resp:
+        last_call["latency_s"] = time.perf_counter() - started
+        last_call["error"] = "API call failed"
+        yield "[ERROR] API call failed."
+        return
+
+    # Blocking fallback (streaming was refused): hand over the whole reply at once
+    if not params.get("stream"):
+        _record_usage(getattr(resp, "usage", None))
+        try:
+            content = resp.choices[0].message.content or ""
+        except Exception:
+            content = ""
+        pieces = iter([content])
+    else:
+        pieces = _chunk_texts(resp)
+
+    try:
+        if stop_at_command_end:
+            pieces = _until_command_end(pieces)
+        for piece in pieces:
+            if piece:
+                if last_call["ttft_s"] is None:
+                    last_call["ttft_s"] = time.perf_counter() - started
+                yield piece
+    except httpx.HTTPError as e:
+        last_call["error"] = str(e)
+        print(f"[ERROR] Stream interrupted: {e}")
+    finally:
+        # Dropping the connection stops generation server-side
+        if params.get("stream"):
+            resp.close()
+        last_call["latency_s"] = time.perf_counter() - started
+
+
+def get_ai_response_with_history(system_prompt: str, history: list, model_name: str = None,
+                                 stream: bool = False) -> str:
+    """Send conversation to OpenAI and return the assistant's reply."""
+    if not client:
+        return "[ERROR] OpenAI client not initialized."
+
+    if stream:
+        content = "".join(stream_ai_response_with_history(system_prompt, history, model_name))
+        if not content.strip():
+            return "[ERROR] Empty response from model."
+        return content.strip()
+
+    params = _build_params(system_prompt, history, model_name)
+    started = _begin_call(params["model"], False)
     resp = _try_request(params)
+    last_call["latency_s"] = time.perf_counter() - started
     if not resp:
+        last_call["error"] = "API call failed"
         return "[ERROR] API call failed."
+    _record_usage(getattr(resp, "usage", None))
 
     try:
         content = resp.choices[0].message.content
@@ -0,0 +1,201 @@
+# MIT License - Copyright (c) 2025 Viktor Kirschner
+"""
+End-to-end benchmark of the agent loop.
+
+Each scenario is a goal plus the scripted model replies for it. The replies are served
+by stub_llm_server.py, and cli_tool.main() runs for real in a scratch workspace: commands
+are parsed, handlers executed, log.html written and memory saved. The report shows where
+the time that is not spent waiting for the model goes.
+
+Usage: python agent_bench.py [scenario.json ...] [--latency=0.0] [--repeat=1]
+
+A scenario file is JSON: {"name": ..., "goal": ..., "responses": [...], "files": {path: text}}.
+Without scenario files the built-in DEFAULT_SCENARIOS are used. Each scenario runs in its
+own Python process so module state never leaks between runs.
+"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import subprocess
+from pathlib import Path
+
+SOURCE_DIR = Path(__file__).parent.resolve()
+
+DEFAULT_SCENARIOS = [
+    {
+        "name": "explore-and-write",
+        "goal": "Look around the handlers and write a short notes file.",
+        "responses": [
+            "Let me look at the tools. [CMD_START]list_contents handlers[CMD_END]",
+            "Reading one of them. [CMD_START]read_file handlers/read_file.py --max-lines=40[CMD_END]",
+            "And another. [CMD_START]read_file handlers/list_contents.py[CMD_END]",
+            "[CMD_START]create_file_begin \"notes/handlers.txt\"[CMD_END]",
+            "read_file: shows text files\nlist_contents: lists directories\n",
+            "Checking the result. [CMD_START]read_file notes/handlers.txt[CMD_END]",
+            "[CMD_START]task_complete \"Notes written to notes/handlers.txt.\"[CMD_END]",
+            "Goal: write notes about handlers. Steps: listed and read handlers, wrote notes/handlers.txt.",
+        ],
+    },
+    {
+        "name": "many-small-tool-calls",
+        "goal": "List the workspace twenty times.",
+        "responses": ["[CMD_START]list_contents .[CMD_END]"] * 20 + [
+            "[CMD_START]task_complete \"Done listing.\"[CMD_END]",
+            "Goal: list the workspace repeatedly. Outcome: done.",
+        ],
+    },
+]
+
+
+class _Timer:
+    """Accumulates wall time spent in wrapped functions."""
+
+    def __init__(self):
+        self.total = 0.0
+        self.calls = 0
+        self.first_call_at = None
+
+    def wrap(self, fn):
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            if self.first_call_at is None:
+                self.first_call_at = started
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.total += time.perf_counter() - started
+                self.calls += 1
+        return timed
+
+
+def _peak_rss_kb():
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak // 1024 if sys.platform == "darwin" else peak  # macOS reports bytes
+    except ImportError:
+        return None  # not available on Windows
+
+
+def run_scenario_in_process(scenario: dict, latency: float) -> dict:
+    """Runs one scenario through cli_tool.main() in the current process (cwd = workspace)."""
+    from stub_llm_server import StubLLMServer
+
+    server = StubLLMServer(scenario["responses"], latency=latency).start()
+    os.environ["MOONSHOT_BASE_URL"] = server.base_url
+    os.environ.setdefault("MOONSHOT_API_KEY", "agent-bench")
+    os.environ["SEEDLING_FAST_START"] = "0"
+    os.environ["SEEDLING_SKIP_VERIFY"] = "1"
+    for proxy_var in ("https_proxy", "HTTPS_PROXY", "http_proxy", "HTTP_PROXY"):
+        os.environ.pop(proxy_var, None)
+
+    # cli_tool reconfigures stdout on import, so the capture has to be a real text wrapper
+    console = io.TextIOWrapper(io.BytesIO(), encoding='utf-8')
+    real_stdout = sys.stdout
+    sys.stdout = console
+    try:
+        import cli_tool
+
+        llm, tools, logging = _Timer(), _Timer(), _Timer()
+        cli_tool.get_ai_response_with_history = llm.wrap(cli_tool.get_ai_response_with_history)
+        cli_tool.execute_command = tools.wrap(cli_tool.execute_command)
+        cli_tool.log_and_print = logging.wrap(cli_tool.log_and_print)
+        cli_tool.log_message = logging.wrap(cli_tool.log_message)
+        # First prompt gets the goal, every later prompt ends the session
+        answers = iter([scenario["goal"]])
+        cli_tool.input = lambda *a: next(answers, "exit")
+
+        started = time.perf_counter()
+        cli_tool.main()
+        cli_tool._html_log.flush()
+        finished = time.perf_counter()
+        console.flush()
+    finally:
+        sys.stdout = real_stdout
+        server.stop()
+
+    # Start-up (imports, client set-up) is reported separately from the per-step cost
+    loop_started = llm.first_call_at or finished
+    steps = max(1, llm.calls)
+    return {
+        "scenario": scenario["name"],
+        "steps": llm.calls,
+        "startup_s": loop_started - started,
+        "wall_s": finished - loop_started,
+        "llm_s": llm.total,
+        "tool_s": tools.total,
+        "tool_calls": tools.calls,
+        "log_s": logging.total,
+        "overhead_per_step_ms": (finished - loop_started - llm.total - tools.total) / steps * 1000,
+        "peak_rss_kb": _peak_rss_kb(),
+        "console_bytes": console.buffer.tell(),
+    }
+
+
+def run_scenario(scenario: dict, latency: float) -> dict:
+    """Runs a scenario in a fresh interpreter and scratch workspace."""
+    workspace = tempfile.mkdtemp(prefix="seedling_bench_")
+    try:
+        shutil.copytree(SOURCE_DIR / "handlers", Path(workspace) / "handlers",
+                        ignore=shutil.ignore_patterns("__pycache__"))
+        shutil.copy2(SOURCE_DIR / "priming_prompt.txt", workspace)
+        for rel_path, text in scenario.get("files", {}).items():
+            target = Path(workspace) / rel_path
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_text(text, encoding='utf-8')
+        scenario_file = Path(workspace) / "_scenario.json"
+        scenario_file.write_text(json.dumps(scenario), encoding='utf-8')
+
+        env = dict(os.environ, PYTHONIOENCODING="utf-8", PYTHONPATH=str(SOURCE_DIR))
+        result = subprocess.run(
+            [sys.executable, str(SOURCE_DIR / "agent_bench.py"), "--child", str(scenario_file), f"--latency={latency}"],
+            cwd=workspace, env=env, capture_output=True, text=True, encoding='utf-8', timeout=600
+        )
+        lines = [l for l in result.stdout.splitlines() if l.startswith("{")]
+        if result.returncode != 0 or not lines:
+            raise RuntimeError(f"Scenario '{scenario['name']}' failed:\n{result.stdout}\n{result.stderr}")
+        return json.loads(lines[-1])
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
+
+
+def print_report(results: list):
+    header = f"{'scenario':<24}{'steps':>6}{'start s':>9}{'loop s':>9}{'llm s':>8}{'tool s':>8}{'log s':>8}{'ovh/step ms':>13}{'peak RSS MB':>13}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        rss = f"{r['peak_rss_kb'] / 1024:.1f}" if r["peak_rss_kb"] else "n/a"
+        print(f"{r['scenario']:<24}{r['steps']:>6}{r['startup_s']:>9.3f}{r['wall_s']:>9.3f}{r['llm_s']:>8.3f}{r['tool_s']:>8.3f}"
+              f"{r['log_s']:>8.3f}{r['overhead_per_step_ms']:>13.2f}{rss:>13}")
+
+
+def main():
+    options = dict(a[2:].split("=", 1) for a in sys.argv[1:] if a.startswith("--") and "=" in a)
+    latency = float(options.get("latency", 0.0))
+    paths = [a for a in sys.argv[1:] if not a.startswith("--")]
+
+    if "--child" in sys.argv[1:]:
+        with open(paths[0], 'r', encoding='utf-8') as f:
+            scenario = json.load(f)
+        print(json.dumps(run_scenario_in_process(scenario, latency)))
+        return
+
+    scenarios = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            scenarios.append(json.load(f))
+    scenarios = scenarios or DEFAULT_SCENARIOS
+
+    results = []
+    for _ in range(int(options.get("repeat", 1))):
+        for scenario in scenarios:
+            results.append(run_scenario(scenario, latency))
+    print_report(results)
+
+
+if __name__ == "__main__":
+    main()
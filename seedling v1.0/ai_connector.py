@@ -1,30 +1,46 @@
 # MIT License - Copyright (c) 2025 Viktor Kirschner
 import os
-from openai import OpenAI  # This is Moonshot's client
-import httpx
+import time
+import key_cache
+# openai and httpx are imported lazily in initialize_client(): they are the slowest
+# part of starting Seedling and are not needed until the first API call.
+
+BASE_URL = os.environ.get("MOONSHOT_BASE_URL", "https://api.moonshot.ai/v1")
+DEFAULT_MODEL = "kimi-k2-turbo-preview"
 
 # The client will be initialized by the main script.
 client = None
+# Why the last initialize_client() call failed (for quiet/background initialization)
+last_error = ""
+# Token usage and timing of the most recent request (read by metrics.py)
+last_call = {}
 
-def initialize_client(api_key: str):
+def initialize_client(api_key: str, verify: bool = True, quiet: bool = False):
     """
     Initializes the Moonshot client with a provided API key, verifies it,
     and automatically handles system proxy settings.
+    A key that was verified recently (see key_cache.py) is not verified again;
+    verify=False skips the check altogether.
     Returns True on success, False on failure.
     """
-    global client
+    global client, last_error
+    say = (lambda *a: None) if quiet else print
     if not api_key or not api_key.strip():
-        print("\n[ERROR] API key is missing. Cannot initialize Moonshot client.")
+        last_error = "API key is missing. Cannot initialize Moonshot client."
+        say(f"\n[ERROR] {last_error}")
         client = None
         return False
 
     try:
+        from openai import OpenAI  # This is Moonshot's client
+        import httpx
+
         # Check for system proxy settings
         proxy_url = os.environ.get('https_proxy') or os.environ.get('HTTPS_PROXY')
 
         # Create an httpx client. If a proxy is found, configure the client to use it.
         if proxy_url:
-            print(f"[INFO] Proxy detected at {proxy_url}. Attempting to connect through it.")
+            say(f"[INFO] Proxy detected at {proxy_url}. Attempting to connect through it.")
             http_client = httpx.Client(proxies=proxy_url)
         else:
             http_client = httpx.Client()
@@ -32,30 +48,148 @@ def initialize_client(api_key: str):
         # Initialize the Moonshot client using base_url
         client = OpenAI(
             api_key=api_key,
-            base_url="https://api.moonshot.ai/v1",
+            base_url=BASE_URL,
             http_client=http_client
         )
 
+        if not verify:
+            say("[INFO] Moonshot client initialized (key verification skipped).")
+            return True
+        if key_cache.is_verified(api_key, BASE_URL):
+            say("[SUCCESS] Moonshot client initialized (key verified recently).")
+            return True
+
         # Sanity check: list models (Moonshot supports it)
         client.models.list()
+        key_cache.remember(api_key, BASE_URL)
 
-        print("[SUCCESS] Moonshot client initialized and key verified.")
+        say("[SUCCESS] Moonshot client initialized and key verified.")
         return True
 
     except Exception as e:
-        print(f"\n[ERROR] Failed to initialize Moonshot client: {e}")
+        last_error = f"Failed to initialize Moonshot client: {e}"
+        say(f"\n[ERROR] {last_error}")
         client = None
         return False
 
-def get_ai_response_with_history(system_prompt: str, history: list, model_name: str = "kimi-k2-turbo-preview") -> str:
+# Command block markers, mirrored from cli_tool.py so a streamed reply can be cut off
+# as soon as the first complete command has arrived.
+START_MARKER = "[CMD_START]"
+END_MARKER = "[CMD_END]"
+# A parallel batch ([PARALLEL_START] ... several commands ... [PARALLEL_END]) ends at its own marker
+PARALLEL_START = "[PARALLEL_START]"
+PARALLEL_END = "[PARALLEL_END]"
+
+def _until_command_end(pieces):
+    """
+    Passes text chunks through until the first [CMD_END] that follows a [CMD_START]
+    (or the [PARALLEL_END] of a parallel batch), trimming the chunk that completes it.
+    Markers split across chunks are handled.
+    """
+    received = ""
+    start_index = -1
+    end_marker = END_MARKER
+    for piece in pieces:
+        if not piece:
+            continue
+        # Only rescan the tail that may hold a marker split across chunks
+        search_from = len(received)
+        received += piece
+        if start_index == -1:
+            start_index = received.find(START_MARKER, max(0, search_from - len(START_MARKER)))
+            if start_index != -1:
+                end_marker = PARALLEL_END if PARALLEL_START in received[:start_index] else END_MARKER
+        if start_index != -1:
+            end_index = received.find(end_marker, max(search_from - len(end_marker), start_index + len(START_MARKER)))
+            if end_index != -1:
+                cut = end_index + len(end_marker)
+                yield piece[:len(piece) - (len(received) - cut)]
+                return
+        yield piece
+
+def _usage_counts(usage):
+    """(prompt_tokens, completion_tokens) from a usage object or dict, or None."""
+    if usage is None:
+        return None
+    get = usage.get if isinstance(usage, dict) else (lambda key: getattr(usage, key, None))
+    if get("prompt_tokens") is None and get("completion_tokens") is None:
+        return None
+    return get("prompt_tokens"), get("completion_tokens")
+
+def _begin_call(model_name: str, streamed: bool) -> float:
+    """Resets last_call for a new request and returns its start time."""
+    global last_call
+    last_call = {"model": model_name, "stream": streamed, "retries": 0, "ttft_s": None,
+                 "latency_s": None, "prompt_tokens": None, "completion_tokens": None, "error": ""}
+    return time.perf_counter()
+
+def _chunk_texts(stream):
+    """Text deltas of a streamed reply; usage, which Moonshot sends with the last chunk, goes to last_call."""
+    for chunk in stream:
+        usage = _usage_counts(getattr(chunk, "usage", None))
+        if usage is None and chunk.choices:
+            usage = _usage_counts(getattr(chunk.choices[0], "usage", None))
+        if usage:
+            last_call["prompt_tokens"], last_call["completion_tokens"] = usage
+        if chunk.choices:
+            yield chunk.choices[0].delta.content
+
+def stream_ai_response_with_history(system_prompt: str, history: list, model_name: str = DEFAULT_MODEL, stop_at_command_end: bool = True):
+    """
+    Streams the Moonshot model's reply, yielding text chunks as they arrive.
+    With stop_at_command_end, the request is aborted right after the first
+    [CMD_START]...[CMD_END] block; the narration after it is never generated.
+    """
+    if not client:
+        yield "[CMD_START]append_log \"[ERROR] Moonshot client not initialized. Cannot get AI response.\"[CMD_END]"
+        return
+
+    messages = [{"role": "system", "content": system_prompt}] + history
+
+    stream = None
+    started = _begin_call(model_name, True)
+    try:
+        stream = client.chat.completions.create(
+            model=model_name,
+            messages=messages,
+            temperature=0.7,
+            max_tokens=8192,
+            stream=True
+        )
+        pieces = _chunk_texts(stream)
+        if stop_at_command_end:
+            pieces = _until_command_end(pieces)
+        for piece in pieces:
+            if piece:
+                if last_call["ttft_s"] is None:
+                    last_call["ttft_s"] = time.perf_counter() - started
+                yield piece
+
+    except Exception as e:
+        error_message = f"[ERROR] An unexpected error occurred during API call: {e}"
+        last_call["error"] = str(e)
+        print(error_message)
+        yield f"An unexpected error occurred. I will log it. [CMD_START]append_log \"{error_message}\"[CMD_END]"
+    finally:
+        # Closing the stream drops the HTTP connection, which stops the generation server-side
+        if stream is not None:
+            stream.close()
+        last_call["latency_s"] = time.perf_counter() - started
+
+def get_ai_response_with_history(system_prompt: str, history: list, model_name: str = DEFAULT_MODEL, stream: bool = False) -> str:
     """
     Sends the full conversation history to the Moonshot model and gets a response.
+    With stream=True the reply is streamed and cut off after the first command block.
     """
+    if stream:
+        return "".join(stream_ai_response_with_history(system_prompt, history, model_name))
+
     if not client:
         return "[CMD_START]append_log \"[ERROR] Moonshot client not initialized. Cannot get AI response.\"[CMD_END]"
 
     messages = [{"role": "system", "content": system_prompt}] + history
 
+    started = _begin_call(model_name, False)
     try:
         response = client.chat.completions.create(
             model=model_name,
@@ -63,10 +197,16 @@ def get_ai_response_with_history(system_prompt: str, history: list, model_name:
             temperature=0.7,
             max_tokens=8192
         )
+        last_call["latency_s"] = time.perf_counter() - started
+        usage = _usage_counts(getattr(response, "usage", None))
+        if usage:
+            last_call["prompt_tokens"], last_call["completion_tokens"] = usage
         ai_response_text = response.choices[0].message.content
         return ai_response_text
 
     except Exception as e:
         error_message = f"[ERROR] An unexpected error occurred during API call: {e}"
+        last_call["latency_s"] = time.perf_counter() - started
+        last_call["error"] = str(e)
         print(error_message)
         return f"An unexpected error occurred. I will log it. [CMD_START]append_log \"{error_message}\"[CMD_END]"
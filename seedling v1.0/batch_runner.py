@@ -0,0 +1,290 @@
+# MIT License - Copyright (c) 2025 Viktor Kirschner
+"""
+Headless batch mode: runs a queue of goals without anyone at the keyboard.
+
+    python batch_runner.py goals.jsonl [--concurrency=N] [--on-input=auto|fail|defer] [--max-steps=N]
+    python batch_runner.py queue_dir/  [same options]
+
+A JSONL file has one goal per line: {"goal": "...", "id": "...", "workdir": "...",
+"handlers": [...], "prompt": "...", "max_steps": N, "on_input": "..."}. Only "goal" is
+required, and a plain string line is a goal too. A queue directory has one goal per .json
+file (the same object) or .txt file (the goal text). Finished files move to done/, failed/
+or deferred/, so an interrupted batch continues where it stopped.
+
+Each goal runs as an orchestrator worker process (SEEDLING_BATCH_CONCURRENCY at a time,
+default 2). Its working directory is the goal's workdir, relative to the queue file, or a
+fresh directory of its own. Goals that share a workdir run one after the other.
+
+When the agent asks the user something:
+- auto: it is told to decide itself (the default);
+- fail: the goal stops as failed;
+- defer: the goal stops as deferred, and the question is saved for a human.
+
+A deferred goal of a queue directory is saved as deferred/<id>.json with a "question".
+Add an "answer" to that file and the next batch run on the queue moves it back and runs
+it again, with the question and answer added to the goal. In a JSONL file, put the
+"question" and "answer" on the goal's line.
+
+Every result (status, summary, question, steps, timings, log path) is appended to
+.seedling_cache/batches/<run>/results.jsonl as soon as it is known.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import getpass
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import orchestrator
+
+SOURCE_DIR = Path(__file__).parent.resolve()
+CONCURRENCY = int(os.getenv("SEEDLING_BATCH_CONCURRENCY", "2"))
+BATCHES_DIR = os.path.join(".seedling_cache", "batches")
+# Queue subdirectories for finished goal files, by status
+QUEUE_FOLDERS = {"complete": "done", "deferred": "deferred"}
+
+BATCH_PROMPT = """
+
+# BATCH MODE
+You are running unattended as job '{name}' in a batch of maintenance jobs. No user is watching.
+Your working directory is {workdir}.
+{input_rule}
+When the goal is done, call task_complete with a summary for the batch report: what you changed
+(file paths), what you verified, and anything left open.
+{extra}"""
+INPUT_RULES = {
+    "auto": "Make decisions yourself. request_user_input only gets a generic answer telling you to decide.",
+    "fail": "request_user_input ends the job as failed. Use it only if the goal cannot be reached without a human.",
+    "defer": "request_user_input stops the job and saves your question for a human; the job is run again later "
+             "with the answer added to the goal. Use it only if the goal cannot be reached without a human.",
+}
+ANSWER_NOTE = "\n\nYou asked: {question}\nAnswer: {answer}"
+
+
+class QueueError(Exception):
+    pass
+
+
+def default_handlers_dir() -> str:
+    return "handlers" if os.path.isdir("handlers") else str(SOURCE_DIR / "handlers")
+
+
+def _answered_goal(raw: dict) -> str:
+    """The goal text, with the answer to a deferred goal's question (if any) added."""
+    goal = str(raw["goal"]).strip()
+    if str(raw.get("answer") or "").strip():
+        goal += ANSWER_NOTE.format(question=raw.get("question") or "(not recorded)", answer=str(raw["answer"]).strip())
+    return goal
+
+
+def _job(raw, number: int, base_dir: str, defaults: dict, source: str = None) -> dict:
+    if isinstance(raw, str):
+        raw = {"goal": raw}
+    if not isinstance(raw, dict) or not str(raw.get("goal", "")).strip():
+        raise QueueError(f"Goal {number} ({source or 'line ' + str(number)}) has no \"goal\".")
+    on_input = raw.get("on_input") or defaults["on_input"]
+    if on_input not in orchestrator.INPUT_POLICIES:
+        raise QueueError(f"Goal {number}: on_input must be one of {', '.join(orchestrator.INPUT_POLICIES)}.")
+    try:
+        handlers = orchestrator.check_handlers(raw.get("handlers"), defaults["handlers_dir"], f"Goal {number}")
+    except orchestrator.PlanError as e:
+        raise QueueError(e.args[0])
+    workdir = raw.get("workdir")
+    try:
+        max_steps = int(raw.get("max_steps") or defaults["max_steps"])
+    except (TypeError, ValueError):
+        raise QueueError(f"Goal {number}: \"max_steps\" must be a number.")
+    return {"name": orchestrator.safe_name(str(raw.get("id") or (Path(source).stem if source else f"goal{number}"))),
+            "goal": _answered_goal(raw),
+            "workdir": os.path.abspath(os.path.join(base_dir, os.path.expanduser(workdir))) if workdir else None,
+            "handlers": handlers, "prompt": str(raw.get("prompt") or ""),
+            "max_steps": max_steps, "on_input": on_input, "source": source}
+
+
+def requeue_answered(queue_dir: str) -> list:
+    """Moves deferred goals that were given an "answer" back into the queue; returns their files."""
+    moved = []
+    for file in sorted((Path(queue_dir) / QUEUE_FOLDERS["deferred"]).glob("*.json")):
+        target = Path(queue_dir) / file.name
+        try:
+            raw = json.loads(file.read_text(encoding='utf-8'))
+            if not isinstance(raw, dict) or not str(raw.get("answer") or "").strip() or target.exists():
+                continue
+            raw["goal"] = _answered_goal(raw)
+            raw.pop("question", None)
+            raw.pop("answer", None)
+            file.write_text(json.dumps(raw, indent=2, ensure_ascii=False), encoding='utf-8')
+            shutil.move(str(file), str(target))
+        except (OSError, ValueError, KeyError) as e:
+            raise QueueError(f"Cannot requeue {file}: {e}")
+        moved.append(str(target))
+    return moved
+
+
+def load_goals(path: str, defaults: dict) -> list:
+    """
+    The jobs of a JSONL file or a queue directory, in order; raises QueueError.
+    Answered goals in a queue's deferred/ folder are moved back into the queue first.
+    """
+    jobs = []
+    defaults = dict(defaults, handlers_dir=defaults.get("handlers_dir") or default_handlers_dir())
+    if os.path.isdir(path):
+        requeue_answered(path)
+        files = sorted(p for p in Path(path).iterdir() if p.is_file() and p.suffix in (".json", ".txt"))
+        for number, file in enumerate(files, 1):
+            try:
+                text = file.read_text(encoding='utf-8')
+                raw = json.loads(text) if file.suffix == ".json" else text
+            except (OSError, ValueError) as e:
+                raise QueueError(f"Cannot read {file}: {e}")
+            jobs.append(_job(raw, number, path, defaults, source=str(file)))
+    else:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                lines = [(n, line.strip()) for n, line in enumerate(f, 1)]
+        except OSError as e:
+            raise QueueError(f"Cannot read {path}: {e}")
+        for n, line in lines:
+            if not line or line.startswith("#"):
+                continue
+            try:
+                raw = json.loads(line) if line[0] in "{[\"" else line
+            except ValueError as e:
+                raise QueueError(f"{path}, line {n}: {e}")
+            jobs.append(_job(raw, n, os.path.dirname(os.path.abspath(path)), defaults))
+
+    names = set()
+    for job in jobs:
+        while job["name"] in names:
+            job["name"] += "_"
+        names.add(job["name"])
+    return jobs
+
+
+def _finish_queue_file(job: dict, result: dict):
+    """
+    Moves a queue directory's goal file to done/, failed/ or deferred/. A deferred goal is
+    saved as deferred/<id>.json with the question added, ready for an "answer".
+    """
+    source = Path(job["source"])
+    folder = source.parent / QUEUE_FOLDERS.get(result["status"], "failed")
+    folder.mkdir(exist_ok=True)
+    if result["status"] == "deferred":
+        try:
+            text = source.read_text(encoding='utf-8')
+            raw = json.loads(text) if source.suffix == ".json" else {"goal": text.strip()}
+            if isinstance(raw, dict):
+                raw["question"] = result.get("question")
+                raw.pop("answer", None)
+                target = folder / f"{source.stem}.json"
+                target.write_text(json.dumps(raw, indent=2, ensure_ascii=False), encoding='utf-8')
+                source.unlink()
+                return
+        except (OSError, ValueError):
+            pass
+    shutil.move(str(source), str(folder / source.name))
+
+
+def run_batch(jobs: list, concurrency: int = CONCURRENCY, handlers_dir: str = None, priming_prompt_file: str = None,
+              api_key: str = None, timeout: float = orchestrator.WORKER_TIMEOUT, progress=print) -> tuple:
+    """Runs every job; returns (results in job order, results file)."""
+    run_dir = os.path.join(os.path.abspath(BATCHES_DIR), time.strftime('%Y%m%d-%H%M%S') + f"-{os.getpid()}")
+    os.makedirs(run_dir, exist_ok=True)
+    results_file = os.path.join(run_dir, "results.jsonl")
+    handlers_dir = handlers_dir or default_handlers_dir()
+    priming_prompt_file = priming_prompt_file or ("priming_prompt.txt" if os.path.exists("priming_prompt.txt")
+                                                  else str(SOURCE_DIR / "priming_prompt.txt"))
+    env = orchestrator.worker_env(api_key)
+    write_lock = threading.Lock()
+
+    # One group per working directory: goals on the same folder must not run at the same time
+    groups = {}
+    for index, job in enumerate(jobs):
+        job["workdir"] = job["workdir"] or os.path.join(run_dir, job["name"], "work")
+        groups.setdefault(job["workdir"], []).append(index)
+
+    def run_one(index: int) -> dict:
+        job = jobs[index]
+        state_dir = os.path.join(run_dir, job["name"])
+        role = BATCH_PROMPT.format(name=job["name"], workdir=job["workdir"], input_rule=INPUT_RULES[job["on_input"]],
+                                   extra=f"\nInstructions for this job:\n{job['prompt']}\n" if job["prompt"] else "")
+        started = time.strftime('%Y-%m-%d %H:%M:%S')
+        try:
+            task_file = orchestrator.prepare_worker(job, state_dir, role, handlers_dir, priming_prompt_file)
+            result = orchestrator.run_worker(job, task_file, dict(env, SEEDLING_AGENT_NAME=job["name"]), timeout)
+        except OSError as e:
+            result = {"name": job["name"], "status": "failed", "summary": f"Could not prepare the job: {e}",
+                      "steps": 0, "duration_s": 0.0, "state_dir": state_dir}
+        record = {"id": job["name"], "goal": job["goal"], "workdir": job["workdir"], "status": result["status"],
+                  "summary": result["summary"], "question": result.get("question"), "steps": result["steps"],
+                  "duration_s": round(result["duration_s"], 3), "started": started,
+                  "finished": time.strftime('%Y-%m-%d %H:%M:%S'), "log": os.path.join(state_dir, "log.html")}
+        with write_lock:
+            with open(results_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            if job["source"]:
+                try:
+                    _finish_queue_file(job, result)
+                except OSError as e:
+                    progress(f"[ERROR] Could not move {job['source']}: {e}")
+            progress(f"[INFO] {job['name']}: {record['status']} ({record['steps']} steps, {record['duration_s']:.1f} s)")
+        return record
+
+    def run_group(indexes: list) -> list:
+        return [(index, run_one(index)) for index in indexes]
+
+    results = [None] * len(jobs)
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(groups)))) as pool:
+        for future in as_completed([pool.submit(run_group, indexes) for indexes in groups.values()]):
+            for index, record in future.result():
+                results[index] = record
+    return results, results_file
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    options = dict(a[2:].partition("=")[::2] for a in sys.argv[1:] if a.startswith("--"))
+    if len(args) != 1:
+        print("Usage: python batch_runner.py <goals.jsonl | queue_dir> [--concurrency=N] "
+              "[--on-input=auto|fail|defer] [--max-steps=N] [--timeout=SECONDS]")
+        sys.exit(2)
+    try:
+        defaults = {"on_input": options.get("on-input") or "auto",
+                    "max_steps": int(options.get("max-steps") or orchestrator.DEFAULT_MAX_STEPS)}
+        concurrency = int(options.get("concurrency") or CONCURRENCY)
+        timeout = float(options.get("timeout") or orchestrator.WORKER_TIMEOUT)
+        if defaults["on_input"] not in orchestrator.INPUT_POLICIES:
+            raise QueueError(f"--on-input must be one of {', '.join(orchestrator.INPUT_POLICIES)}.")
+        jobs = load_goals(args[0], defaults)
+    except ValueError:
+        print("[ERROR] --concurrency, --max-steps and --timeout take numbers.")
+        sys.exit(2)
+    except QueueError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(2)
+    if not jobs:
+        print(f"[INFO] No goals in {args[0]}.")
+        return
+
+    api_key = os.getenv("MOONSHOT_API_KEY")
+    if not api_key and os.getenv("SEEDLING_LLM_CACHE", "").lower() != "replay":
+        # Asked once, before the batch starts; nobody is needed after that
+        api_key = getpass.getpass("Please enter your API key and press Enter: ")
+
+    print(f"[INFO] Running {len(jobs)} goal(s), {min(concurrency, len(jobs))} at a time.")
+    started = time.monotonic()
+    results, results_file = run_batch(jobs, concurrency, api_key=api_key, timeout=timeout)
+    counts = {}
+    for record in results:
+        counts[record["status"]] = counts.get(record["status"], 0) + 1
+    print(f"[{'SUCCESS' if counts.get('complete') == len(results) else 'INFO'}] "
+          f"{', '.join(f'{n} {status}' for status, n in sorted(counts.items()))} in {time.monotonic() - started:.1f} s.")
+    print(f"Results: {results_file}")
+    sys.exit(0 if counts.get("complete") == len(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
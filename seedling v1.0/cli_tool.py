@@ -1,16 +1,25 @@
 # MIT License - Copyright (c) 2025 Viktor Kirschner
+import time
+_STARTED_AT = time.perf_counter()  # for --startup-bench
 import os
 import sys
 sys.stdout.reconfigure(encoding='utf-8')
 import shlex
+import shutil
 import importlib.util
 from pathlib import Path
 import getpass
 import subprocess
 from datetime import datetime
 import html  # <-- for HTML-escaping log output
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import html_log
 
 # --- Colorama for terminal colors ---
+# Imported eagerly on purpose: the banner below is printed as soon as this module loads and
+# Fore/Back/Style are used throughout; on Windows init() must run before the first color code.
 import colorama
 print(" ")
 print(" ")
@@ -72,7 +81,23 @@ print(
 print ("")
 
 
+import ai_connector
 from ai_connector import get_ai_response_with_history, initialize_client
+import llm_cache
+# Record/replay cache around every model call (SEEDLING_LLM_CACHE=record|replay)
+get_ai_response_with_history = llm_cache.wrap_from_env(get_ai_response_with_history, ai_connector)
+import metrics
+import tracing
+# Tokens, latency and cost of every model call go to .seedling_cache/metrics.jsonl
+get_ai_response_with_history = metrics.wrap_llm(get_ai_response_with_history, ai_connector)
+import handler_pool
+import process_runner
+import shell_session
+import output_store
+import prompt_dedupe
+from context_budget import ContextBudget
+from memory_store import MemoryStore
+import tool_registry
 
 # --- Custom Exceptions for Flow Control ---
 class TaskComplete(Exception):
@@ -94,11 +119,40 @@ LOG_FILE = "log.html"  # CHANGED: write HTML log instead of plain text
 MEMORY_FILE = "memory.txt"
 START_MARKER = "[CMD_START]"
 END_MARKER = "[CMD_END]"
+# Fast start: verify the API key in the background while the user types the first goal
+FAST_START = os.getenv("SEEDLING_FAST_START", "1") != "0"
+SKIP_VERIFY = os.getenv("SEEDLING_SKIP_VERIFY", "0") == "1" or "--skip-verify" in sys.argv[1:]
+# --startup-bench: report the time from start to the first prompt, then exit
+STARTUP_BENCH = "--startup-bench" in sys.argv[1:]
+# Opt-in: several independent commands per reply, wrapped in [PARALLEL_START]...[PARALLEL_END]
+PARALLEL_START = "[PARALLEL_START]"
+PARALLEL_END = "[PARALLEL_END]"
+PARALLEL_ENABLED = os.getenv("SEEDLING_PARALLEL", "0") == "1"
+PARALLEL_WORKERS = int(os.getenv("SEEDLING_PARALLEL_WORKERS", "4"))
+# Commands that switch the REPL's mode or end the step; they can't share a turn with others
+SEQUENTIAL_ONLY_COMMANDS = {
+    'create_file_begin', 'modify_file_begin', 'modify_file_diff_begin', 'create_command_begin',
+    'task_complete', 'request_user_input', 'delegate_begin',
+}
+PARALLEL_PROMPT = f"""
+VI. Parallel Commands (enabled)
+When several steps are independent of each other (e.g. reading three files), you MAY issue them in one response:
+{PARALLEL_START}
+[CMD_START]read_file a.py[CMD_END]
+[CMD_START]read_file b.py[CMD_END]
+{PARALLEL_END}
+They run at the same time and you get all results together in the next turn, numbered in the same order.
+Only batch commands that do not depend on each other's results. {', '.join(sorted(SEQUENTIAL_ONLY_COMMANDS))} can never be batched.
+"""
+# Stream replies and cut them off at the first [CMD_END]; set SEEDLING_STREAM=0 to disable
+STREAM_RESPONSES = os.getenv("SEEDLING_STREAM", "1") != "0"
 
 # --- State Variables ---
 in_code_mode = False
 new_command_name = ""
 file_path_for_code = ""
+file_path_for_diff = ""
+awaiting_delegation = False
 
 # --- Logging and Printing Functions (HTML version) ---
 # Map CLI Fore colors to HTML colors
@@ -116,64 +170,45 @@ _COLOR_MAP = {
     None: "#FFFFFF"  # default
 }
 
-def _ensure_html_log_initialized():
-    """Create HTML scaffold if file missing or empty."""
-    p = Path(LOG_FILE)
-    if (not p.exists()) or p.stat().st_size == 0:
-        with open(LOG_FILE, 'w', encoding='utf-8') as f:
-            f.write("<!doctype html><html><head><meta charset='utf-8'>"
-                    "<meta name='viewport' content='width=device-width,initial-scale=1'>"
-                    "<title>Seedling's Log</title></head>\n")
-            f.write("<body style=\"background:#000; color:#fff; font-family:monospace;\">\n")
-            f.write("<pre style=\"white-space:pre-wrap; word-break:break-word;\">\n")
+# One buffered handle for the whole session (see html_log.py)
+_html_log = html_log.open_log(LOG_FILE)
 
 def _write_html_span(text: str, css_color: str, end: str):
-    with open(LOG_FILE, 'a', encoding='utf-8') as f:
-        f.write(f"<span style='color:{css_color}'>" + html.escape(text) + "</span>")
-        # write literal newline if end == '\n', otherwise append nothing/same
-        if end:
-            f.write(end.replace("\n", "\n"))
+    _html_log.write(f"<span style='color:{css_color}'>" + html.escape(text) + "</span>" + (end or ""))
+
+def _split_ai_message(s: str) -> list:
+    """
+    Splits an AI message into (text, is_command) segments. Every [CMD_START]...[CMD_END]
+    block is a command segment; a start marker without an end runs to the end of the text.
+    """
+    segments = []
+    pos = 0
+    while True:
+        start = s.find(START_MARKER, pos)
+        if start == -1:
+            segments.append((s[pos:], False))
+            return segments
+        segments.append((s[pos:start], False))
+        end_idx = s.find(END_MARKER, start + len(START_MARKER))
+        if end_idx == -1:
+            segments.append((s[start:], True))
+            return segments
+        segments.append((s[start:end_idx + len(END_MARKER)], True))
+        pos = end_idx + len(END_MARKER)
 
 def _render_ai_marked_message_to_html(s: str) -> str:
     """
     Given the full AI message (often '🤖 AI: ... [CMD_START]... [CMD_END] ...'),
-    return HTML with cyan for narrative and red for the command block.
+    return HTML with cyan for narrative and red for the command blocks.
     """
-    # We will build HTML string with spans
-    out = []
     def span(txt, col): return f"<span style='color:{col}'>{html.escape(txt)}</span>"
 
     cyan = _COLOR_MAP[Fore.CYAN]
     red = _COLOR_MAP[Fore.RED]
-
-    # If no markers, paint all cyan (it's an AI line)
-    start = s.find(START_MARKER)
-    if start == -1:
-        return span(s, cyan)
-
-    # before command (cyan)
-    before = s[:start]
-    out.append(span(before, cyan))
-
-    # command part
-    rest = s[start + len(START_MARKER):]
-    end_idx = rest.find(END_MARKER)
-    if end_idx == -1:
-        # no end marker; everything after start is command (red)
-        out.append(span(START_MARKER + rest, red))
-        return "".join(out)
-
-    cmd = rest[:end_idx]
-    after = rest[end_idx + len(END_MARKER):]
-
-    out.append(span(START_MARKER + cmd + END_MARKER, red))
-    out.append(span(after, cyan))
-    return "".join(out)
+    return "".join(span(txt, red if is_command else cyan) for txt, is_command in _split_ai_message(s))
 
 def log_and_print(message="", end='\n', color=None):
     """Print to console (with color) and append HTML with matching color."""
-    _ensure_html_log_initialized()
-
     str_message = str(message)
 
     # Console
@@ -186,11 +221,7 @@ def log_and_print(message="", end='\n', color=None):
     css_color = _COLOR_MAP.get(color, _COLOR_MAP[None])
     # Special case: if this looks like an AI line and includes markers, render like CLI split (cyan/red/cyan)
     if str_message.startswith("🤖 AI:"):
-        html_line = _render_ai_marked_message_to_html(str_message)
-        with open(LOG_FILE, 'a', encoding='utf-8') as f:
-            f.write(html_line)
-            if end:
-                f.write(end.replace("\n", "\n"))
+        _html_log.write(_render_ai_marked_message_to_html(str_message) + (end or ""))
     else:
         _write_html_span(str_message, css_color, end)
 
@@ -201,18 +232,16 @@ def log_message(message="", end='\n'):
       - '🤖 AI:' lines -> cyan, and command segments in red if markers present.
       - Everything else -> default white.
     """
-    _ensure_html_log_initialized()
-
     s = str(message)
     if s.startswith("🤖 AI:"):
-        html_line = _render_ai_marked_message_to_html(s)
-        with open(LOG_FILE, 'a', encoding='utf-8') as f:
-            f.write(html_line)
-            if end:
-                f.write(end.replace("\n", "\n"))
+        _html_log.write(_render_ai_marked_message_to_html(s) + (end or ""))
     else:
         _write_html_span(s, _COLOR_MAP[None], end)
 
+def echo_live_output(stream: str, text: str):
+    """Live output of a long-running command, shown dimmed while it runs."""
+    log_and_print(text, end='', color=Fore.LIGHTRED_EX if stream == "stderr" else Fore.LIGHTBLACK_EX)
+
 # --- Core Functions ---
 
 def setup_environment():
@@ -247,6 +276,46 @@ def parse_ai_command(response: str):
         # Only the start marker was found, so we assume the rest is the command
         return command_text.strip()
 
+def parse_parallel_commands(response: str) -> list:
+    """
+    Extracts every command inside a [PARALLEL_START]...[PARALLEL_END] section.
+    Returns [] when the response is not a parallel batch (a plain command comes first).
+    """
+    section_start = response.find(PARALLEL_START)
+    if section_start == -1:
+        return []
+    first_command = response.find(START_MARKER)
+    if first_command != -1 and first_command < section_start:
+        return []
+
+    section = response[section_start + len(PARALLEL_START):]
+    section_end = section.find(PARALLEL_END)
+    if section_end != -1:
+        section = section[:section_end]
+    pattern = re.escape(START_MARKER) + r"(.*?)" + re.escape(END_MARKER)
+    return [cmd.strip() for cmd in re.findall(pattern, section, re.S) if cmd.strip()]
+
+def execute_parallel_commands(commands: list) -> list:
+    """Runs independent commands concurrently and returns their outputs in command order."""
+    def run_one(command_str: str) -> str:
+        command_name = command_str.split(None, 1)[0]
+        if command_name in SEQUENTIAL_ONLY_COMMANDS:
+            return f"[ERROR] '{command_name}' cannot run inside a parallel block. Issue it on its own."
+        try:
+            result = execute_command(command_str)
+        except Exception as e:
+            return f"[ERROR] Command failed: {e}"
+        return result if result is not None else "[INFO] Command ran with no output."
+
+    with ThreadPoolExecutor(max_workers=max(1, min(PARALLEL_WORKERS, len(commands)))) as pool:
+        return list(pool.map(run_one, commands))
+
+def format_parallel_report(commands: list, results: list) -> str:
+    """The outputs of a parallel batch as one numbered report."""
+    return "\n\n".join(
+        f"### [{i}] {command}\n{result}" for i, (command, result) in enumerate(zip(commands, results), 1)
+    )
+
 def save_new_command(name: str, code: str) -> str:
     """Saves a new command, cleaning it of all common AI-generated artifacts."""
     lines = code.strip().split('\n')
@@ -279,8 +348,25 @@ def save_new_command(name: str, code: str) -> str:
     except Exception as e:
         return f"[ERROR] Failed to save command '{name}': {e}"
 
-def process_and_save_memory(history: list):
-    """Summarizes the conversation and appends it to the memory file."""
+_memory_store = None
+
+def get_memory_store() -> MemoryStore:
+    """The indexed long-term memory (memory.jsonl + memory_index.json), opened once."""
+    global _memory_store
+    if _memory_store is None:
+        _memory_store = MemoryStore(".", MEMORY_FILE)
+    return _memory_store
+
+def build_system_prompt(base_system_prompt: str, goal: str) -> str:
+    """Priming prompt plus only the memories relevant to the current goal."""
+    memory_content = get_memory_store().format_for_prompt(goal)
+    if not memory_content:
+        return base_system_prompt
+    log_and_print(f"[INFO] Loaded {memory_content.count('## Memory #')} relevant memories.")
+    return f"{base_system_prompt}\n\n# PREVIOUS SESSION MEMORY (most relevant to this task)\n---\n{memory_content}\n---"
+
+def process_and_save_memory(history: list, goal: str = ""):
+    """Summarizes the conversation, appends it to the memory file and indexes it."""
     log_and_print("[INFO] Task complete. Summarizing conversation for memory...")
     summarization_prompt = """
     You are a summarization AI. The user has provided a conversation history from a session with a tool-making AI agent. Your task is to create a concise summary of this session to be used as a memory for the AI in future sessions.
@@ -298,6 +384,7 @@ def process_and_save_memory(history: list):
         with open(MEMORY_FILE, 'a', encoding='utf-8') as f:
             f.write(f"\n\n{'='*20} MEMORY FROM COMPLETED TASK {'='*20}\n\n")
             f.write(summary)
+        get_memory_store().add(summary, goal)
         log_and_print(f"[SUCCESS] Memory summary appended to {MEMORY_FILE}.")
     except Exception as e:
         log_and_print(f"[ERROR] Failed to generate or save memory summary: {e}")
@@ -315,6 +402,9 @@ def save_arbitrary_file(file_path_str: str, code: str) -> str:
         if lines and lines[0].strip().startswith('```'): lines.pop(0)
         if lines and lines[-1].strip() == '```': lines.pop(-1)
         cleaned_code = '\n'.join(lines)
+        if final_path.exists():
+            import tool_library
+            tool_library.detach(final_path)  # never write through a link into the tool library
         with open(final_path, 'w', encoding='utf-8') as f:
             f.write(cleaned_code)
         return f"[SUCCESS] File '{file_path_str}' was written successfully."
@@ -322,9 +412,51 @@ def save_arbitrary_file(file_path_str: str, code: str) -> str:
         return f"[ERROR] An unexpected error occurred while writing to '{file_path_str}': {e}"
 
 
+_patch_module = None  # (mtime_ns, module) of handlers/apply_patch.py
+
+def _load_patch_module():
+    """Imports the apply_patch handler, which modify_file_diff_begin shares; reloaded when it changes."""
+    global _patch_module
+    module_path = Path(HANDLERS_DIR) / "apply_patch.py"
+    mtime = module_path.stat().st_mtime_ns
+    if _patch_module is None or _patch_module[0] != mtime:
+        spec = importlib.util.spec_from_file_location("seedling_apply_patch", module_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _patch_module = (mtime, module)
+    return _patch_module[1]
+
+def apply_diff_to_file(file_path_str: str, diff_text: str) -> str:
+    """Applies a diff (unified or search/replace blocks) to one file, with fuzzy context matching."""
+    try:
+        patching = _load_patch_module()
+    except Exception as e:
+        return f"[ERROR] Diff mode needs the apply_patch command ({HANDLERS_DIR}/apply_patch.py), which could not be loaded: {e}. Use modify_file_begin instead."
+    lines = diff_text.strip('\r\n').split('\n')
+    if lines and lines[0].strip().startswith('```'): lines.pop(0)
+    if lines and lines[-1].strip() == '```': lines.pop(-1)
+    try:
+        hunks = patching.parse_patch('\n'.join(lines), file_path_str)
+        for hunk in hunks:
+            hunk.path = file_path_str  # the reply is a diff against this one file, whatever its headers say
+        ok, report = patching.apply_hunks(hunks)
+    except patching.PatchError as e:
+        return f"[ERROR] Could not parse your diff for '{file_path_str}': {e.message} The file was not changed."
+    except Exception as e:
+        return f"[ERROR] An unexpected error occurred while applying the diff to '{file_path_str}': {e}"
+    if not ok:
+        failed = sum(1 for h in hunks if h.error)
+        return "\n".join([f"[ERROR] {failed} of {len(hunks)} hunk(s) did not match '{file_path_str}'. The file was not changed. "
+                          f"Fix the failing hunks (read_file --lines shows the current text) and send the whole diff again."] + report)
+    return "\n".join([f"[SUCCESS] Applied {len(hunks)} hunk(s) to '{file_path_str}'."] + report)
+
+
 def execute_command(command_str: str) -> str:
     """Parses and executes a command, raising exceptions for flow control."""
-    global in_code_mode, new_command_name, file_path_for_code
+    global in_code_mode, new_command_name, file_path_for_code, file_path_for_diff, awaiting_delegation
+    # run_shell passes the rest of the line on verbatim: the shell does its own quoting
+    if command_str.split(None, 1)[:1] == ['run_shell']:
+        return shell_session.run_shell(command_str.strip()[len('run_shell'):], echo=echo_live_output)
     try:
         parts = shlex.split(command_str)
         if not parts: return "[ERROR] Empty command."
@@ -346,6 +478,14 @@ def execute_command(command_str: str) -> str:
         file_path_for_code = args[0]
         return f"[INFO] Ready to modify file at '{file_path_for_code}'. Awaiting AI's code block."
 
+    if command_name == 'modify_file_diff_begin':
+        if not args:
+            return "[ERROR] 'modify_file_diff_begin' requires a file path."
+        if not Path(args[0]).is_file():
+            return f"[ERROR] File not found: '{args[0]}'. Use create_file_begin for new files."
+        file_path_for_diff = args[0]
+        return f"[INFO] Ready to patch file at '{file_path_for_diff}'. Awaiting AI's diff."
+
     # --- Legacy Handler for simple commands ---
     if command_name == 'create_command_begin':
         if not args:
@@ -354,6 +494,14 @@ def execute_command(command_str: str) -> str:
         in_code_mode = True
         return f"[INFO] Entering multi-line code mode for new command '{new_command_name}'. Awaiting AI's code block."
 
+    # --- Multi-agent delegation: the next reply is the plan ---
+    if command_name == 'delegate_begin':
+        import orchestrator  # only sessions that delegate pay for it (and for message_bus, which it imports)
+        if os.getenv(orchestrator.WORKER_ENV):
+            return "[ERROR] Workers cannot delegate. Do the subtask yourself."
+        awaiting_delegation = True
+        return "[INFO] Ready to delegate. Awaiting AI's JSON plan."
+
     # --- Flow Control Handlers ---
     if command_name == 'task_complete':
         final_message = " ".join(args) if args else "Task completed."
@@ -363,15 +511,44 @@ def execute_command(command_str: str) -> str:
         question = " ".join(args) if args else "What is your next step?"
         raise UserInputRequired(question)
 
+    if command_name == 'describe_tool':
+        if not args:
+            return "[ERROR] 'describe_tool' requires a tool name."
+        return tool_registry.describe(args[0], HANDLERS_DIR)
+
+    if command_name == 'show_output':
+        return output_store.show(*args[:2])
+
+    if command_name in ('publish_tool', 'install_tool', 'search_tools'):
+        import tool_library  # imported on first use, like message_bus and orchestrator: keeps start-up fast
+        if command_name == 'publish_tool':
+            return tool_library.publish_tool(args, HANDLERS_DIR)
+        if command_name == 'install_tool':
+            return tool_library.install_tool(args, HANDLERS_DIR)
+        return tool_library.search_tools(args)
+
+    if command_name in ('send_message', 'await_message'):
+        import message_bus  # brings in multiprocessing.connection; most sessions never message
+        if command_name == 'send_message':
+            return message_bus.send_message(args)
+        return message_bus.await_message(args)
+
     # --- System and Custom Command Handlers ---
     def handle_run_powershell(command_to_run: str = None, *args):
         if not command_to_run: return "[ERROR] No command provided to run_powershell."
         full_command = command_to_run + " " + " ".join(args)
+        powershell = shutil.which("powershell") or shutil.which("pwsh")
+        if not powershell:
+            return "[POWERSHELL ERROR] PowerShell is not installed on this system. Use run_shell instead."
         try:
-            result = subprocess.run(["powershell", "-NoProfile", "-Command", full_command], capture_output=True, text=True, timeout=300, check=False, encoding='utf-8')
+            # Streamed: long commands show progress, the model gets a bounded head + tail
+            result = process_runner.run([powershell, "-NoProfile", "-Command", full_command],
+                                        label="run_powershell", echo=echo_live_output)
             if result.returncode != 0:
                 return f"[POWERSHELL ERROR] Exit Code: {result.returncode}\n{result.stderr}"
             return result.stdout if result.stdout else "[INFO] PowerShell command ran with no output."
+        except subprocess.TimeoutExpired as e:
+            return f"[POWERSHELL ERROR] {process_runner.describe_timeout(e)}"
         except Exception as e:
             return f"[POWERSHELL ERROR] Failed to execute command: {e}"
 
@@ -380,12 +557,23 @@ def execute_command(command_str: str) -> str:
         module_path = Path(HANDLERS_DIR) / f"{name}.py"
         if not module_path.exists():
             return f"[ERROR] Unknown command: '{name}'"
+        # SEEDLING_PROFILE=1: the handler runs under cProfile, stats go next to the trace
+        profile = tracing.profile_path(name)
         try:
-            command_to_execute = [sys.executable, str(module_path)] + list(args)
-            result = subprocess.run(command_to_execute, capture_output=True, text=True, timeout=300, check=False, encoding='utf-8')
+            if handler_pool.can_run(module_path):
+                # Warm worker: the handler runs as __main__ in an interpreter that is already up
+                result = handler_pool.run(module_path, args, timeout=process_runner.DEFAULT_TIMEOUT, profile=profile,
+                                          label=name, echo=echo_live_output)
+            else:
+                profiler = ["-m", "cProfile", "-o", profile] if profile else []
+                command_to_execute = [sys.executable] + profiler + [str(module_path)] + list(args)
+                result = process_runner.run(command_to_execute, label=name, echo=echo_live_output,
+                                            env=dict(os.environ, PYTHONIOENCODING="utf-8"))
             if result.returncode != 0:
                 return f"[EXECUTION ERROR] Command '{name}' failed: {result.stderr}"
             return result.stdout if result.stdout else f"[INFO] Command '{name}' ran successfully with no output."
+        except subprocess.TimeoutExpired as e:
+            return f"[EXECUTION ERROR] Command '{name}': {process_runner.describe_timeout(e)}"
         except Exception as e:
             return f"[EXECUTION ERROR] An unexpected error occurred while running '{name}': {e}"
 
@@ -397,6 +585,20 @@ def execute_command(command_str: str) -> str:
     
     return handle_run_command(command_name, *args)
 
+# Duration, output size and outcome of every command go to the metrics file as well
+execute_command = metrics.wrap_tool(execute_command, (TaskComplete, UserInputRequired))
+
+# --- Tracing (SEEDLING_TRACE=1): every phase of a step becomes a span in the trace file ---
+get_ai_response_with_history = tracing.wrap(get_ai_response_with_history, "llm call")
+execute_command = tracing.wrap(execute_command, "execute", name_from_arg=True)
+save_arbitrary_file = tracing.wrap(save_arbitrary_file, "execute create_file_begin")
+apply_diff_to_file = tracing.wrap(apply_diff_to_file, "execute modify_file_diff_begin")
+save_new_command = tracing.wrap(save_new_command, "execute create_command_begin")
+build_system_prompt = tracing.wrap(build_system_prompt, "prompt assembly (memories)")
+process_and_save_memory = tracing.wrap(process_and_save_memory, "memory summarization")
+log_and_print = tracing.wrap(log_and_print, "log")
+log_message = tracing.wrap(log_message, "log")
+
 # --- Command Handlers ---
 
 def handle_run_powershell(command_to_run: str = None, *args):
@@ -432,25 +634,51 @@ def handle_run_command(name: str = None, *args):
     except Exception as e:
         return f"[EXECUTION ERROR] An unexpected error occurred while running '{name}': {e}"
 
+def start_client_in_background(api_key: str, verify: bool = True):
+    """
+    Initializes the AI client on a daemon thread so the prompt appears immediately.
+    Returns a function that waits for the result (True/False).
+    """
+    result = {}
+    def worker():
+        result["ok"] = initialize_client(api_key, verify=verify, quiet=True)
+    thread = threading.Thread(target=worker, name="client-init", daemon=True)
+    thread.start()
+    def wait() -> bool:
+        thread.join()
+        return result.get("ok", False)
+    return wait
+
 # --- Main REPL Loop ---
 def main():
     """The main Read-Eval-Print Loop for the autonomous agent."""
-    global in_code_mode, new_command_name, file_path_for_code
+    global in_code_mode, new_command_name, file_path_for_code, file_path_for_diff, awaiting_delegation
     
     colorama.init(autoreset=True)
     setup_environment()
     log_message(f"\n--- NEW SESSION STARTED AT {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ---")
     
     log_and_print("--- AI Agent Tool Initialization ---")
+    if llm_cache.last_error:
+        log_and_print(f"[ERROR] {llm_cache.last_error}", color=Fore.RED)
+        log_and_print("Could not start the tool. Exiting."); return
     api_key = os.getenv("MOONSHOT_API_KEY") 
-    if not api_key:
+    replaying = llm_cache.DEFAULT_MODE == "replay"
+    if replaying:
+        log_and_print(f"[INFO] Replay mode: answers come from {llm_cache.DEFAULT_DIR}, no API calls are made.")
+    elif not api_key:
         log_and_print("INFO: API key environment variable not found.")
         try: 
             prompt = "Please enter your API key and press Enter: "
             log_message(prompt + "********")
             api_key = getpass.getpass(prompt)
         except (KeyboardInterrupt, EOFError): log_and_print("\nOperation cancelled. Exiting."); return
-    if not initialize_client(api_key):
+    wait_for_client = None
+    if replaying:
+        pass  # every answer comes from the cache; no client needed
+    elif FAST_START:
+        wait_for_client = start_client_in_background(api_key, verify=not SKIP_VERIFY)
+    elif not initialize_client(api_key, verify=not SKIP_VERIFY):
         log_and_print("Could not start the tool. Exiting."); return
         
     log_and_print("\nAI Agent CLI Tool")
@@ -459,32 +687,66 @@ def main():
         with open(PRIMING_PROMPT_FILE, 'r', encoding='utf-8') as f:
             base_system_prompt = f.read()
         
-        if Path(MEMORY_FILE).exists() and Path(MEMORY_FILE).stat().st_size > 0:
-            log_and_print(f"[INFO] Loading memory from {MEMORY_FILE}...")
-            with open(MEMORY_FILE, 'r', encoding='utf-8') as f:
-                memory_content = f.read()
-            system_prompt = f"{base_system_prompt}\n\n# PREVIOUS SESSION MEMORY\n---\n{memory_content}\n---"
-        else:
-            system_prompt = base_system_prompt
+        if tool_registry.INDEX_MARKER not in base_system_prompt:
+            # Older priming prompts: the generated tool list goes at the end
+            base_system_prompt += f"\n\nThe tools in the handlers directory (run describe_tool <name> for details):\n{tool_registry.INDEX_MARKER}\n"
+        if PARALLEL_ENABLED:
+            base_system_prompt += "\n" + PARALLEL_PROMPT
+        system_prompt = base_system_prompt
     except FileNotFoundError:
         log_and_print(f"[FATAL] Priming prompt '{PRIMING_PROMPT_FILE}' not found. Exiting."); return
 
     conversation_history = []
-    
+    # Only a budgeted view of the history is sent; the full history stays here for memory
+    context_budget = ContextBudget(get_ai_response_with_history)
+    step_number = 0
+
     while True:
         try:
             if not conversation_history:
                 prompt_text = "\n👤 You: "
                 log_and_print(prompt_text, color=Fore.YELLOW, end='')
+                _html_log.flush()
+                if STARTUP_BENCH:
+                    print(f"\n[STARTUP] Prompt ready after {time.perf_counter() - _STARTED_AT:.3f} s")
+                    return
+                tracing.end_step()
                 user_query = input()
                 if not user_query.strip(): user_query = "[USER_SUBMITTED_EMPTY_PROMPT]"
                 log_message(user_query)
                 if user_query.lower() in ['exit', 'quit']: break
                 conversation_history.append({"role": "user", "content": user_query})
+                # New task: pull in only the memories that match this goal
+                system_prompt = build_system_prompt(base_system_prompt, user_query)
             
+            if wait_for_client is not None:
+                # The key was being verified in the background; we need the client now
+                client_ok, wait_for_client = wait_for_client(), None
+                if not client_ok:
+                    log_and_print(f"[ERROR] {ai_connector.last_error}", color=Fore.RED)
+                    log_and_print("Could not start the tool. Exiting."); return
+
+            # Step boundary: make everything from the previous step visible in log.html
+            with tracing.span("log flush"):
+                _html_log.flush()
+            step_number += 1
+            tracing.begin_step(step_number)
+            metrics.set_step(step_number)
             log_and_print(f"\n--- Autonomous Step ---")
             
-            ai_response_text = get_ai_response_with_history(system_prompt, conversation_history)
+            # Code-block replies are raw file content and must never be cut at a marker
+            awaiting_code = bool(file_path_for_code) or bool(file_path_for_diff) or in_code_mode or awaiting_delegation
+            # The tool list is regenerated from handlers/ (cached, so this is cheap) to include new tools
+            with tracing.span("prompt assembly"):
+                prompt_to_send = tool_registry.render(system_prompt, HANDLERS_DIR)
+                # Repeated and superseded tool outputs are sent once, as their newest copy
+                history_to_send = context_budget.fit(prompt_to_send, prompt_dedupe.dedupe(conversation_history))
+            if context_budget.last_folded:
+                log_and_print(f"[INFO] Context budget reached: folded {context_budget.last_folded} older messages into a running summary.")
+            ai_response_text = get_ai_response_with_history(
+                prompt_to_send, history_to_send,
+                stream=STREAM_RESPONSES and not awaiting_code
+            )
             
             # --- Primary Check: Is the tool waiting for code? ---
             if file_path_for_code:
@@ -501,6 +763,38 @@ def main():
                 conversation_history.append({"role": "user", "content": tool_feedback})
                 continue
 
+            # --- Diff Check: Is the tool waiting for a diff? ---
+            if file_path_for_diff:
+                log_and_print(f"🤖 AI intends to apply the following diff to '{file_path_for_diff}':", color=Fore.CYAN)
+                log_and_print(f"```diff\n{ai_response_text}\n```", color=Fore.CYAN)
+
+                result = apply_diff_to_file(file_path_for_diff, ai_response_text)
+
+                log_and_print(f"🛠️ Tool Output:\n{result}", color=Fore.GREEN)
+
+                file_path_for_diff = ""
+                tool_feedback = f"The result of your diff action was: {result}. What is your next step?"
+                conversation_history.append({"role": "assistant", "content": ai_response_text})
+                conversation_history.append({"role": "user", "content": tool_feedback})
+                continue
+
+            # --- Delegation Check: Is the tool waiting for a plan? ---
+            if awaiting_delegation:
+                log_and_print("🤖 AI delegates the following plan to worker agents:", color=Fore.CYAN)
+                log_and_print(f"```json\n{ai_response_text}\n```", color=Fore.CYAN)
+                awaiting_delegation = False
+
+                import orchestrator
+                result = orchestrator.delegate(ai_response_text, HANDLERS_DIR, PRIMING_PROMPT_FILE,
+                                               api_key=api_key or getattr(ai_connector.client, "api_key", None),
+                                               progress=log_and_print)
+
+                log_and_print(f"🛠️ Tool Output:\n{result}", color=Fore.GREEN)
+                tool_feedback = f"The result of your delegation was:\n\n{output_store.compact(result)}\n\nBased on this, what is your next action?"
+                conversation_history.append({"role": "assistant", "content": ai_response_text})
+                conversation_history.append({"role": "user", "content": tool_feedback})
+                continue
+
             # --- Legacy Check: Waiting for a simple handler command ---
             if in_code_mode:
                 log_and_print(f"🤖 AI intends to write the following code for '{new_command_name}':", color=Fore.CYAN)
@@ -516,27 +810,36 @@ def main():
 
             # --- Standard Command Execution Logic ---
             conversation_history.append({"role": "assistant", "content": ai_response_text})
-            command_to_run = parse_ai_command(ai_response_text)
+            with tracing.span("parse"):
+                parallel_commands = parse_parallel_commands(ai_response_text) if PARALLEL_ENABLED else []
+                command_to_run = parse_ai_command(ai_response_text)
 
             if command_to_run:
-                parts = ai_response_text.split(START_MARKER)
-                before_command = parts[0]
-                command_and_after = parts[1].split(END_MARKER)
-                command_part = command_and_after[0]
-                after_command = command_and_after[1] if len(command_and_after) > 1 else ""
-                print(f"{Fore.CYAN}🤖 AI: {before_command}", end='')
-                print(f"{Fore.RED}{START_MARKER}{command_part}{END_MARKER}", end='')
-                print(f"{Fore.CYAN}{after_command}{Style.RESET_ALL}")
+                for text, is_command in _split_ai_message(f"🤖 AI: {ai_response_text}"):
+                    print(f"{Fore.RED if is_command else Fore.CYAN}{text}", end='')
+                print(Style.RESET_ALL)
                 log_message(f"🤖 AI: {ai_response_text}")
             else:
                 log_and_print(f"🤖 AI: {ai_response_text}", color=Fore.CYAN)
 
-            if command_to_run:
+            if len(parallel_commands) > 1:
+                log_and_print(f"[INFO] Running {len(parallel_commands)} commands in parallel.")
+                results = execute_parallel_commands(parallel_commands)
+                log_and_print("-" * 20)
+                log_and_print(f"🛠️ Tool Output:\n{format_parallel_report(parallel_commands, results)}", color=Fore.GREEN)
+                log_and_print("-" * 20)
+                # Big outputs stay on disk; the history only keeps a preview and the id
+                execution_result = format_parallel_report(parallel_commands, [output_store.compact(r) for r in results])
+                tool_feedback = f"The results of your parallel commands were:\n\n{execution_result}\n\nBased on this, what is your next action?"
+                conversation_history.append({"role": "user", "content": tool_feedback})
+            elif command_to_run:
                 execution_result = execute_command(command_to_run)
                 if execution_result is None: execution_result = "[INFO] Command ran with no output."
                 log_and_print("-" * 20)
                 log_and_print(f"🛠️ Tool Output:\n{execution_result}", color=Fore.GREEN)
                 log_and_print("-" * 20)
+                # Big outputs stay on disk; the history only keeps a preview and the id
+                execution_result = output_store.compact(execution_result)
                 tool_feedback = f"The result of your last command was:\n\n{execution_result}\n\nBased on this, what is your next action?"
                 conversation_history.append({"role": "user", "content": tool_feedback})
             else:
@@ -544,6 +847,8 @@ def main():
                 log_and_print("[INFO] AI is waiting for your input.")
                 prompt_text = "\n👤 You: "
                 log_and_print(prompt_text, color=Fore.YELLOW, end='')
+                _html_log.flush()
+                tracing.end_step()
                 user_response = input()
                 if not user_response.strip(): user_response = "[USER_SUBMITTED_EMPTY_PROMPT]"
                 log_message(user_response)
@@ -558,6 +863,8 @@ def main():
             log_and_print(f"🤖 AI: {e.message}", color=Fore.CYAN)
             prompt_text = "\n👤 You: "
             log_and_print(prompt_text, color=Fore.YELLOW, end='')
+            _html_log.flush()
+            tracing.end_step()
             user_response = input()
             if not user_response.strip(): user_response = "[USER_SUBMITTED_EMPTY_PROMPT]"
             log_message(user_response)
@@ -570,7 +877,7 @@ def main():
             log_and_print("-" * 20)
             log_and_print(f"✅ AI: {e.message}", color=Fore.CYAN)            
             if conversation_history:
-                process_and_save_memory(conversation_history)
+                process_and_save_memory(context_budget.fit("", prompt_dedupe.dedupe(conversation_history)), conversation_history[0]["content"])
             log_and_print("[INFO] AI has marked the task as complete. Awaiting new user input.")
             log_and_print("-" * 20)
             conversation_history = []
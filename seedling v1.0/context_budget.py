@@ -0,0 +1,117 @@
+# MIT License - Copyright (c) 2025 Viktor Kirschner
+"""
+Token budget for the conversation sent to the model.
+
+The full conversation_history is kept in cli_tool.py, but only a budgeted view of it is
+sent on each call: the user's goal and the most recent messages stay verbatim, and
+everything in between is folded into a running summary once the estimate goes over
+budget. The summary is extended incrementally, so each message is summarized only once.
+"""
+import os
+
+# Rough prompt budget in tokens (system prompt + history) and how many of the newest
+# messages always stay verbatim. Both can be overridden from the environment.
+DEFAULT_BUDGET = int(os.getenv("SEEDLING_CONTEXT_BUDGET", "60000"))
+DEFAULT_KEEP_RECENT = int(os.getenv("SEEDLING_KEEP_RECENT", "12"))
+
+# Per-message overhead of the chat format (role, separators)
+MESSAGE_OVERHEAD = 4
+
+SUMMARY_HEADER = "# SUMMARY OF EARLIER STEPS IN THIS TASK"
+
+COMPACTION_PROMPT = """
+You are compressing the working history of a tool-using AI agent so it fits in its context window.
+You get the summary written so far (may be empty) followed by the next chunk of the conversation.
+Return an updated summary that keeps:
+1.  Every command the agent ran and whether it succeeded or failed (one line each).
+2.  Facts the agent learned that it still needs: file paths, tool names, arguments, error causes.
+3.  Decisions taken and anything the user said.
+Drop verbatim file contents and long tool output. Be factual and terse. Do not issue any command.
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate: about four UTF-8 bytes per token."""
+    return len(text.encode('utf-8', errors='ignore')) // 4 + 1
+
+
+def estimate_message_tokens(message: dict) -> int:
+    return estimate_tokens(str(message.get("content", ""))) + MESSAGE_OVERHEAD
+
+
+class ContextBudget:
+    """Keeps the outgoing history under a token budget by rolling older turns into a summary."""
+
+    def __init__(self, summarizer, budget: int = DEFAULT_BUDGET, keep_recent: int = DEFAULT_KEEP_RECENT):
+        """
+        summarizer(system_prompt, history) -> str is the normal model call
+        (get_ai_response_with_history); it is used to write the running summary.
+        """
+        self.summarizer = summarizer
+        self.budget = budget
+        self.keep_recent = max(2, keep_recent)
+        self.reset()
+
+    def reset(self):
+        """Forget the running summary (called when a new task starts)."""
+        self.summary = ""
+        self.folded = 0          # history messages [1:folded] are covered by the summary
+        self._goal = None
+        self.last_folded = 0     # messages folded during the most recent fit() call
+
+    def estimate(self, system_prompt: str, history: list) -> int:
+        return estimate_tokens(system_prompt) + sum(estimate_message_tokens(m) for m in history)
+
+    def _view(self, history: list) -> list:
+        """History as it is sent: goal (+ summary) followed by the unfolded tail."""
+        if not self.summary:
+            return list(history)
+        goal = dict(history[0])
+        goal["content"] = f"{goal['content']}\n\n{SUMMARY_HEADER}\n{self.summary}"
+        return [goal] + history[self.folded:]
+
+    def fit(self, system_prompt: str, history: list) -> list:
+        """Return the history to send, folding older messages if the budget is exceeded."""
+        self.last_folded = 0
+        if not history:
+            return []
+        # A new task (or a rewritten history) invalidates the running summary
+        if history[0] is not self._goal or len(history) < self.folded:
+            self.reset()
+            self._goal = history[0]
+        if self.folded == 0:
+            self.folded = 1
+
+        view = self._view(history)
+        if self.estimate(system_prompt, view) <= self.budget:
+            return view
+
+        # Fold everything except the goal and the most recent messages. The cut is moved
+        # so that the verbatim tail starts with an assistant message, keeping the
+        # user/assistant alternation intact after the goal.
+        cut = len(history) - self.keep_recent
+        while cut > self.folded and history[cut].get("role") != "assistant":
+            cut -= 1
+        if cut <= self.folded:
+            return view
+
+        self.summary = self._summarize(history[self.folded:cut])
+        self.last_folded = cut - self.folded
+        self.folded = cut
+        return self._view(history)
+
+    def _summarize(self, messages: list) -> str:
+        chunk = "\n\n".join(f"[{m.get('role', 'user').upper()}]\n{m.get('content', '')}" for m in messages)
+        request = [{
+            "role": "user",
+            "content": f"SUMMARY SO FAR:\n{self.summary or '(empty)'}\n\nNEXT PART OF THE CONVERSATION:\n{chunk}"
+        }]
+        try:
+            summary = self.summarizer(COMPACTION_PROMPT, request)
+        except Exception:
+            summary = ""
+        if not summary or summary.startswith("[ERROR]") or "[CMD_START]" in summary:
+            # The model could not summarize; keep a clipped extract rather than nothing
+            clipped = [f"- {m.get('role')}: {str(m.get('content', ''))[:200]}" for m in messages]
+            summary = "\n".join(filter(None, [self.summary] + clipped))[-self.budget:]
+        return summary.strip()
@@ -1,2 +1,2 @@
 @echo off
-python "%~dp0dropseed.py"
+python "%~dp0dropseed.py" %*
@@ -1,6 +1,22 @@
 # MIT License - Copyright (c) 2025 Viktor Kirschner
+"""
+Deploys Seedling's core files and handlers into the current directory.
+
+The deployment is incremental: a file is copied only if it is new or changed. Size and
+mtime are compared first, and content hashes only when those are ambiguous. Handlers that
+the local agent created or changed since the last deployment are kept. Options:
+
+    --dry-run   show what would change, change nothing
+    --link      hard-link files instead of copying them, and replace identical copies with
+                links (copies across file systems)
+    --force     also overwrite handlers that were changed locally
+    --clean     the old behaviour: delete and re-copy everything in ITEMS_TO_COPY
+"""
 import os
+import json
+import time
 import shutil
+import hashlib
 from pathlib import Path
 import sys
 
@@ -14,19 +30,152 @@ TARGET_DIR = Path(os.getcwd()).resolve()
 ITEMS_TO_COPY = [
     "cli_tool.py",
     "ai_connector.py",
+    "handler_pool.py",
+    "html_log.py",
+    "context_budget.py",
+    "memory_store.py",
+    "key_cache.py",
+    "llm_cache.py",
+    "tool_registry.py",
+    "tool_library.py",
+    "metrics.py",
+    "tracing.py",
+    "process_runner.py",
+    "shell_session.py",
+    "output_store.py",
+    "prompt_dedupe.py",
+    "orchestrator.py",
+    "message_bus.py",
+    "batch_runner.py",
+    "seedling_stats.py",
     "agentk.bat",
     "priming_prompt.txt",
     "license.txt",
     "handlers",  # folder
 ]
 
-def main():
-    if SOURCE_DIR == TARGET_DIR:
-        print("❌ Refusing to overwrite the source folder.")
-        return
+# What dropseed deployed into the target (path -> hash), to tell local changes from old copies
+MANIFEST_FILE = Path(".seedling_cache") / "dropseed.json"
+SKIP_NAMES = {"__pycache__"}
 
-    print(f"📦 Deploying clean Nemo into:\n  {TARGET_DIR}")
 
+def file_hash(path: Path) -> str:
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def same_file(src: Path, dst: Path) -> bool:
+    """Cheap checks first (same inode, size, mtime); the content hash only when they are not conclusive."""
+    src_stat, dst_stat = src.stat(), dst.stat()
+    if (src_stat.st_ino, src_stat.st_dev) == (dst_stat.st_ino, dst_stat.st_dev):
+        return True
+    if src_stat.st_size != dst_stat.st_size:
+        return False
+    if src_stat.st_mtime_ns == dst_stat.st_mtime_ns:
+        return True
+    if file_hash(src) != file_hash(dst):
+        return False
+    os.utime(dst, ns=(dst_stat.st_atime_ns, src_stat.st_mtime_ns))  # next time the mtime check is enough
+    return True
+
+
+def place(src: Path, dst: Path, link: bool):
+    """Copies (or hard-links) src to dst through a temporary file, so dst is never half-written."""
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(f"{dst.name}.{os.getpid()}.tmp")
+    try:
+        if not link:
+            raise OSError
+        os.link(src, tmp)
+    except OSError:
+        shutil.copy2(src, tmp)  # no --link, or another file system
+    os.replace(tmp, dst)
+
+
+def source_files() -> list:
+    """(relative path, is_handler) for every file in ITEMS_TO_COPY."""
+    files = []
+    for item in ITEMS_TO_COPY:
+        src = SOURCE_DIR / item
+        if not src.exists():
+            print(f"⚠️  Missing from source: {item}")
+        elif src.is_dir():
+            for path in sorted(src.rglob("*")):
+                relative = path.relative_to(SOURCE_DIR)
+                if path.is_file() and not SKIP_NAMES.intersection(relative.parts) and path.suffix != ".pyc":
+                    files.append((relative, True))
+        else:
+            files.append((Path(item), False))
+    return files
+
+
+def sync(link: bool = False, force: bool = False, dry_run: bool = False):
+    started = time.perf_counter()
+    manifest_path = TARGET_DIR / MANIFEST_FILE
+    try:
+        deployed = json.loads(manifest_path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        deployed = {}
+    changes = {"new": [], "updated": [], "linked": [], "kept": [], "removed": []}
+    unchanged, copied_bytes = 0, 0
+    manifest = {}
+
+    for relative, is_handler in source_files():
+        src, dst = SOURCE_DIR / relative, TARGET_DIR / relative
+        key = relative.as_posix()
+        if not dst.exists():
+            action = "new"
+        elif same_file(src, dst):
+            src_stat, dst_stat = src.stat(), dst.stat()
+            linkable = link and src_stat.st_dev == dst_stat.st_dev and src_stat.st_ino != dst_stat.st_ino
+            action = "linked" if linkable else None
+        elif is_handler and not force and deployed.get(key) != file_hash(dst):
+            # Changed here since dropseed put it there (or deployed before this manifest existed)
+            changes["kept"].append(key)
+            if key in deployed:
+                manifest[key] = deployed[key]
+            continue
+        else:
+            action = "updated"
+
+        if action:
+            changes[action].append(key)
+            if action != "linked":
+                copied_bytes += src.stat().st_size
+            if not dry_run:
+                place(src, dst, link)
+        else:
+            unchanged += 1
+        manifest[key] = file_hash(src)
+
+    # A handler that left the source is removed only if the target still has the copy we deployed
+    for key, digest in deployed.items():
+        dst = TARGET_DIR / key
+        if key not in manifest and key.startswith("handlers/") and dst.is_file() and file_hash(dst) == digest:
+            changes["removed"].append(key)
+            if not dry_run:
+                dst.unlink()
+
+    if not dry_run:
+        manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        manifest_path.write_text(json.dumps(manifest, indent=1), encoding='utf-8')
+
+    labels = {"new": "🆕 New", "updated": "🔄 Updated", "linked": "🔗 Replaced by a link", "kept": "✋ Kept local changes",
+              "removed": "🗑️  Removed (gone from source)"}
+    for action, label in labels.items():
+        for key in changes[action]:
+            print(f"  {label}: {key}")
+    summary = ", ".join(f"{len(changes[a])} {a}" for a in labels if changes[a]) or "nothing changed"
+    print(f"{'🔎 Dry run: ' if dry_run else '✅ '}{summary}, {unchanged} unchanged. "
+          f"{'Would copy' if dry_run else 'Copied'} {copied_bytes / 1024:.1f} KB in {time.perf_counter() - started:.2f} s.")
+    if changes["kept"]:
+        print("   Handlers with local changes were left alone; run with --force to overwrite them.")
+
+
+def clean_copy():
     for item in ITEMS_TO_COPY:
         src = SOURCE_DIR / item
         dst = TARGET_DIR / item
@@ -48,5 +197,24 @@ def main():
 
     print("✅ Done.")
 
+
+def main():
+    options = set(sys.argv[1:])
+    unknown = options - {"--dry-run", "--link", "--force", "--clean"}
+    if unknown:
+        print(f"❌ Unknown option(s): {', '.join(sorted(unknown))}. Use --dry-run, --link, --force or --clean.")
+        return
+
+    if SOURCE_DIR == TARGET_DIR:
+        print("❌ Refusing to overwrite the source folder.")
+        return
+
+    print(f"📦 Deploying clean Nemo into:\n  {TARGET_DIR}")
+
+    if "--clean" in options:
+        clean_copy()
+    else:
+        sync(link="--link" in options, force="--force" in options, dry_run="--dry-run" in options)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,388 @@
+# MIT License - Copyright (c) 2025 Viktor Kirschner
+"""
+Warm handler workers.
+
+Instead of starting a fresh interpreter for every handler call, Seedling keeps a few
+long-lived worker processes around. A worker runs the handler file as __main__ with
+sys.argv set (runpy), exactly as `python handlers/x.py ...` would, so usage messages and
+argument handling stay the handler's own; only the interpreter start-up and the standard
+library imports are saved. Modules the handler imports from the project are dropped after
+each call, so an edited helper is picked up by the next one.
+
+Output is sent back in chunks while the handler runs, so it is handled like a subprocess
+of process_runner: echoed live after a second, kept to a bounded head and tail (the rest
+spilled to a file), and subject to the same timeout and idle timeout.
+
+A worker is still a separate process, so a crashing or hanging handler cannot take the
+main loop down: it is killed, replaced, and the call is reported like a failed subprocess.
+
+Handlers that do real work at the top level (plain sys.argv scripts) may leave state behind
+in a shared interpreter, so can_run() sends those back to the classic one-process-per-call
+path.
+"""
+import os
+import sys
+import ast
+import json
+import time
+import cProfile
+import queue
+import atexit
+import tempfile
+import threading
+import subprocess
+import traceback
+import runpy
+from pathlib import Path
+
+import process_runner
+
+# Number of warm workers; set SEEDLING_HANDLER_WORKERS=0 to disable the pool entirely
+POOL_SIZE = int(os.getenv("SEEDLING_HANDLER_WORKERS", "4"))
+DEFAULT_TIMEOUT = 300
+
+# Top-level statements that are harmless to execute once and keep imported
+_SAFE_TOP_LEVEL = (ast.Import, ast.ImportFrom, ast.FunctionDef, ast.AsyncFunctionDef,
+                   ast.ClassDef, ast.Assign, ast.AnnAssign)
+
+_poolable_cache = {}  # path -> (mtime_ns, size, bool)
+
+
+def _is_safe_statement(node) -> bool:
+    if isinstance(node, _SAFE_TOP_LEVEL):
+        return True
+    if isinstance(node, ast.Expr):
+        # Docstrings and the mandatory sys.stdout.reconfigure(...) line
+        if isinstance(node.value, ast.Constant):
+            return True
+        call = node.value
+        return (isinstance(call, ast.Call) and isinstance(call.func, ast.Attribute)
+                and call.func.attr == "reconfigure")
+    if isinstance(node, ast.If):
+        # if __name__ == "__main__": never runs on import
+        test = node.test
+        return (isinstance(test, ast.Compare) and isinstance(test.left, ast.Name)
+                and test.left.id == "__name__")
+    if isinstance(node, ast.Try):
+        # Optional-import blocks: try: import x / except ImportError: x = None
+        body = node.body + [n for h in node.handlers for n in h.body] + node.orelse + node.finalbody
+        return all(isinstance(n, (ast.Import, ast.ImportFrom, ast.Assign, ast.Pass)) for n in body)
+    return False
+
+
+def can_run(module_path) -> bool:
+    """True if the handler exposes run() and importing it has no side effects."""
+    if POOL_SIZE <= 0:
+        return False
+    try:
+        st = os.stat(module_path)
+    except OSError:
+        return False
+    key = str(Path(module_path).resolve())
+    cached = _poolable_cache.get(key)
+    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+
+    try:
+        with open(module_path, 'r', encoding='utf-8') as f:
+            tree = ast.parse(f.read())
+        has_run = any(isinstance(n, ast.FunctionDef) and n.name == "run" for n in tree.body)
+        poolable = has_run and all(_is_safe_statement(n) for n in tree.body)
+    except (SyntaxError, ValueError, UnicodeDecodeError):
+        # Let the subprocess path report the error the usual way
+        poolable = False
+
+    _poolable_cache[key] = (st.st_mtime_ns, st.st_size, poolable)
+    return poolable
+
+
+# --- Parent side ---
+
+class _Worker:
+    """One warm worker process, spoken to over JSON lines on stdin/stdout."""
+
+    def __init__(self):
+        env = dict(os.environ, PYTHONIOENCODING="utf-8")
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--worker"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, encoding='utf-8', bufsize=1, env=env
+        )
+        self.chunks = queue.Queue()  # (stream, bytes) while a handler runs, (stream, None) when it ended
+        self.reply = None  # the final message of the current call; stays None if the worker died
+        self.reader = threading.Thread(target=self._read_replies, daemon=True)
+        self.reader.start()
+
+    def _read_replies(self):
+        try:
+            for line in self.process.stdout:
+                message = json.loads(line)
+                if "stream" in message:
+                    self.chunks.put((message["stream"], message["data"].encode('latin-1')))
+                    continue
+                self.reply = message
+                self.chunks.put(("stdout", None))
+                self.chunks.put(("stderr", None))
+        except ValueError:
+            pass
+        # EOF: the worker died
+        self.chunks.put(("stdout", None))
+        self.chunks.put(("stderr", None))
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def send(self, module_path: str, args: list, profile: str = None):
+        self.reply = None
+        request = {"path": os.path.abspath(module_path), "args": list(args), "cwd": os.getcwd(), "profile": profile}
+        self.process.stdin.write(json.dumps(request) + "\n")
+        self.process.stdin.flush()
+
+    def kill(self):
+        try:
+            self.process.kill()
+            self.process.wait(timeout=5)
+        except Exception:
+            pass
+
+
+class HandlerPool:
+    """A small pool of warm workers; workers are started lazily and replaced after crashes."""
+
+    def __init__(self, size: int = POOL_SIZE):
+        self.size = max(1, size)
+        self._cond = threading.Condition()
+        self._idle = []
+        self._all = []
+
+    def _acquire(self) -> _Worker:
+        with self._cond:
+            while True:
+                while self._idle:
+                    worker = self._idle.pop()
+                    if worker.alive():
+                        return worker
+                    self._all.remove(worker)
+                    self._cond.notify()
+                if len(self._all) < self.size:
+                    break
+                self._cond.wait()
+            # Reserve the slot before the (slow) spawn happens outside the lock
+            placeholder = object()
+            self._all.append(placeholder)
+        try:
+            worker = _Worker()
+        except Exception:
+            with self._cond:
+                self._all.remove(placeholder)
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._all[self._all.index(placeholder)] = worker
+        return worker
+
+    def _release(self, worker: _Worker):
+        with self._cond:
+            self._idle.append(worker)
+            self._cond.notify()
+
+    def _discard(self, worker: _Worker):
+        worker.kill()
+        with self._cond:
+            if worker in self._all:
+                self._all.remove(worker)
+            self._cond.notify()
+
+    def run(self, module_path, args, timeout: float = DEFAULT_TIMEOUT, profile: str = None,
+            idle_timeout: float = process_runner.IDLE_TIMEOUT, label: str = "handler", echo=None) -> subprocess.CompletedProcess:
+        """
+        Runs `python <module_path> <args>` in a warm worker. Mirrors process_runner.run():
+        returns a CompletedProcess with bounded output (.streamed, .spilled) and raises
+        subprocess.TimeoutExpired or IdleTimeout. With profile set, the call runs under
+        cProfile and the stats are saved there.
+        """
+        cmd = [sys.executable, str(module_path)] + list(args)
+        worker = self._acquire()
+        started = time.monotonic()
+        try:
+            worker.send(str(module_path), args, profile)
+            captures, live, expired = process_runner.collect(worker.chunks, label, timeout, idle_timeout, echo, started)
+        except BaseException:
+            self._discard(worker)
+            raise
+
+        stdout, stderr = captures["stdout"].text(), captures["stderr"].text()
+        if expired is not None:
+            self._discard(worker)
+            raise expired(cmd, idle_timeout if expired is process_runner.IdleTimeout else timeout, output=stdout, stderr=stderr)
+        if worker.reply is None:
+            self._discard(worker)
+            code = worker.process.returncode
+            return subprocess.CompletedProcess(
+                cmd, code if code else 1, stdout,
+                f"{stderr}The handler crashed its worker process (exit code {code})."
+            )
+
+        self._release(worker)
+        result = subprocess.CompletedProcess(cmd, worker.reply["returncode"], stdout, stderr)
+        result.streamed = live
+        result.spilled = [c.spill_path for c in captures.values() if c.spill_path]
+        return result
+
+    def shutdown(self):
+        with self._cond:
+            workers = [w for w in self._all if isinstance(w, _Worker)]
+            self._all, self._idle = [], []
+        for worker in workers:
+            worker.kill()
+
+
+_pool = None
+
+
+def get_pool() -> HandlerPool:
+    global _pool
+    if _pool is None:
+        _pool = HandlerPool()
+        atexit.register(_pool.shutdown)
+    return _pool
+
+
+def run(module_path, args, timeout: float = DEFAULT_TIMEOUT, profile: str = None,
+        idle_timeout: float = process_runner.IDLE_TIMEOUT, label: str = "handler", echo=None) -> subprocess.CompletedProcess:
+    """Run a handler through the shared pool (see HandlerPool.run)."""
+    return get_pool().run(module_path, args, timeout, profile, idle_timeout, label, echo)
+
+
+# --- Worker side ---
+
+def _inside(root: str, path: str) -> bool:
+    try:
+        return os.path.commonpath([os.path.abspath(root), path]) == os.path.abspath(root)
+    except ValueError:
+        return False  # another drive
+
+
+def _forget_project_modules(loaded_before: set, roots: list):
+    """Drops modules a call imported from the project (not the Python installation)."""
+    installed = {sys.prefix, sys.base_prefix}
+    for name in set(sys.modules) - loaded_before:
+        file = getattr(sys.modules[name], "__file__", None)
+        if not file:
+            continue
+        file = os.path.abspath(file)
+        if any(_inside(r, file) for r in roots) and not any(_inside(r, file) for r in installed):
+            del sys.modules[name]
+
+
+class _Forwarder(threading.Thread):
+    """Sends what the handler writes to its output files over the protocol pipe, while it runs."""
+
+    def __init__(self, readers: dict, proto_out, lock):
+        super().__init__(daemon=True)
+        self.readers = readers
+        self.proto_out = proto_out
+        self.lock = lock
+        self.done = threading.Event()
+
+    def send_new(self):
+        for name, reader in self.readers.items():
+            while True:
+                data = reader.read(process_runner.READ_CHUNK)
+                if not data:
+                    break
+                # latin-1 maps every byte to one character, so the parent gets the exact bytes back
+                message = json.dumps({"stream": name, "data": data.decode('latin-1')})
+                with self.lock:
+                    self.proto_out.write(message + "\n")
+                    self.proto_out.flush()
+
+    def run(self):
+        while not self.done.wait(0.05):
+            self.send_new()
+
+    def finish(self):
+        """Stops the thread and sends the rest of the output."""
+        self.done.set()
+        self.join()
+        self.send_new()
+
+
+def _worker_main():
+    # Keep private copies of the protocol pipes, then point fds 0/1/2 elsewhere so that
+    # handler output (including child processes they spawn) can't corrupt the protocol.
+    proto_in = os.fdopen(os.dup(0), 'r', encoding='utf-8')
+    proto_out = os.fdopen(os.dup(1), 'w', encoding='utf-8')
+    proto_lock = threading.Lock()
+    # Named files: the forwarder reads them through handles of its own, with their own offsets
+    out_file = tempfile.NamedTemporaryFile(prefix="seedling-handler-", suffix=".out", delete=False)
+    err_file = tempfile.NamedTemporaryFile(prefix="seedling-handler-", suffix=".err", delete=False)
+    readers = {"stdout": open(out_file.name, 'rb'), "stderr": open(err_file.name, 'rb')}
+    for f in (out_file, err_file):
+        try:
+            os.remove(f.name)  # POSIX: gone from the disk even if the worker gets killed
+        except OSError:
+            atexit.register(lambda name=f.name: os.path.exists(name) and os.remove(name))
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.dup2(out_file.fileno(), 1)
+    os.dup2(err_file.fileno(), 2)
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.stderr.reconfigure(encoding='utf-8')
+
+    for line in proto_in:
+        request = json.loads(line)
+        path, args = request["path"], request["args"]
+        # Same view of the world a fresh `python handlers/x.py ...` would get
+        os.chdir(request["cwd"])
+        sys.argv = [path] + args
+        handler_dir = os.path.dirname(path)
+        if handler_dir not in sys.path:
+            sys.path.insert(0, handler_dir)
+
+        returncode = 0
+        profiler = cProfile.Profile() if request.get("profile") else None
+        loaded_before = set(sys.modules)
+        forwarder = _Forwarder(readers, proto_out, proto_lock)
+        forwarder.start()
+        try:
+            if profiler:
+                profiler.enable()
+            try:
+                runpy.run_path(path, run_name="__main__")
+            finally:
+                if profiler:
+                    profiler.disable()
+                _forget_project_modules(loaded_before, [handler_dir, request["cwd"]])
+        except SystemExit as e:
+            if e.code not in (None, 0):
+                returncode = e.code if isinstance(e.code, int) else 1
+                if not isinstance(e.code, int):
+                    print(e.code, file=sys.stderr)
+        except BaseException:
+            traceback.print_exc()
+            returncode = 1
+
+        if profiler:
+            try:
+                profiler.dump_stats(request["profile"])
+            except OSError as e:
+                print(f"[WARNING] Could not save the profile: {e}", file=sys.stderr)
+        sys.stdout.flush()
+        sys.stderr.flush()
+        forwarder.finish()
+        for f in (out_file, err_file):
+            f.seek(0)  # shares its offset with fd 1/2, so the next handler writes from the start again
+            f.truncate()
+        for reader in readers.values():
+            reader.seek(0)
+        with proto_lock:
+            proto_out.write(json.dumps({"returncode": returncode}) + "\n")
+            proto_out.flush()
+
+
+if __name__ == "__main__":
+    if "--worker" in sys.argv[1:]:
+        _worker_main()
+    else:
+        print("Usage: python handler_pool.py --worker  (started automatically by cli_tool.py)")
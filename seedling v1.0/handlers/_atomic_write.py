@@ -0,0 +1,36 @@
+# MIT License - Copyright (c) 2025 Viktor Kirschner
+"""
+Shared by the handlers that rewrite files (edit_line, modify_command, apply_patch).
+Not a tool itself: the leading underscore keeps it out of the tool index.
+"""
+import os
+import tempfile
+from pathlib import Path
+
+def line_ending(path: Path) -> str:
+    """The newline style of an existing file ("\\r\\n" or "\\n"); "\\n" for a new or empty one."""
+    try:
+        with open(path, 'rb') as f:
+            return "\r\n" if b"\r\n" in f.read() else "\n"
+    except OSError:
+        return "\n"
+
+def write_atomic(path: Path, text: str):
+    """
+    Writes text exactly as given (no newline translation) through a temporary file in the
+    same directory and a rename, so the file is never half-written and a link into the
+    tool library is replaced, not written through. An existing file keeps its permissions,
+    plus write access for the owner: library copies are read-only.
+    """
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+        if path.exists():
+            os.chmod(tmp_path, path.stat().st_mode & 0o7777 | 0o200)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,405 @@
+# MIT License - Copyright (c) 2025 Viktor Kirschner
+import os
+import re
+import sys
+import difflib
+sys.stdout.reconfigure(encoding='utf-8')
+from pathlib import Path
+from _atomic_write import write_atomic
+
+# Search/replace block markers
+SEARCH_MARKER = "<<<<<<< SEARCH"
+DIVIDER_MARKER = "======="
+REPLACE_MARKER = ">>>>>>> REPLACE"
+
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+# Fuzzy matching: context lines that may be ignored at each end of a hunk
+FUZZ_CONTEXT = 2
+
+class PatchError(Exception):
+    """Raised when a patch can't be parsed."""
+    def __init__(self, message):
+        self.message = message
+        super().__init__(self.message)
+
+class Hunk:
+    """One change: old_lines are replaced by new_lines, near line `hint` if known."""
+
+    def __init__(self, path: str, old_lines: list, new_lines: list, hint: int = None, label: str = "",
+                 new_file: bool = False):
+        self.path = path
+        self.new_file = new_file  # "--- /dev/null": the file must not exist yet
+        self.old_lines = old_lines
+        self.new_lines = new_lines
+        self.hint = hint  # 1-based line number from a unified diff header
+        self.label = label
+        self.start = None  # 0-based position found during validation
+        self.error = None
+        self.note = ""  # how the hunk was matched, if not exactly
+
+# --- Parsing ---
+
+def _strip_prefix(path: str) -> str:
+    path = path.split("\t", 1)[0].strip()
+    if path.startswith(("a/", "b/")) and not Path(path).exists():
+        return path[2:]
+    return path
+
+def parse_unified_diff(text: str, default_path: str = None) -> list:
+    """
+    Parses a unified diff (one or more files) into hunks. Without ---/+++ headers the
+    hunks are for default_path; a bare "@@" header (no line numbers) is accepted too.
+    A hunk runs until the next header: the line counts in "@@ -a,b +c,d @@" are often
+    wrong in model output, so only the start line is used.
+    """
+    hunks = []
+    lines = text.splitlines()
+    path = default_path
+    new_file = False
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if line.startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ "):
+            old_path, new_path = _strip_prefix(line[4:]), _strip_prefix(lines[i + 1][4:])
+            if new_path == "/dev/null":
+                raise PatchError(f"Deleting files is not supported by apply_patch ('{old_path}'). Use a delete command instead.")
+            path = new_path
+            new_file = old_path == "/dev/null"
+            i += 2
+            continue
+        match = HUNK_HEADER.match(line)
+        if not match and not line.startswith("@@"):
+            i += 1
+            continue
+        if path is None:
+            raise PatchError(f"Hunk '{line}' has no '--- a/file' / '+++ b/file' header before it.")
+        old_lines, new_lines = [], []
+        i += 1
+        while i < len(lines):
+            body = lines[i]
+            if body.startswith("@@") or (body.startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ ")):
+                break
+            if body.startswith("\\"):
+                pass  # "\ No newline at end of file"
+            elif body.startswith("-"):
+                old_lines.append(body[1:])
+            elif body.startswith("+"):
+                new_lines.append(body[1:])
+            elif body.startswith(" ") or body == "":
+                # Editors and models often drop the space in front of empty context lines
+                old_lines.append(body[1:])
+                new_lines.append(body[1:])
+            else:
+                break
+            i += 1
+        # Trailing blank lines are just the gap before the next hunk or the end of the reply
+        while old_lines and new_lines and old_lines[-1] == new_lines[-1] == "":
+            old_lines.pop()
+            new_lines.pop()
+        if not match:
+            hunks.append(Hunk(path, old_lines, new_lines, label=f"hunk {len(hunks) + 1}", new_file=new_file))
+            continue
+        # A pure insertion ("-10,0") goes after line 10; anything else starts at that line
+        hint = int(match.group(1)) + (1 if match.group(2) == "0" else 0)
+        hunks.append(Hunk(path, old_lines, new_lines, hint, label=line.split("@@")[1].strip(), new_file=new_file))
+    return hunks
+
+def parse_search_replace(text: str, default_path: str = None) -> list:
+    """
+    Parses search/replace blocks. The target file is the line just before each
+    <<<<<<< SEARCH marker, or default_path (--file=...) if that line is not a path.
+    """
+    hunks = []
+    lines = text.splitlines()
+    i = 0
+    while i < len(lines):
+        if lines[i].strip() != SEARCH_MARKER:
+            i += 1
+            continue
+        previous = lines[i - 1].strip().strip("`*: ") if i > 0 else ""
+        # Only a line that looks like a path names the file, not a sentence of explanation
+        looks_like_path = previous and not previous.startswith(("=", ">", "<")) and (" " not in previous or Path(previous).is_file())
+        path = previous if looks_like_path else default_path
+        if not path:
+            raise PatchError(f"Search/replace block {len(hunks) + 1} names no file. Put the path on the line before '{SEARCH_MARKER}' or pass --file=<path>.")
+        try:
+            divider = next(j for j in range(i + 1, len(lines)) if lines[j].strip() == DIVIDER_MARKER)
+            end = next(j for j in range(divider + 1, len(lines)) if lines[j].strip() == REPLACE_MARKER)
+        except StopIteration:
+            raise PatchError(f"Search/replace block {len(hunks) + 1} is missing its '{DIVIDER_MARKER}' or '{REPLACE_MARKER}' line.")
+        hunks.append(Hunk(path, lines[i + 1:divider], lines[divider + 1:end], label=f"block {len(hunks) + 1}"))
+        i = end + 1
+    return hunks
+
+def parse_patch(text: str, default_path: str = None) -> list:
+    if SEARCH_MARKER in text:
+        hunks = parse_search_replace(text, default_path)
+    else:
+        hunks = parse_unified_diff(text, default_path)
+    if not hunks:
+        raise PatchError("No hunks found. Send a unified diff (---/+++/@@ lines) or search/replace blocks.")
+    return hunks
+
+# --- Validation and application ---
+
+def _trim_context(old_lines: list, new_lines: list, fuzz: int):
+    """Drops up to `fuzz` unchanged context lines from each end of a hunk (like patch --fuzz)."""
+    prefix = 0
+    while prefix < min(len(old_lines), len(new_lines)) and old_lines[prefix] == new_lines[prefix]:
+        prefix += 1
+    suffix = 0
+    while (suffix < min(len(old_lines), len(new_lines)) - prefix
+           and old_lines[-1 - suffix] == new_lines[-1 - suffix]):
+        suffix += 1
+    lead, tail = min(fuzz, prefix), min(fuzz, suffix)
+    return old_lines[lead:len(old_lines) - tail], new_lines[lead:len(new_lines) - tail], lead
+
+def _indent(line: str) -> str:
+    return line[:len(line) - len(line.lstrip())]
+
+def _reindent(file_block: list, old_lines: list, new_lines: list) -> list:
+    """Gives new_lines the file's indentation, mapped from how old_lines differ from the file."""
+    mapping = {_indent(o): _indent(f) for f, o in zip(file_block, old_lines) if o.strip()}
+    result = []
+    for line in new_lines:
+        indent = _indent(line)
+        # The longest known indentation this line starts with
+        key = max((k for k in mapping if indent.startswith(k)), key=len, default=None)
+        if line.strip() and key is not None:
+            line = mapping[key] + line[len(key):]
+        result.append(line)
+    return result
+
+def _find(file_lines: list, old_lines: list, hint, same, unique: bool = False):
+    """
+    Returns (start, None), (None, error) if the match is ambiguous, or (None, None).
+    With unique=True a match must be the only one, even if the diff gives a line number.
+    """
+    size = len(old_lines)
+    def matches_at(start):
+        return 0 <= start <= len(file_lines) - size and all(
+            same(a, b) for a, b in zip(file_lines[start:start + size], old_lines))
+    if hint is not None and not unique and matches_at(hint - 1):
+        return hint - 1, None
+    found = [s for s in range(len(file_lines) - size + 1) if same(file_lines[s], old_lines[0]) and matches_at(s)]
+    if len(found) == 1:
+        return found[0], None
+    if found:
+        if hint is None or unique:
+            lines_list = ", ".join(str(s + 1) for s in found[:5])
+            return None, f"the search text occurs {len(found)} times (lines {lines_list}); add context lines to make it unique"
+        return min(found, key=lambda s: abs(s - (hint - 1))), None
+    return None, None
+
+def _most_similar(file_lines: list, old_lines: list, hint):
+    """The window of the file most similar to old_lines: (start, similarity 0..1)."""
+    matcher = difflib.SequenceMatcher(autojunk=False)
+    matcher.set_seq2("\n".join(old_lines))  # seq2 is analysed once and reused
+    best_start, best_score = None, 0.0
+    for start in range(max(1, len(file_lines) - len(old_lines) + 1)):
+        matcher.set_seq1("\n".join(file_lines[start:start + len(old_lines)]))
+        if matcher.real_quick_ratio() < best_score or matcher.quick_ratio() < best_score:
+            continue
+        score = matcher.ratio()
+        closer = hint is not None and best_start is not None and abs(start - hint + 1) < abs(best_start - hint + 1)
+        if score > best_score or (score == best_score and closer):
+            best_start, best_score = start, score
+    return best_start, best_score
+
+# Line comparisons from strict to lenient; the first one that finds the hunk is used.
+# Only an exact match may be one of several; a lenient one must be unique in the file.
+MATCHERS = (
+    (None, lambda a, b: a == b),
+    ("ignoring trailing whitespace", lambda a, b: a.rstrip() == b.rstrip()),
+    ("ignoring indentation", lambda a, b: a.strip() == b.strip()),
+)
+
+def locate(file_lines: list, hunk: Hunk):
+    """
+    Finds where hunk.old_lines occur, from strict to fuzzy:
+      1. exact, then ignoring trailing whitespace, then ignoring indentation
+         (the replacement is re-indented to fit the file);
+      2. for a unified diff hunk with a line number, the same with up to FUZZ_CONTEXT
+         context lines dropped from each end (a search block has no context to drop).
+    Among several exact matches the one closest to the diff's line number is used; without
+    a line number, for a whitespace-only match or with context dropped, the match must be
+    unique. Lines that differ in anything but whitespace are never patched: the error
+    shows the most similar block instead. Anything but an exact match is noted in hunk.note.
+    Returns (0-based start, None) or (None, error message).
+    """
+    if not hunk.old_lines:
+        if hunk.hint is None:
+            return None, "the search text is empty"
+        return min(max(hunk.hint - 1, 0), len(file_lines)), None
+
+    for fuzz in range(FUZZ_CONTEXT + 1 if hunk.hint is not None else 1):
+        old_lines, new_lines, lead = _trim_context(hunk.old_lines, hunk.new_lines, fuzz)
+        if not old_lines or (fuzz and len(old_lines) == len(hunk.old_lines)):
+            break  # nothing (more) to trim
+        hint = hunk.hint + lead if hunk.hint is not None else None
+        for how, same in MATCHERS:
+            start, error = _find(file_lines, old_lines, hint, same, unique=bool(how or fuzz))
+            if error:
+                return None, error
+            if start is None:
+                continue
+            notes = [how] if how else []
+            if how == "ignoring indentation":
+                new_lines = _reindent(file_lines[start:start + len(old_lines)], old_lines, new_lines)
+            if fuzz:
+                notes.append(f"fuzz {fuzz}: outer context lines ignored")
+            hunk.old_lines, hunk.new_lines, hunk.note = old_lines, new_lines, ", ".join(notes)
+            return start, None
+
+    start, score = _most_similar(file_lines, hunk.old_lines, hunk.hint)
+    first = next((l for l in hunk.old_lines if l.strip()), hunk.old_lines[0])
+    error = f"context not found (first line: \"{first.strip()}\")"
+    if start is not None and score > 0.3:
+        # Show the model what is really there so it can correct the hunk
+        block = file_lines[start:start + len(hunk.old_lines)]
+        error += f". Closest match is lines {start + 1}-{start + len(block)} ({score:.0%} similar):\n"
+        error += "\n".join(f"        {start + 1 + i:4d}: {line}" for i, line in enumerate(block))
+    return None, error
+
+def _read_lines(path: Path):
+    """The file's lines plus the newline style and trailing-newline flag to write back."""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        text = f.read()
+    newline = "\r\n" if "\r\n" in text else "\n"
+    return text.splitlines(), newline, text.endswith(("\n", "\r"))
+
+def apply_hunks(hunks: list, dry_run: bool = False):
+    """
+    Validates every hunk against the files on disk, then - only if all of them can be
+    placed - rewrites each touched file once. Returns (ok, per-hunk report lines).
+    """
+    project_dir = os.path.abspath(os.getcwd())
+    by_file = {}
+    for hunk in hunks:
+        by_file.setdefault(hunk.path, []).append(hunk)
+
+    new_texts = {}
+    for path_str, file_hunks in by_file.items():
+        target = Path(os.path.abspath(path_str))
+        if os.path.commonpath([project_dir, str(target)]) != project_dir:
+            for hunk in file_hunks:
+                hunk.error = "the file is outside of the project directory"
+            continue
+        if target.exists() and any(h.new_file for h in file_hunks):
+            for hunk in file_hunks:
+                hunk.error = "the patch creates this file, but it already exists"
+            continue
+        if target.is_file():
+            try:
+                file_lines, newline, trailing_newline = _read_lines(target)
+            except (OSError, UnicodeDecodeError) as e:
+                for hunk in file_hunks:
+                    hunk.error = f"cannot read the file: {e}"
+                continue
+        elif all(not h.old_lines for h in file_hunks):
+            file_lines, newline, trailing_newline = [], "\n", True  # new file
+        else:
+            for hunk in file_hunks:
+                hunk.error = "file not found"
+            continue
+
+        for hunk in file_hunks:
+            hunk.start, hunk.error = locate(file_lines, hunk)
+        placed = sorted((h for h in file_hunks if h.error is None), key=lambda h: h.start)
+        for earlier, later in zip(placed, placed[1:]):
+            if later.start < earlier.start + len(earlier.old_lines):
+                later.error = f"overlaps with {earlier.label or 'an earlier hunk'}"
+        if any(h.error for h in file_hunks):
+            continue
+
+        # One pass over the file, back to front so earlier positions stay valid
+        for hunk in reversed(placed):
+            file_lines[hunk.start:hunk.start + len(hunk.old_lines)] = hunk.new_lines
+        new_texts[target] = newline.join(file_lines) + (newline if trailing_newline and file_lines else "")
+
+    report = []
+    for hunk in hunks:
+        where = f"{hunk.path} {hunk.label}".strip()
+        if hunk.error:
+            report.append(f"  - FAILED  {where}: {hunk.error}")
+        else:
+            report.append(f"  - OK      {where}: -{len(hunk.old_lines)} +{len(hunk.new_lines)} lines at line {hunk.start + 1}" + (f" ({hunk.note})" if hunk.note else ""))
+
+    ok = all(h.error is None for h in hunks)
+    if ok and not dry_run:
+        for target, text in new_texts.items():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            write_atomic(target, text)
+    return ok, report
+
+def run(*args):
+    """
+    Applies several edits to one or more files at once.
+
+    Usage: apply_patch <patch_file> [--file=<path>] [--dry-run]
+           apply_patch --patch="<patch text>" [--file=<path>] [--dry-run]
+
+    The patch is either a unified diff or search/replace blocks:
+        path/to/file.py
+        <<<<<<< SEARCH
+        exact lines to find
+        =======
+        replacement lines
+        >>>>>>> REPLACE
+
+    All hunks are validated first; if any of them can't be placed, no file is changed.
+    Each file is then rewritten once, atomically (temp file + rename).
+
+    Write longer patches with create_file_begin (e.g. to patches/fix.diff) and pass the
+    file; short patches without quotes can be sent inline with --patch="...".
+    """
+    patch_text = None
+    patch_file = None
+    default_path = None
+    dry_run = False
+    for arg in args:
+        if arg.startswith("--patch="):
+            # The model sometimes sends newlines as '\\n' strings
+            patch_text = arg.split("=", 1)[1]
+            if "\n" not in patch_text:
+                patch_text = patch_text.replace("\\n", "\n")
+        elif arg.startswith("--file="):
+            default_path = arg.split("=", 1)[1]
+        elif arg == "--dry-run":
+            dry_run = True
+        elif patch_file is None:
+            patch_file = arg
+        else:
+            return f"[ERROR] Unexpected argument '{arg}'. Usage: apply_patch <patch_file> [--file=<path>] [--dry-run]"
+
+    if patch_text is None:
+        if not patch_file:
+            return "[ERROR] No patch provided. Usage: apply_patch <patch_file> [--file=<path>] [--dry-run] or apply_patch --patch=\"<patch text>\""
+        try:
+            with open(patch_file, 'r', encoding='utf-8') as f:
+                patch_text = f.read()
+        except OSError as e:
+            return f"[ERROR] Cannot read patch file '{patch_file}': {e}"
+
+    try:
+        hunks = parse_patch(patch_text, default_path)
+        ok, report = apply_hunks(hunks, dry_run)
+    except PatchError as e:
+        return f"[ERROR] Invalid patch: {e.message}"
+    except Exception as e:
+        return f"[ERROR] An unexpected error occurred while applying the patch: {e}"
+
+    files = len({h.path for h in hunks})
+    if not ok:
+        failed = sum(1 for h in hunks if h.error)
+        return "\n".join([f"[ERROR] {failed} of {len(hunks)} hunk(s) could not be applied. No files were changed."] + report)
+    if dry_run:
+        return "\n".join([f"[INFO] Dry run: all {len(hunks)} hunk(s) apply cleanly to {files} file(s). No files were changed."] + report)
+    return "\n".join([f"[SUCCESS] Applied {len(hunks)} hunk(s) to {files} file(s)."] + report)
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        print(run(*sys.argv[1:]))
+    else:
+        print("Usage: python apply_patch.py <patch_file> [--file=<path>] [--dry-run]")
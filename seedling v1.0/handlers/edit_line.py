@@ -2,6 +2,7 @@
 import sys
 sys.stdout.reconfigure(encoding='utf-8')
 from pathlib import Path
+from _atomic_write import write_atomic
 
 # The directory where command scripts are stored by default.
 HANDLERS_DIR = "handlers"
@@ -9,6 +10,7 @@ HANDLERS_DIR = "handlers"
 def run(*args):
     """
     Finds a specific line in a file and replaces it, using flexible pathing.
+    Usage: edit_line <name> "<exact_line_to_find>" "<replacement_line>"
     """
     if len(args) != 3:
         return "[ERROR] Incorrect usage. Required: edit_line <name> \"<exact_line_to_find>\" \"<replacement_line>\""
@@ -47,22 +49,20 @@ def run(*args):
     # --- End of Fix ---
 
     try:
-        # Read all lines from the file into a list
-        with open(final_path, 'r', encoding='utf-8') as f:
+        # Read all lines from the file into a list (newline='': each line keeps its own ending)
+        with open(final_path, 'r', encoding='utf-8', newline='') as f:
             lines = f.readlines()
 
         # Find the line to replace
         line_found = False
         target_line_stripped = line_to_find.strip()
         
-        # Ensure the replacement line ends with a newline character
-        if not replacement_line.endswith('\n'):
-            replacement_line += '\n'
-
         for i, line in enumerate(lines):
             # Compare lines by stripping whitespace to avoid minor formatting issues
             if line.strip() == target_line_stripped:
-                lines[i] = replacement_line
+                # The replacement ends the way the replaced line did (\r\n stays \r\n)
+                ending = line[len(line.rstrip('\r\n')):] or '\n'
+                lines[i] = replacement_line.rstrip('\r\n') + ending
                 line_found = True
                 break # Stop after finding and replacing the first match
 
@@ -70,8 +70,7 @@ def run(*args):
             return f"[ERROR] The target line \"{line_to_find}\" was not found in the file. No changes were made."
 
         # Write the modified list of lines back to the file
-        with open(final_path, 'w', encoding='utf-8') as f:
-            f.writelines(lines)
+        write_atomic(final_path, "".join(lines))
         
         return f"[SUCCESS] The line in file '{final_path}' was edited successfully."
 
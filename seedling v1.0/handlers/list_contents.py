@@ -1,18 +1,192 @@
 # MIT License - Copyright (c) 2025 Viktor Kirschner
 import os
 import sys
+import time
+import fnmatch
 sys.stdout.reconfigure(encoding='utf-8')
 from pathlib import Path
 
+# Entries shown per page unless --limit says otherwise, so one huge directory can't flood the context
+DEFAULT_LIMIT = 500
+# Never descended into (still listed) unless --no-gitignore is given
+ALWAYS_SKIPPED_DIRS = {".git"}
+
+# --- .gitignore support ---
+
+class GitIgnore:
+    """The patterns of one .gitignore file (the common subset of the gitignore syntax)."""
+
+    def __init__(self, base_dir: str, lines):
+        self.base_dir = base_dir
+        self.rules = []  # (pattern, negated, dir_only, anchored)
+        for line in lines:
+            line = line.rstrip("\n").rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negated = line.startswith("!")
+            if negated:
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            # A slash anywhere but the end ties the pattern to the .gitignore's directory
+            anchored = "/" in line
+            line = line.lstrip("/")
+            if line:
+                self.rules.append((line, negated, dir_only, anchored))
+
+    @classmethod
+    def load(cls, directory: str):
+        try:
+            with open(os.path.join(directory, ".gitignore"), 'r', encoding='utf-8', errors='ignore') as f:
+                return cls(directory, f.readlines())
+        except OSError:
+            return None
+
+    def match(self, path: str, is_dir: bool):
+        """True/False if a rule decides about path, None if no rule applies."""
+        rel_path = os.path.relpath(path, self.base_dir).replace(os.sep, "/")
+        name = rel_path.rsplit("/", 1)[-1]
+        decision = None
+        for pattern, negated, dir_only, anchored in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if anchored:
+                hit = fnmatch.fnmatchcase(rel_path, pattern) or (
+                    pattern.startswith("**/") and fnmatch.fnmatchcase(rel_path, pattern[3:]))
+            else:
+                hit = fnmatch.fnmatchcase(name, pattern)
+            if hit:
+                decision = not negated  # the last matching rule wins
+        return decision
+
+def is_ignored(path: str, is_dir: bool, ignore_stack: list) -> bool:
+    # Deeper .gitignore files override the ones above them
+    for ignore in reversed(ignore_stack):
+        decision = ignore.match(path, is_dir)
+        if decision is not None:
+            return decision
+    return False
+
+# --- Formatting ---
+
+def format_size(size: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+def format_entry(entry, is_dir: bool, depth: int, show_size: bool, show_mtime: bool) -> str:
+    item_type = "DIR " if is_dir else "FILE"
+    columns = ""
+    if show_size or show_mtime:
+        # Only stat when a column needs it; the type comes from the cached directory entry
+        try:
+            st = entry.stat()
+            if show_size:
+                columns += ("-" if is_dir else format_size(st.st_size)).rjust(10) + " "
+            if show_mtime:
+                columns += time.strftime("%Y-%m-%d %H:%M", time.localtime(st.st_mtime)) + " "
+        except OSError:
+            columns = ("?".rjust(10) + " " if show_size else "") + ("?".ljust(17) if show_mtime else "")
+    indent = "  " * depth
+    return f"  {indent}- {item_type.ljust(5)} {columns}{entry.name}"
+
+# --- Traversal ---
+
+def walk(root: str, max_depth: int, includes: list, excludes: list, use_gitignore: bool):
+    """
+    Yields (entry, is_dir, depth) in sorted, depth-first order using os.scandir, so every
+    entry's type comes from the directory listing itself instead of an extra stat call.
+    """
+    def matches_any(entry, patterns):
+        rel_path = os.path.relpath(entry.path, root).replace(os.sep, "/")
+        return any(fnmatch.fnmatch(entry.name, p) or fnmatch.fnmatch(rel_path, p) for p in patterns)
+
+    def visit(directory: str, depth: int, ignore_stack: list):
+        if use_gitignore:
+            ignore = GitIgnore.load(directory)
+            if ignore:
+                ignore_stack = ignore_stack + [ignore]
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except PermissionError:
+            return
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if excludes and matches_any(entry, excludes):
+                continue
+            if use_gitignore and is_ignored(entry.path, is_dir, ignore_stack):
+                continue
+            # Include globs select files; directories stay visible so the tree keeps its shape
+            if is_dir or not includes or matches_any(entry, includes):
+                yield entry, is_dir, depth
+            descend = is_dir and not entry.is_symlink() and (max_depth == 0 or depth + 1 < max_depth)
+            if descend and not (use_gitignore and entry.name in ALWAYS_SKIPPED_DIRS):
+                yield from visit(entry.path, depth + 1, ignore_stack)
+
+    yield from visit(root, 0, [])
+
 def run(*args):
     """
     Lists the contents of a specified directory with details.
     Provides clear output for empty directories or errors.
-    Usage: list_contents [optional_path]
+
+    Usage: list_contents [optional_path] [options]
+
+    Options:
+        --depth=N         Recurse N levels deep (default: 1, 0 = unlimited)
+        --include=GLOB    Only list files matching GLOB (repeatable, comma separated)
+        --exclude=GLOB    Skip files and directories matching GLOB (repeatable, comma separated)
+        --no-gitignore    Also list what .gitignore files exclude (and descend into .git)
+        --size            Show a size column
+        --mtime           Show a last-modified column
+        --limit=N         Entries per page (default: 500)
+        --page=N          Page to show (default: 1)
     """
+    target_path_str = '.'
     try:
-        # Use the first argument as the path, or default to the current directory '.'
-        target_path_str = args[0] if args else '.'
+        max_depth = 1
+        includes, excludes = [], []
+        use_gitignore = True
+        show_size = show_mtime = False
+        limit, page = DEFAULT_LIMIT, 1
+
+        for arg in args:
+            if not arg.startswith("--"):
+                # A plain argument is the path, default is the current directory '.'
+                target_path_str = arg
+                continue
+            name, _, value = arg[2:].partition("=")
+            if name in ("depth", "limit", "page"):
+                try:
+                    number = int(value)
+                except ValueError:
+                    return f"[ERROR] Invalid --{name} value '{value}'. Use a number."
+                if number < (0 if name == "depth" else 1):
+                    return f"[ERROR] Invalid --{name} value '{value}'."
+                if name == "depth":
+                    max_depth = number
+                elif name == "limit":
+                    limit = number
+                else:
+                    page = number
+            elif name == "include":
+                includes += [p for p in value.split(",") if p]
+            elif name == "exclude":
+                excludes += [p for p in value.split(",") if p]
+            elif name == "no-gitignore":
+                use_gitignore = False
+            elif name == "size":
+                show_size = True
+            elif name == "mtime":
+                show_mtime = True
+            else:
+                return f"[ERROR] Unknown option '{arg}'. Usage: list_contents [path] [--depth=N] [--include=GLOB] [--exclude=GLOB] [--no-gitignore] [--size] [--mtime] [--limit=N] [--page=N]"
+
         target_path = Path(target_path_str).resolve()
 
         # --- Error Handling ---
@@ -20,20 +194,36 @@ def run(*args):
             return f"[ERROR] The path '{target_path}' does not exist."
         if not target_path.is_dir():
             return f"[ERROR] The path '{target_path}' is a file, not a directory."
+        if not os.access(target_path, os.R_OK):
+            raise PermissionError
 
         # --- Listing Contents ---
-        items = os.listdir(target_path)
+        # Only the requested page is formatted; the walk stops one entry after it
+        first, last = (page - 1) * limit, page * limit
+        output_lines = []
+        seen = 0
+        for entry, is_dir, depth in walk(str(target_path), max_depth, includes, excludes, use_gitignore):
+            if seen >= last:
+                break
+            if seen >= first:
+                output_lines.append(format_entry(entry, is_dir, depth, show_size, show_mtime))
+            seen += 1
+        else:
+            seen = -1  # walked to the end, there is no next page
 
-        if not items:
+        if not output_lines:
+            if page > 1:
+                return f"[INFO] Page {page} of '{target_path}' is empty (the listing has fewer than {first + 1} entries)."
             return f"[INFO] The directory '{target_path}' is empty."
 
         # --- Formatting the Output ---
-        output_lines = [f"Contents of '{target_path}':"]
-        for item_name in sorted(items):
-            item_path = target_path / item_name
-            item_type = "DIR " if item_path.is_dir() else "FILE"
-            output_lines.append(f"  - {item_type.ljust(5)} {item_name}")
-        
+        output_lines.insert(0, f"Contents of '{target_path}':")
+        if seen != -1:
+            output_lines.append(f"[INFO] Showing entries {first + 1}-{last}. More entries follow: use --page={page + 1}"
+                                f" (or narrow the listing with --include/--exclude/--depth).")
+        elif page > 1:
+            output_lines.append(f"[INFO] Showing entries {first + 1}-{first + len(output_lines) - 1} (last page).")
+
         return "\n".join(output_lines)
 
     except PermissionError:
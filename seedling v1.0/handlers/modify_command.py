@@ -2,6 +2,7 @@
 import sys
 sys.stdout.reconfigure(encoding='utf-8')
 from pathlib import Path
+from _atomic_write import line_ending, write_atomic
 
 # The directory where commands are stored by default.
 HANDLERS_DIR = "handlers"
@@ -10,6 +11,7 @@ def run(*args):
     """
     Overwrites an existing command file with new code, using the same flexible
     pathing logic as the main CLI tool.
+    Usage: modify_command <name> "<new_code>"
     """
     if len(args) != 2:
         return "[ERROR] Incorrect usage. Required: modify_command <name> \"<new_code>\""
@@ -53,11 +55,11 @@ def run(*args):
     # --- End of New Logic ---
 
     try:
-        # Write the new code to the file, overwriting existing content
-        with open(final_path, 'w', encoding='utf-8') as f:
-            # The AI sometimes sends newlines as '\\n' strings, so we process them.
-            processed_code = new_code.replace('\\n', '\n')
-            f.write(processed_code)
+        # The AI sometimes sends newlines as '\\n' strings, so we process them.
+        processed_code = new_code.replace('\\n', '\n')
+        # Write the new code to the file, overwriting existing content, in the file's newline style
+        newline = line_ending(final_path)
+        write_atomic(final_path, newline.join(processed_code.replace('\r\n', '\n').split('\n')))
         return f"[SUCCESS] Command '{command_name}' at '{final_path}' has been modified successfully."
     except Exception as e:
         return f"[ERROR] An unexpected error occurred while modifying command '{command_name}': {e}"
@@ -2,7 +2,12 @@
 # Seedling has improved this tool for itself
 import os
 import sys
+import json
+import mmap
+import codecs
+import hashlib
 import mimetypes
+from bisect import bisect_left
 from pathlib import Path
 
 # Reconfigure stdout for proper UTF-8 handling
@@ -12,41 +17,47 @@ sys.stdout.reconfigure(encoding='utf-8')
 MAX_CHARS = 50000
 MAX_LINES = 1000
 
+# Newline index for ranged reads: the number of newlines before every INDEX_BLOCK-sized
+# block of the file, cached on disk. Finding line N then means one lookup plus a scan of
+# a single block, so windows deep inside multi-GB logs are read in constant memory.
+INDEX_BLOCK = 1 << 20
+LINE_INDEX_DIR = os.path.join(".seedling_cache", "line_index")
+
+# Common text MIME types that don't start with text/
+TEXT_MIMES = {
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'application/x-yaml',
+    'application/x-httpd-php'
+}
+
 def is_binary(path: Path) -> bool:
-    """Checks if a file is likely binary using multiple methods."""
+    """Checks if a file is likely binary, reading only its first block once."""
     try:
-        # Method 1: Check for null bytes
+        # Method 1: Check MIME type (no I/O)
+        mime_type, _ = mimetypes.guess_type(str(path))
+        if mime_type and not mime_type.startswith('text/') and mime_type not in TEXT_MIMES:
+            return True
+
         with open(path, 'rb') as f:
             chunk = f.read(8192)
-            if b'\x00' in chunk:
-                return True
-        
-        # Method 2: Check MIME type
-        mime_type, _ = mimetypes.guess_type(str(path))
-        if mime_type and not mime_type.startswith('text/'):
-            # Common text MIME types that don't start with text/
-            text_mimes = {
-                'application/json',
-                'application/javascript',
-                'application/xml',
-                'application/x-yaml',
-                'application/x-httpd-php'
-            }
-            if mime_type not in text_mimes:
-                return True
-        
-        # Method 3: Try to decode as UTF-8
+
+        # Method 2: Check for null bytes
+        if b'\x00' in chunk:
+            return True
+
+        # Method 3: Try to decode as UTF-8 (a character cut off at the block end is fine)
         try:
-            with open(path, 'r', encoding='utf-8') as f:
-                f.read(8192)
+            codecs.getincrementaldecoder('utf-8')().decode(chunk, final=False)
             return False
         except UnicodeDecodeError:
             return True
-            
+
     except Exception:
         return True
 
-def format_content(content: str, show_line_numbers: bool = False, max_lines: int = None) -> str:
+def format_content(content: str, show_line_numbers: bool = False, max_lines: int = None, first_line: int = 1) -> str:
     """Format content with optional line numbers and line limits."""
     lines = content.splitlines()
     
@@ -58,7 +69,7 @@ def format_content(content: str, show_line_numbers: bool = False, max_lines: int
     
     if show_line_numbers:
         numbered_lines = []
-        for i, line in enumerate(lines, 1):
+        for i, line in enumerate(lines, first_line):
             numbered_lines.append(f"{i:4d}: {line}")
         formatted_content = "\n".join(numbered_lines)
     else:
@@ -66,6 +77,151 @@ def format_content(content: str, show_line_numbers: bool = False, max_lines: int
     
     return formatted_content, truncated
 
+# --- Ranged reading helpers (mmap based, constant memory) ---
+
+def _index_path(target_path: Path) -> str:
+    digest = hashlib.sha1(str(target_path).encode('utf-8')).hexdigest()
+    return os.path.join(LINE_INDEX_DIR, f"{digest}.json")
+
+def _block_hash(mm, counts: list) -> str:
+    """Hash of the last block the index covers, to tell an appended file from a rewritten one."""
+    block_start = (len(counts) - 2) * INDEX_BLOCK
+    return hashlib.sha1(mm[block_start:block_start + INDEX_BLOCK]).hexdigest() if block_start >= 0 else ""
+
+def load_line_index(target_path: Path, mm) -> list:
+    """
+    Returns counts where counts[i] is the number of newlines before byte i * INDEX_BLOCK,
+    for every complete block. The index is cached next to the workspace; if the file only
+    grew since (a log being appended to) and its last indexed block is unchanged, just the
+    new blocks are counted. Any other change rebuilds the index.
+    """
+    st = target_path.stat()
+    cache_file = _index_path(target_path)
+    counts = [0]
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached["block"] == INDEX_BLOCK and cached["size"] <= st.st_size:
+            if cached["size"] == st.st_size and cached["mtime_ns"] == st.st_mtime_ns:
+                return cached["counts"]
+            if cached["size"] < st.st_size and cached["last_block"] == _block_hash(mm, cached["counts"]):
+                counts = cached["counts"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    full_blocks = len(mm) // INDEX_BLOCK
+    for i in range(len(counts) - 1, full_blocks):
+        block_start = i * INDEX_BLOCK
+        counts.append(counts[-1] + mm[block_start:block_start + INDEX_BLOCK].count(b'\n'))
+
+    try:
+        os.makedirs(LINE_INDEX_DIR, exist_ok=True)
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump({"block": INDEX_BLOCK, "size": st.st_size, "mtime_ns": st.st_mtime_ns, "counts": counts,
+                       "last_block": _block_hash(mm, counts)}, f)
+    except OSError:
+        pass  # read-only directory: the index just isn't cached
+    return counts
+
+def line_number_at(mm, counts: list, offset: int) -> int:
+    """1-based number of the line containing byte `offset`."""
+    block = min(offset // INDEX_BLOCK, len(counts) - 1)
+    block_start = block * INDEX_BLOCK
+    return counts[block] + mm[block_start:offset].count(b'\n') + 1
+
+def line_start_offset(mm, counts: list, line_no: int):
+    """Byte offset where 1-based line `line_no` starts, or None past the end of the file."""
+    newlines_before = line_no - 1
+    if newlines_before <= 0:
+        return 0
+    # Last block that starts with fewer than the wanted number of newlines before it
+    block = bisect_left(counts, newlines_before) - 1
+    pos = block * INDEX_BLOCK - 1
+    for _ in range(newlines_before - counts[block]):
+        pos = mm.find(b'\n', pos + 1)
+        if pos == -1:
+            return None
+    return pos + 1 if pos + 1 < len(mm) else None
+
+def _align_to_char(mm, offset: int) -> int:
+    """Moves an offset forward past UTF-8 continuation bytes."""
+    while offset < len(mm) and (mm[offset] & 0xC0) == 0x80:
+        offset += 1
+    return offset
+
+def _tail_start(mm, n_lines: int) -> int:
+    """Byte offset where the last n_lines lines begin."""
+    pos = len(mm)
+    if pos and mm[pos - 1:pos] == b'\n':
+        pos -= 1  # a trailing newline does not start another line
+    for _ in range(n_lines):
+        pos = mm.rfind(b'\n', 0, pos)
+        if pos == -1:
+            return 0
+    return pos + 1
+
+def read_window(target_path: Path, filename: str, mode: str, value, show_line_numbers: bool,
+                raw_output: bool, max_lines: int) -> str:
+    """Reads one window of a file (--offset / --lines / --tail) through mmap."""
+    size = target_path.stat().st_size
+    if size == 0:
+        return f"--- Content of {filename} ---\n--- [INFO] File is empty. ---"
+
+    with open(target_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        counts = None
+        if mode == "lines":
+            first, last = value
+            counts = load_line_index(target_path, mm)
+            start = line_start_offset(mm, counts, first)
+            if start is None:
+                total = line_number_at(mm, counts, size - 1)
+                return f"[ERROR] Line {first} is past the end of '{filename}' ({total} lines)."
+            if last is not None:
+                max_lines = last - first + 1
+        elif mode == "tail":
+            start = _tail_start(mm, value)
+            max_lines = value
+        else:
+            if value >= size:
+                return f"[ERROR] Offset {value} is past the end of '{filename}' ({size:,} bytes)."
+            start = _align_to_char(mm, value)
+
+        # Cut the window at max_lines newlines and at most MAX_CHARS characters
+        end = start
+        for _ in range(max_lines):
+            end = mm.find(b'\n', end, min(size, start + MAX_CHARS * 4))
+            if end == -1:
+                end = min(size, start + MAX_CHARS * 4)
+                break
+            end += 1
+        content = mm[start:end].decode('utf-8', errors='ignore')
+        truncated_chars = len(content) > MAX_CHARS
+        if truncated_chars:
+            content = content[:MAX_CHARS]
+            end = start + len(content.encode('utf-8'))
+
+        first_line = 1
+        if show_line_numbers and not raw_output:
+            if counts is None:
+                counts = load_line_index(target_path, mm)
+            first_line = line_number_at(mm, counts, start)
+
+    output = [f"--- Content of {filename} ---"]
+    if raw_output:
+        output.append(content)
+    else:
+        formatted_content, _ = format_content(content, show_line_numbers, None, first_line)
+        output.append(formatted_content)
+
+    info = f"Showing bytes {start:,}-{end:,} of {size:,}"
+    if truncated_chars:
+        info += f", truncated to {MAX_CHARS} characters"
+    if end < size:
+        output.append(f"--- [INFO] {info}. Continue with --offset={end} ---")
+    else:
+        output.append(f"--- [INFO] {info}. End of file. ---")
+    return "\n".join(output)
+
 def run(*args):
     """
     Reads and returns the content of a specified text file.
@@ -77,6 +233,9 @@ def run(*args):
         --line-numbers    Show line numbers
         --max-lines=N     Limit output to N lines (default: 1000)
         --raw             Show raw content without formatting
+        --offset=N        Start reading at byte N (for paging through large files)
+        --lines=A:B       Show lines A to B (1-based, inclusive; A: or :B also work)
+        --tail=N          Show the last N lines
     """
     if not args:
         return "[ERROR] No filename provided. Usage: read_file <filename> [options]"
@@ -88,6 +247,7 @@ def run(*args):
     show_line_numbers = "--line-numbers" in options
     raw_output = "--raw" in options
     max_lines = None
+    window = None
     
     for opt in options:
         if opt.startswith("--max-lines="):
@@ -95,6 +255,26 @@ def run(*args):
                 max_lines = int(opt.split("=", 1)[1])
             except ValueError:
                 return "[ERROR] Invalid --max-lines value. Use a number."
+        elif opt.startswith("--offset="):
+            try:
+                window = ("offset", max(0, int(opt.split("=", 1)[1])))
+            except ValueError:
+                return "[ERROR] Invalid --offset value. Use a byte offset (number)."
+        elif opt.startswith("--tail="):
+            try:
+                window = ("tail", max(1, int(opt.split("=", 1)[1])))
+            except ValueError:
+                return "[ERROR] Invalid --tail value. Use a number of lines."
+        elif opt.startswith("--lines="):
+            first, _, last = opt.split("=", 1)[1].partition(":")
+            try:
+                first = max(1, int(first)) if first.strip() else 1
+                last = int(last) if last.strip() else None
+            except ValueError:
+                return "[ERROR] Invalid --lines value. Use --lines=START:END, e.g. --lines=200:260."
+            if last is not None and last < first:
+                return "[ERROR] Invalid --lines value: END is before START."
+            window = ("lines", (first, last))
     
     # Use pathlib for better path handling
     target_path = Path(filename).resolve()
@@ -117,15 +297,24 @@ def run(*args):
         mime_info = f" ({mime_type})" if mime_type else ""
         return f"[ERROR] Cannot read file: '{filename}' appears to be a binary file{mime_info}. Size: {file_size:,} bytes"
 
+    if window:
+        try:
+            return read_window(target_path, filename, window[0], window[1], show_line_numbers,
+                               raw_output, max_lines if max_lines else MAX_LINES)
+        except Exception as e:
+            return f"[ERROR] An unexpected error occurred while reading '{filename}': {e}"
+
     try:
-        # Read the file with proper encoding detection
-        with open(target_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
+        # Only read as much as can be shown: MAX_CHARS characters are at most 4 bytes each
+        file_size = target_path.stat().st_size
+        with open(target_path, 'rb') as f:
+            data = f.read(MAX_CHARS * 4)
+        content = data.decode('utf-8', errors='ignore')
         
         output = [f"--- Content of {filename} ---"]
         
         # Check if content is too large
-        if len(content) > MAX_CHARS:
+        if len(content) > MAX_CHARS or len(data) < file_size:
             content = content[:MAX_CHARS]
             truncated_chars = True
         else:
@@ -149,7 +338,7 @@ def run(*args):
                 info_parts.append(f"limited to {MAX_LINES} lines")
             
             if info_parts:
-                output.append(f"--- [INFO] File {', '.join(info_parts)}. ---")
+                output.append(f"--- [INFO] File {', '.join(info_parts)}. Use --lines, --offset or --tail to see more. ---")
             else:
                 output.append("--- [INFO] End of file. ---")
         else:
@@ -167,4 +356,4 @@ if __name__ == "__main__":
     if len(sys.argv) > 1:
         print(run(*sys.argv[1:]))
     else:
-        print("Usage: python read_file.py <filename> [--line-numbers] [--max-lines=N] [--raw]")
\ No newline at end of file
+        print("Usage: python read_file.py <filename> [--line-numbers] [--max-lines=N] [--raw] [--offset=N] [--lines=A:B] [--tail=N]")
@@ -0,0 +1,130 @@
+# MIT License - Copyright (c) 2025 Viktor Kirschner
+"""
+Buffered writer for log.html.
+
+The log used to be opened, stat-ed and closed for every single span. This writer keeps
+one handle open for the whole session, collects spans in memory and lets a background
+thread write them out in batches. Callers flush explicitly on step boundaries; the
+buffer is also flushed at exit and when the process dies from an unhandled exception.
+"""
+import os
+import sys
+import atexit
+import threading
+
+HTML_HEADER = (
+    "<!doctype html><html><head><meta charset='utf-8'>"
+    "<meta name='viewport' content='width=device-width,initial-scale=1'>"
+    "<title>Seedling's Log</title></head>\n"
+    "<body style=\"background:#000; color:#fff; font-family:monospace;\">\n"
+    "<pre style=\"white-space:pre-wrap; word-break:break-word;\">\n"
+)
+
+# Background flush interval (seconds) and the buffer size that triggers an early flush
+FLUSH_INTERVAL = 0.5
+FLUSH_THRESHOLD = 64 * 1024
+
+
+class HtmlLogWriter:
+    """Single-handle, batched appender for the HTML log."""
+
+    def __init__(self, path: str, flush_interval: float = FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._buffered_chars = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._file = None
+        self._thread = None
+
+    def _open(self):
+        # Called with the lock held: create the scaffold once, then keep appending
+        new_file = (not os.path.exists(self.path)) or os.path.getsize(self.path) == 0
+        self._file = open(self.path, 'a', encoding='utf-8')
+        if new_file:
+            self._file.write(HTML_HEADER)
+        self._thread = threading.Thread(target=self._flush_loop, name="html-log-flush", daemon=True)
+        self._thread.start()
+
+    def write(self, fragment: str):
+        """Queue an already-escaped HTML fragment."""
+        if not fragment:
+            return
+        with self._lock:
+            if self._closed:
+                return
+            if self._file is None:
+                self._open()
+            self._buffer.append(fragment)
+            self._buffered_chars += len(fragment)
+            if self._buffered_chars >= FLUSH_THRESHOLD:
+                self._wakeup.set()
+
+    def _drain(self):
+        # Called with the lock held
+        if self._buffer and self._file is not None:
+            self._file.write("".join(self._buffer))
+            self._file.flush()
+            self._buffer = []
+            self._buffered_chars = 0
+
+    def flush(self):
+        """Write everything buffered so far to disk."""
+        with self._lock:
+            self._drain()
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def close(self):
+        """Flush the remaining spans and release the file handle."""
+        with self._lock:
+            self._drain()
+            self._closed = True
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        self._wakeup.set()
+
+
+_writers = []
+
+
+def open_log(path: str) -> HtmlLogWriter:
+    """Create a writer that is flushed automatically at exit and on crashes."""
+    writer = HtmlLogWriter(path)
+    _writers.append(writer)
+    return writer
+
+
+def flush_all():
+    for writer in _writers:
+        try:
+            writer.flush()
+        except Exception:
+            pass
+
+
+def _close_all():
+    for writer in _writers:
+        try:
+            writer.close()
+        except Exception:
+            pass
+
+
+_previous_excepthook = sys.excepthook
+
+
+def _flush_on_crash(exc_type, exc, tb):
+    flush_all()
+    _previous_excepthook(exc_type, exc, tb)
+
+
+atexit.register(_close_all)
+sys.excepthook = _flush_on_crash
@@ -0,0 +1,52 @@
+# MIT License - Copyright (c) 2025 Viktor Kirschner
+"""
+Remembers which API keys were verified recently, so a fresh Seedling does not have to
+make a blocking models.list() call on every start. Only a SHA-256 of the key and base URL
+is stored (in ~/.seedling/verified_keys.json, shared by every workspace on the machine).
+"""
+import os
+import json
+import time
+import hashlib
+
+CACHE_FILE = os.path.join(os.path.expanduser("~"), ".seedling", "verified_keys.json")
+# How long a successful verification is trusted, in seconds (default: one day)
+TTL_SECONDS = int(os.getenv("SEEDLING_KEY_CACHE_TTL", str(24 * 3600)))
+
+
+def _fingerprint(api_key: str, base_url: str) -> str:
+    return hashlib.sha256(f"{base_url}\n{api_key.strip()}".encode('utf-8')).hexdigest()
+
+
+def _load() -> dict:
+    try:
+        with open(CACHE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def is_verified(api_key: str, base_url: str) -> bool:
+    """True if this key was verified against base_url within the TTL."""
+    if TTL_SECONDS <= 0:
+        return False
+    verified_at = _load().get(_fingerprint(api_key, base_url))
+    return verified_at is not None and time.time() - verified_at < TTL_SECONDS
+
+
+def remember(api_key: str, base_url: str):
+    """Record a successful verification. Failures to write the cache are ignored."""
+    entries = _load()
+    now = time.time()
+    # Drop expired entries while we are here
+    entries = {k: v for k, v in entries.items() if now - v < TTL_SECONDS}
+    entries[_fingerprint(api_key, base_url)] = now
+    try:
+        os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+        tmp_path = CACHE_FILE + f".{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, CACHE_FILE)
+    except OSError:
+        pass
+
@@ -0,0 +1,164 @@
+# MIT License - Copyright (c) 2025 Viktor Kirschner
+"""
+Record/replay cache for model calls.
+
+Every call to get_ai_response_with_history is keyed by a hash of the full payload
+(system prompt, history, model, endpoint and parameters); the connector's default model
+and BASE_URL are filled in first, so a recording made against one connector or model is
+not replayed for another. Modes, chosen with SEEDLING_LLM_CACHE:
+
+    passthrough  - no caching (default)
+    record       - call the API as usual and store every response on disk
+    replay       - answer from disk only; a missing entry raises CacheMiss, no network
+
+Recording a session once and replaying it lets cli_tool.main run deterministically and
+offline, e.g. for regression tests and benchmarks. The store is bounded: once it holds
+more than SEEDLING_LLM_CACHE_MAX entries, the least recently used ones are removed.
+An unknown mode leaves calls uncached and is reported through last_error.
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+import functools
+
+MODES = ("passthrough", "record", "replay")
+DEFAULT_MODE = os.getenv("SEEDLING_LLM_CACHE", "passthrough").lower()
+DEFAULT_DIR = os.getenv("SEEDLING_LLM_CACHE_DIR", os.path.join(".seedling_cache", "llm"))
+DEFAULT_MAX_ENTRIES = int(os.getenv("SEEDLING_LLM_CACHE_MAX", "5000"))
+
+# Why wrap_from_env() could not set up the cache (reported by cli_tool at start-up)
+last_error = ""
+
+
+class CacheMiss(Exception):
+    """Raised in replay mode when a request was never recorded."""
+    def __init__(self, message):
+        self.message = message
+        super().__init__(self.message)
+
+
+def request_key(system_prompt: str, history: list, model_name=None, base_url=None, **params) -> str:
+    """Stable hash of everything that can influence the model's reply."""
+    payload = {
+        "system": system_prompt,
+        "history": [{"role": m.get("role"), "content": m.get("content")} for m in history],
+        "model": model_name,
+        "base_url": base_url,
+        "params": params,
+    }
+    blob = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    """On-disk response store (one JSON file per request) with LRU eviction."""
+
+    def __init__(self, directory: str = DEFAULT_DIR, mode: str = DEFAULT_MODE, max_entries: int = DEFAULT_MAX_ENTRIES):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cache mode '{mode}'. Use one of: {', '.join(MODES)}")
+        self.directory = directory
+        self.mode = mode
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._last_used = None  # key -> last access time, loaded lazily
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _index(self) -> dict:
+        # Called with the lock held. File mtimes double as the LRU clock.
+        if self._last_used is None:
+            self._last_used = {}
+            if os.path.isdir(self.directory):
+                for root, _dirs, files in os.walk(self.directory):
+                    for name in files:
+                        if name.endswith(".json"):
+                            path = os.path.join(root, name)
+                            self._last_used[name[:-5]] = os.path.getmtime(path)
+        return self._last_used
+
+    def get(self, key: str):
+        """The stored response text, or None."""
+        with self._lock:
+            path = self._path(key)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                return None
+            now = time.time()
+            self._index()[key] = now
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                pass
+            return entry["response"]
+
+    def put(self, key: str, response: str, meta: dict = None):
+        with self._lock:
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"response": response, "meta": meta or {}, "recorded_at": time.time()}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            index = self._index()
+            index[key] = time.time()
+            self._evict(index)
+
+    def _evict(self, index: dict):
+        overflow = len(index) - self.max_entries
+        if overflow <= 0:
+            return
+        for key in sorted(index, key=index.get)[:overflow]:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            del index[key]
+
+    def wrap(self, fn, connector=None):
+        """
+        Wrap a get_ai_response_with_history-style function according to the mode. The
+        connector module's DEFAULT_MODEL and BASE_URL go into the key when it is given.
+        """
+        if self.mode == "passthrough":
+            return fn
+
+        @functools.wraps(fn)
+        def cached_call(system_prompt: str, history: list, model_name=None, **params):
+            model = model_name or getattr(connector, "DEFAULT_MODEL", None)
+            key = request_key(system_prompt, history, model, getattr(connector, "BASE_URL", None), **params)
+            if self.mode == "replay":
+                response = self.get(key)
+                if response is None:
+                    self.misses += 1
+                    raise CacheMiss(f"No recorded response for request {key[:12]} (replay mode, {len(history)} messages).")
+                self.hits += 1
+                return response
+
+            # record: always ask the model, then store the answer
+            call_args = (system_prompt, history) + ((model_name,) if model_name is not None else ())
+            response = fn(*call_args, **params)
+            self.misses += 1
+            if not response or response.startswith("[ERROR]") or "[ERROR] An unexpected error occurred during API call" in response:
+                return response  # never replay a failed call
+            self.put(key, response, {"model": model, "messages": len(history), "params": params})
+            return response
+
+        return cached_call
+
+
+def wrap_from_env(fn, connector=None):
+    """Apply the cache configured through SEEDLING_LLM_CACHE* (no-op in passthrough mode)."""
+    global last_error
+    try:
+        cache = LLMCache()
+    except ValueError as e:
+        last_error = f"SEEDLING_LLM_CACHE: {e}"
+        return fn
+    return cache.wrap(fn, connector)
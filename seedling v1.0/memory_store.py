@@ -0,0 +1,158 @@
+# MIT License - Copyright (c) 2025 Viktor Kirschner
+"""
+Indexed long-term memory.
+
+Every finished task becomes one record in memory.jsonl, and a small BM25 keyword index
+(memory_index.json) is kept next to it. At the start of a task only the k records most
+relevant to the user's goal are put into the system prompt, instead of all of memory.txt.
+
+memory.txt is still appended to, so the human-readable history stays where it was.
+Existing memory.txt entries are imported into the store the first time it is opened.
+"""
+import os
+import re
+import json
+import math
+from datetime import datetime
+
+RECORDS_FILE = "memory.jsonl"
+INDEX_FILE = "memory_index.json"
+LEGACY_SEPARATOR = re.compile(r"\n*={10,} MEMORY FROM COMPLETED TASK ={10,}\n*")
+
+# How many memories are injected per task
+DEFAULT_TOP_K = int(os.getenv("SEEDLING_MEMORY_TOP_K", "3"))
+
+# BM25 parameters
+K1 = 1.5
+B = 0.75
+
+_STOPWORDS = {
+    "the", "and", "for", "with", "that", "this", "from", "are", "was", "were", "you", "your",
+    "its", "into", "then", "than", "have", "has", "had", "not", "but", "all", "any", "can",
+    "use", "used", "using", "will", "would", "should", "could", "also", "each", "which",
+}
+
+
+def tokenize(text: str) -> list:
+    """Lower-cased word tokens; identifiers like read_file are split into their parts too."""
+    tokens = []
+    for word in re.findall(r"[\w]+", text.lower()):
+        parts = [word] + (word.split("_") if "_" in word else [])
+        tokens.extend(p for p in parts if len(p) > 1 and p not in _STOPWORDS)
+    return tokens
+
+
+class MemoryStore:
+    """One JSON record per completed task plus an on-disk BM25 index over them."""
+
+    def __init__(self, directory: str = ".", legacy_file: str = "memory.txt"):
+        self.records_path = os.path.join(directory, RECORDS_FILE)
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        self.legacy_path = os.path.join(directory, legacy_file)
+        self.records = {}
+        self.index = {"next_id": 1, "doc_lengths": {}, "postings": {}}
+        self._load()
+
+    # --- Persistence ---
+
+    def _load(self):
+        if os.path.exists(self.records_path):
+            with open(self.records_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                        self.records[str(record["id"])] = record
+                    except (ValueError, KeyError, TypeError):
+                        continue  # a line cut short by a crash
+        elif os.path.exists(self.legacy_path) and os.path.getsize(self.legacy_path) > 0:
+            self._import_legacy()
+            return
+
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.index = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.index = {"next_id": 1, "doc_lengths": {}, "postings": {}}
+        # Rebuild if the index and the records disagree (e.g. the index was deleted)
+        if set(self.index["doc_lengths"]) != set(self.records):
+            self._rebuild_index()
+
+    def _import_legacy(self):
+        with open(self.legacy_path, 'r', encoding='utf-8') as f:
+            chunks = [c.strip() for c in LEGACY_SEPARATOR.split(f.read()) if c.strip()]
+        for chunk in chunks:
+            self._append_record({"goal": "", "summary": chunk, "timestamp": None}, save_index=False)
+        self._save_index()
+
+    def _rebuild_index(self):
+        next_id = max([int(i) for i in self.records] + [0]) + 1
+        self.index = {"next_id": next_id, "doc_lengths": {}, "postings": {}}
+        for record_id, record in self.records.items():
+            self._index_record(record_id, record)
+        self._save_index()
+
+    def _save_index(self):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.index_path)
+
+    def _index_record(self, record_id: str, record: dict):
+        tokens = tokenize(f"{record.get('goal', '')}\n{record.get('summary', '')}")
+        self.index["doc_lengths"][record_id] = len(tokens)
+        counts = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for token, tf in counts.items():
+            self.index["postings"].setdefault(token, {})[record_id] = tf
+
+    def _append_record(self, record: dict, save_index: bool = True) -> dict:
+        record_id = str(self.index["next_id"])
+        self.index["next_id"] += 1
+        record = dict(record, id=int(record_id))
+        with open(self.records_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.records[record_id] = record
+        self._index_record(record_id, record)
+        if save_index:
+            self._save_index()
+        return record
+
+    # --- Public API ---
+
+    def add(self, summary: str, goal: str = "") -> dict:
+        """Store the summary of a finished task and index it."""
+        return self._append_record({
+            "goal": goal,
+            "summary": summary,
+            "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        })
+
+    def search(self, query: str, k: int = DEFAULT_TOP_K) -> list:
+        """Return up to k records ranked by BM25 relevance to the query."""
+        lengths = self.index["doc_lengths"]
+        if not lengths or k <= 0:
+            return []
+        n_docs = len(lengths)
+        avg_len = (sum(lengths.values()) / n_docs) or 1
+        scores = {}
+        for term in set(tokenize(query)):
+            postings = self.index["postings"].get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for record_id, tf in postings.items():
+                norm = tf + K1 * (1 - B + B * lengths[record_id] / avg_len)
+                scores[record_id] = scores.get(record_id, 0.0) + idf * tf * (K1 + 1) / norm
+        ranked = sorted(scores, key=lambda r: (scores[r], int(r)), reverse=True)[:k]
+        return [self.records[r] for r in ranked if r in self.records]
+
+    def format_for_prompt(self, query: str, k: int = DEFAULT_TOP_K) -> str:
+        """The relevant memories as a block for the system prompt ('' if nothing matches)."""
+        entries = []
+        for record in self.search(query, k):
+            stamp = f" ({record['timestamp']})" if record.get("timestamp") else ""
+            entries.append(f"## Memory #{record['id']}{stamp}\n{record['summary'].strip()}")
+        return "\n\n".join(entries)
@@ -0,0 +1,401 @@
+# MIT License - Copyright (c) 2025 Viktor Kirschner
+"""
+Local message bus for the send_message and await_message commands.
+
+Seedlings that work in the same project talk through one broker process instead of
+polling shared files. Every agent has a named mailbox: SEEDLING_AGENT_NAME, "main" by
+default. Workers started with delegate_begin are named after their task.
+
+- send_message <to> <text> drops a message into a mailbox and returns at once.
+  send_message --wait=SECONDS <to> <text> is a request: it waits for the answer, which
+  the other agent sends with send_message --reply=<id> <text>.
+- await_message [--timeout=SECONDS] [--from=NAME] waits for the next message.
+- A mailbox holds at most SEEDLING_BUS_MAX_QUEUE undelivered messages (default 100).
+  A sender to a full mailbox waits SEND_WAIT seconds for room, then gets an error.
+- Undelivered messages are journaled to .seedling_cache/bus/undelivered.jsonl and
+  survive a broker restart.
+
+The broker listens on a Unix domain socket (a named pipe on Windows) and is started by
+the first agent that needs it. It exits after IDLE_EXIT seconds without clients.
+Connections are authenticated with a random key in the bus directory.
+Run python message_bus.py --list to see the mailboxes.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import hashlib
+import tempfile
+import threading
+import subprocess
+from collections import deque, OrderedDict
+from multiprocessing.connection import Listener, Client, AuthenticationError
+
+BUS_DIR = os.getenv("SEEDLING_BUS_DIR", os.path.join(".seedling_cache", "bus"))
+AGENT_NAME = os.getenv("SEEDLING_AGENT_NAME", "main")
+MAX_QUEUE = int(os.getenv("SEEDLING_BUS_MAX_QUEUE", "100"))
+DEFAULT_WAIT = float(os.getenv("SEEDLING_BUS_TIMEOUT", "60"))
+MAX_WAIT = 1800.0
+# How long a sender waits for room in a full mailbox
+SEND_WAIT = 5.0
+MAX_BODY_CHARS = 65536
+# The broker exits after this many seconds with no client connected
+IDLE_EXIT = 600.0
+# The journal is rewritten without the delivered messages after this many deliveries
+COMPACT_AFTER = 1000
+# Message ids remembered for --reply, most recent first out
+REPLY_MEMORY = 10000
+START_SECONDS = 5.0
+
+_connection = None
+_connection_lock = threading.Lock()
+
+
+class BusError(Exception):
+    pass
+
+
+def address(bus_dir: str = None) -> tuple:
+    """(address, family) of the broker for a bus directory; short enough for any socket path limit."""
+    key = hashlib.sha1(os.path.abspath(bus_dir or BUS_DIR).encode('utf-8')).hexdigest()[:12]
+    if os.name == 'nt':
+        return rf"\\.\pipe\seedling-bus-{key}", "AF_PIPE"
+    return os.path.join(tempfile.gettempdir(), f"seedling-bus-{key}.sock"), "AF_UNIX"
+
+
+def _authkey(bus_dir: str) -> bytes:
+    os.makedirs(bus_dir, exist_ok=True)
+    path = os.path.join(bus_dir, "authkey")
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(os.urandom(32))
+    except FileExistsError:
+        pass
+    for _ in range(50):  # another agent may be writing it right now
+        with open(path, 'rb') as f:
+            key = f.read()
+        if len(key) == 32:
+            return key
+        time.sleep(0.01)
+    raise BusError(f"The bus key {path} is damaged. Delete it and try again.")
+
+
+# --- Broker ---
+
+class Broker:
+    """The mailboxes, held in memory and journaled to disk until delivered."""
+
+    def __init__(self, bus_dir: str):
+        self.bus_dir = bus_dir
+        self.mailboxes = {}               # name -> deque of messages
+        self.senders = OrderedDict()      # message id -> mailbox a reply goes to
+        self.condition = threading.Condition()
+        self.clients = 0
+        self.last_activity = time.monotonic()
+        self._journal_path = os.path.join(bus_dir, "undelivered.jsonl")
+        self._delivered = 0
+        self._journal = None
+        self._load()
+
+    def _load(self):
+        pending = OrderedDict()
+        try:
+            with open(self._journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # a line cut short by a crash
+                    if "put" in record:
+                        pending[record["put"]["id"]] = record["put"]
+                    elif "done" in record:
+                        pending.pop(record["done"], None)
+        except OSError:
+            pass
+        for message in pending.values():
+            self.mailboxes.setdefault(message["to"], deque()).append(message)
+            self.senders[message["id"]] = message["from"]
+        self._compact()
+
+    def _compact(self):
+        if self._journal:
+            self._journal.close()
+        tmp_path = f"{self._journal_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for box in self.mailboxes.values():
+                for message in box:
+                    f.write(json.dumps({"put": message}) + "\n")
+        os.replace(tmp_path, self._journal_path)
+        self._journal = open(self._journal_path, 'a', encoding='utf-8')
+        self._delivered = 0
+
+    def _record(self, record: dict):
+        self._journal.write(json.dumps(record) + "\n")
+        self._journal.flush()
+
+    def handle(self, request: dict) -> dict:
+        operation = request.get("op")
+        with self.condition:
+            self.last_activity = time.monotonic()
+            if operation == "send":
+                return self._send(request)
+            if operation == "receive":
+                return self._receive(request)
+            if operation == "list":
+                return {"mailboxes": {name: len(box) for name, box in self.mailboxes.items() if box}}
+        return {"error": f"Unknown operation '{operation}'."}
+
+    def _send(self, request: dict) -> dict:
+        to = request.get("to")
+        if request.get("in_reply_to"):
+            to = self.senders.get(request["in_reply_to"])
+            if not to:
+                return {"error": f"No message '{request['in_reply_to']}' is waiting for a reply."}
+        if not to:
+            return {"error": "No recipient."}
+        box = self.mailboxes.setdefault(to, deque())
+        deadline = time.monotonic() + min(float(request.get("wait", SEND_WAIT)), MAX_WAIT)
+        while len(box) >= MAX_QUEUE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return {"error": f"Mailbox '{to}' is full ({len(box)} undelivered messages). Try again later."}
+            self.condition.wait(remaining)
+        message = {"id": uuid.uuid4().hex[:12], "from": request.get("from", "?"), "to": to,
+                   "body": request.get("body", ""), "sent": time.time()}
+        if request.get("in_reply_to"):
+            message["in_reply_to"] = request["in_reply_to"]
+        box.append(message)
+        self.senders[message["id"]] = message["from"]
+        if len(self.senders) > REPLY_MEMORY:
+            self.senders.popitem(last=False)
+        self._record({"put": message})
+        self.condition.notify_all()
+        return {"id": message["id"], "to": to, "queued": len(box)}
+
+    def _receive(self, request: dict) -> dict:
+        box = self.mailboxes.setdefault(request.get("mailbox", "main"), deque())
+        sender, in_reply_to = request.get("from"), request.get("in_reply_to")
+        deadline = time.monotonic() + min(float(request.get("timeout", DEFAULT_WAIT)), MAX_WAIT)
+        while True:
+            for message in box:
+                if (not sender or message["from"] == sender) and (not in_reply_to or message.get("in_reply_to") == in_reply_to):
+                    box.remove(message)
+                    self._mark_delivered(message)
+                    self.condition.notify_all()  # a sender may be waiting for room
+                    return {"message": message}
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return {"timeout": True}
+            self.condition.wait(remaining)
+
+    def _mark_delivered(self, message: dict):
+        self._record({"done": message["id"]})
+        self._delivered += 1
+        if self._delivered >= COMPACT_AFTER:
+            self._compact()
+
+    def requeue(self, message: dict):
+        """Puts back a message whose receiver went away before it got it."""
+        with self.condition:
+            self.mailboxes.setdefault(message["to"], deque()).appendleft(message)
+            self._record({"put": message})
+            self.condition.notify_all()
+
+    def _serve_client(self, connection):
+        with self.condition:
+            self.clients += 1
+        try:
+            while True:
+                try:
+                    request = json.loads(connection.recv_bytes().decode('utf-8'))
+                except (EOFError, OSError):
+                    break
+                except ValueError:
+                    request = {}
+                response = self.handle(request)
+                try:
+                    connection.send_bytes(json.dumps(response).encode('utf-8'))
+                except OSError:
+                    if "message" in response:
+                        self.requeue(response["message"])
+                    break
+        finally:
+            connection.close()
+            with self.condition:
+                self.clients -= 1
+                self.last_activity = time.monotonic()
+
+    def _watch_idle(self):
+        while True:
+            time.sleep(min(IDLE_EXIT, 5.0))
+            with self.condition:
+                if not self.clients and time.monotonic() - self.last_activity >= IDLE_EXIT:
+                    self._journal.close()
+                    os._exit(0)
+
+    def serve(self):
+        bus_address, family = address(self.bus_dir)
+        authkey = _authkey(self.bus_dir)
+        if family == "AF_UNIX" and os.path.exists(bus_address):
+            try:
+                Client(bus_address, family, authkey=authkey).close()
+                return  # another broker already serves this bus
+            except (OSError, EOFError, AuthenticationError):
+                os.remove(bus_address)  # left behind by a broker that died
+        listener = Listener(bus_address, family, authkey=authkey)
+        threading.Thread(target=self._watch_idle, daemon=True).start()
+        print(f"[INFO] Message bus for {self.bus_dir} listening on {bus_address}", flush=True)
+        while True:
+            try:
+                connection = listener.accept()
+            except (OSError, EOFError, AuthenticationError):
+                continue
+            threading.Thread(target=self._serve_client, args=(connection,), daemon=True).start()
+
+
+# --- Client ---
+
+def _start_broker(bus_dir: str):
+    os.makedirs(bus_dir, exist_ok=True)
+    options = ({"creationflags": subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP}
+               if os.name == 'nt' else {"start_new_session": True})
+    with open(os.path.join(bus_dir, "broker.log"), 'a', encoding='utf-8') as log:
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", os.path.abspath(bus_dir)],
+                         stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT, **options)
+
+
+def _connect():
+    bus_dir = os.path.abspath(BUS_DIR)
+    bus_address, family = address(bus_dir)
+    authkey = _authkey(bus_dir)
+    deadline = None
+    while True:
+        try:
+            return Client(bus_address, family, authkey=authkey)
+        except (OSError, EOFError, AuthenticationError) as e:
+            if deadline is None:
+                _start_broker(bus_dir)
+                deadline = time.monotonic() + START_SECONDS
+            elif time.monotonic() > deadline:
+                raise BusError(f"The message bus did not start ({e}). See {os.path.join(bus_dir, 'broker.log')}.")
+            time.sleep(0.05)
+
+
+def request(operation: str, **fields) -> dict:
+    """Sends one request to the broker (starting it if needed) and returns its answer."""
+    global _connection
+    with _connection_lock:
+        for attempt in (1, 2):
+            try:
+                if _connection is None:
+                    _connection = _connect()
+                _connection.send_bytes(json.dumps(dict(fields, op=operation)).encode('utf-8'))
+                return json.loads(_connection.recv_bytes().decode('utf-8'))
+            except (OSError, EOFError) as e:
+                # The broker went away (idle exit, crash): reconnect once, which restarts it
+                _connection = None
+                if attempt == 2:
+                    raise BusError(f"Lost the connection to the message bus: {e}")
+
+
+def _options(args: list) -> tuple:
+    """({option: value}, remaining args) for leading --name[=value] arguments."""
+    options = {}
+    while args and args[0].startswith("--"):
+        name, _, value = args[0][2:].partition("=")
+        options[name] = value
+        args = args[1:]
+    return options, args
+
+
+def _seconds(value: str, default: float) -> float:
+    if value in (None, ""):
+        return default
+    seconds = float(value)
+    if not 0 <= seconds <= MAX_WAIT:
+        raise ValueError(value)
+    return seconds
+
+
+def format_message(message: dict) -> str:
+    sent = time.strftime('%H:%M:%S', time.localtime(message["sent"]))
+    lines = [f"[MESSAGE] From '{message['from']}' at {sent} (id {message['id']}"
+             + (f", reply to {message['in_reply_to']})" if message.get("in_reply_to") else ")"),
+             message["body"]]
+    if not message.get("in_reply_to"):
+        lines.append(f"[INFO] To answer: send_message --reply={message['id']} <text>")
+    return "\n".join(lines)
+
+
+def send_message(args: list) -> str:
+    """
+    The send_message command.
+
+    Usage: send_message [--wait=SECONDS] <to> <text>
+           send_message --reply=<message id> <text>
+           send_message --list
+    """
+    usage = "Usage: send_message [--wait=SECONDS] <to> <text> | send_message --reply=<id> <text> | send_message --list"
+    options, args = _options(list(args))
+    try:
+        if "list" in options:
+            boxes = request("list")["mailboxes"]
+            listing = ", ".join(f"{name} ({count})" for name, count in sorted(boxes.items()))
+            return f"[INFO] You are '{AGENT_NAME}'. Mailboxes with undelivered messages: {listing or 'none'}"
+        wait = _seconds(options.get("wait"), DEFAULT_WAIT) if "wait" in options else None
+        if options.get("reply"):
+            to, body = None, " ".join(args)
+        elif len(args) >= 2:
+            to, body = args[0], " ".join(args[1:])
+        else:
+            return f"[ERROR] {usage}"
+        if not body.strip():
+            return "[ERROR] The message is empty."
+        if len(body) > MAX_BODY_CHARS:
+            return f"[ERROR] The message has {len(body):,} characters; the limit is {MAX_BODY_CHARS:,}. Send a file path instead."
+
+        sent = request("send", to=to, body=body, in_reply_to=options.get("reply"), **{"from": AGENT_NAME})
+        if "error" in sent:
+            return f"[ERROR] {sent['error']}"
+        if wait is None:
+            return f"[SUCCESS] Message {sent['id']} delivered to mailbox '{sent['to']}' ({sent['queued']} waiting there)."
+        answer = request("receive", mailbox=AGENT_NAME, in_reply_to=sent["id"], timeout=wait)
+        if "message" not in answer:
+            return (f"[ERROR] No reply from '{sent['to']}' within {wait:g} seconds. Message {sent['id']} stays in their "
+                    f"mailbox; a late reply can still be picked up with await_message.")
+        return format_message(answer["message"])
+    except ValueError:
+        return f"[ERROR] Invalid --wait value. Use a number of seconds up to {MAX_WAIT:g}."
+    except BusError as e:
+        return f"[ERROR] {e}"
+
+
+def await_message(args: list) -> str:
+    """
+    The await_message command: waits for the next message in this agent's mailbox.
+
+    Usage: await_message [--timeout=SECONDS] [--from=NAME]
+    """
+    options, args = _options(list(args))
+    try:
+        timeout = _seconds(options.get("timeout"), DEFAULT_WAIT)
+        answer = request("receive", mailbox=AGENT_NAME, timeout=timeout, **{"from": options.get("from") or None})
+    except ValueError:
+        return f"[ERROR] Invalid --timeout value. Use a number of seconds up to {MAX_WAIT:g}."
+    except BusError as e:
+        return f"[ERROR] {e}"
+    if "message" not in answer:
+        source = f" from '{options['from']}'" if options.get("from") else ""
+        return f"[INFO] No message{source} for '{AGENT_NAME}' within {timeout:g} seconds."
+    return format_message(answer["message"])
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--serve":
+        Broker(sys.argv[2]).serve()
+    elif sys.argv[1:] == ["--list"]:
+        print(send_message(["--list"]))
+    else:
+        print("Usage: python message_bus.py --list  (the broker is started by send_message / await_message)")
@@ -0,0 +1,305 @@
+# MIT License - Copyright (c) 2025 Viktor Kirschner
+"""
+Per-step metrics: token usage, latency and cost of model calls, and tool timings.
+
+Every model call and every executed command becomes one JSON line in an append-only
+file (SEEDLING_METRICS_FILE, default .seedling_cache/metrics.jsonl). Every session in the
+workspace appends to it, and each record carries a session id.
+
+A Prometheus textfile (SEEDLING_METRICS_PROM, default .seedling_cache/seedling.prom) with
+this session's totals and latency quantiles is rewritten every PROM_INTERVAL seconds
+and at exit. Point node_exporter's textfile collector at it.
+
+seedling_stats.py aggregates the JSONL into p50/p95 per model and per tool.
+Set SEEDLING_METRICS=0 to record nothing.
+
+Costs are only computed for models listed in SEEDLING_MODEL_PRICES, given as USD per
+million tokens: "kimi-k2-turbo-preview=0.6:2.5,gpt-5=1.25:10".
+"""
+import os
+import json
+import time
+import uuid
+import atexit
+import threading
+import functools
+from collections import deque
+
+from context_budget import estimate_tokens, estimate_message_tokens
+
+ENABLED = os.getenv("SEEDLING_METRICS", "1") != "0"
+METRICS_FILE = os.getenv("SEEDLING_METRICS_FILE", os.path.join(".seedling_cache", "metrics.jsonl"))
+PROM_FILE = os.getenv("SEEDLING_METRICS_PROM", os.path.join(".seedling_cache", "seedling.prom"))
+PROM_INTERVAL = 10.0
+# Latest samples per model/tool kept for the quantiles in the Prometheus file
+QUANTILE_WINDOW = 1000
+QUANTILES = (0.5, 0.95)
+
+
+def parse_prices(spec: str) -> dict:
+    """'model=in:out,...' (USD per million tokens) -> {model: (in, out)}."""
+    prices = {}
+    for item in spec.split(","):
+        model, _, rates = item.strip().partition("=")
+        try:
+            price_in, _, price_out = rates.partition(":")
+            prices[model.strip()] = (float(price_in), float(price_out or price_in))
+        except ValueError:
+            continue
+    return prices
+
+
+PRICES = parse_prices(os.getenv("SEEDLING_MODEL_PRICES", ""))
+
+
+def percentile(values: list, q: float):
+    """Linear-interpolated percentile (q in 0..1) of a list of numbers, or None."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def _label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRecorder:
+    """Appends metric records to the JSONL file and keeps totals for the Prometheus file."""
+
+    def __init__(self, path: str = METRICS_FILE, prom_path: str = PROM_FILE, session: str = None):
+        self.path = path
+        self.prom_path = prom_path
+        self.session = session or f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        self.step = 0
+        self._lock = threading.Lock()
+        self._file = None
+        self._last_prom_write = 0.0
+        # (model,) / (tool,) -> totals and recent samples
+        self._llm = {}
+        self._tools = {}
+
+    def _open(self):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            # Line buffered: every record reaches the file as one append
+            self._file = open(self.path, 'a', encoding='utf-8', buffering=1)
+        return self._file
+
+    def record(self, kind: str, **fields):
+        entry = {"ts": round(time.time(), 3), "session": self.session, "step": self.step, "kind": kind}
+        entry.update(fields)
+        with self._lock:
+            try:
+                self._open().write(json.dumps(entry, ensure_ascii=False) + "\n")
+            except OSError:
+                pass  # metrics must never break the agent
+            self._aggregate(entry)
+            if time.monotonic() - self._last_prom_write >= PROM_INTERVAL:
+                self._write_prometheus()
+        return entry
+
+    def _aggregate(self, entry: dict):
+        if entry["kind"] == "llm":
+            totals = self._llm.setdefault(entry.get("model") or "unknown", {
+                "requests": 0, "errors": 0, "retries": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                "cost_usd": 0.0, "latency": deque(maxlen=QUANTILE_WINDOW), "latency_sum": 0.0,
+                "ttft": deque(maxlen=QUANTILE_WINDOW), "ttft_sum": 0.0, "ttft_count": 0})
+            totals["requests"] += 1
+            totals["errors"] += 1 if entry.get("error") else 0
+            totals["retries"] += entry.get("retries") or 0
+            totals["prompt_tokens"] += entry.get("prompt_tokens") or 0
+            totals["completion_tokens"] += entry.get("completion_tokens") or 0
+            totals["cost_usd"] += entry.get("cost_usd") or 0.0
+            totals["latency"].append(entry["latency_s"])
+            totals["latency_sum"] += entry["latency_s"]
+            if entry.get("ttft_s") is not None:
+                totals["ttft"].append(entry["ttft_s"])
+                totals["ttft_sum"] += entry["ttft_s"]
+                totals["ttft_count"] += 1
+        elif entry["kind"] == "tool":
+            totals = self._tools.setdefault(entry.get("tool") or "unknown", {
+                "calls": {}, "output_bytes": 0, "duration": deque(maxlen=QUANTILE_WINDOW),
+                "duration_sum": 0.0, "duration_count": 0})
+            status = entry.get("status", "ok")
+            totals["calls"][status] = totals["calls"].get(status, 0) + 1
+            totals["output_bytes"] += entry.get("output_bytes") or 0
+            totals["duration"].append(entry["duration_s"])
+            totals["duration_sum"] += entry["duration_s"]
+            totals["duration_count"] += 1
+
+    def _write_prometheus(self):
+        # Called with the lock held
+        self._last_prom_write = time.monotonic()
+        session = self.session
+        lines = []
+
+        def labels_text(labels):
+            return ",".join(f'{k}="{_label(v)}"' for k, v in [("session", session)] + labels)
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{{{labels_text(labels)}}} {value}")
+
+        def summary(name, help_text, rows):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} summary")
+            for labels, values, total, count in rows:
+                for q in QUANTILES:
+                    value = percentile(list(values), q)
+                    if value is not None:
+                        lines.append(f"{name}{{{labels_text(labels + [('quantile', q)])}}} {value:.6f}")
+                lines.append(f"{name}_sum{{{labels_text(labels)}}} {total:.6f}")
+                lines.append(f"{name}_count{{{labels_text(labels)}}} {count}")
+
+        llm = self._llm.items()
+        metric("seedling_llm_requests_total", "counter", "Model calls.",
+               [([("model", m)], t["requests"]) for m, t in llm])
+        metric("seedling_llm_errors_total", "counter", "Model calls that returned an error.",
+               [([("model", m)], t["errors"]) for m, t in llm])
+        metric("seedling_llm_retries_total", "counter", "Retried model requests.",
+               [([("model", m)], t["retries"]) for m, t in llm])
+        metric("seedling_llm_tokens_total", "counter", "Prompt and completion tokens.",
+               [([("model", m), ("type", "prompt")], t["prompt_tokens"]) for m, t in llm]
+               + [([("model", m), ("type", "completion")], t["completion_tokens"]) for m, t in llm])
+        metric("seedling_llm_cost_usd_total", "counter", "Cost in USD (models listed in SEEDLING_MODEL_PRICES).",
+               [([("model", m)], f"{t['cost_usd']:.6f}") for m, t in llm])
+        summary("seedling_llm_latency_seconds", "Total model call latency.",
+                [([("model", m)], t["latency"], t["latency_sum"], t["requests"]) for m, t in llm])
+        summary("seedling_llm_ttft_seconds", "Time to first token of streamed calls.",
+                [([("model", m)], t["ttft"], t["ttft_sum"], t["ttft_count"]) for m, t in llm])
+
+        tools = self._tools.items()
+        metric("seedling_tool_calls_total", "counter", "Executed commands by outcome.",
+               [([("tool", name), ("status", status)], count) for name, t in tools for status, count in t["calls"].items()])
+        metric("seedling_tool_output_bytes_total", "counter", "Bytes of command output.",
+               [([("tool", name)], t["output_bytes"]) for name, t in tools])
+        summary("seedling_tool_duration_seconds", "Command execution time.",
+                [([("tool", name)], t["duration"], t["duration_sum"], t["duration_count"]) for name, t in tools])
+
+        try:
+            os.makedirs(os.path.dirname(self.prom_path) or ".", exist_ok=True)
+            tmp_path = f"{self.prom_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write("\n".join(lines) + "\n")
+            # Atomic, so the collector never reads a half-written file
+            os.replace(tmp_path, self.prom_path)
+        except OSError:
+            pass
+
+    def flush(self):
+        with self._lock:
+            if self._llm or self._tools:
+                self._write_prometheus()
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+_recorder = None
+
+
+def get_recorder() -> MetricsRecorder:
+    """The session's recorder, created on first use and flushed at exit."""
+    global _recorder
+    if _recorder is None:
+        _recorder = MetricsRecorder()
+        atexit.register(_recorder.close)
+    return _recorder
+
+
+def set_step(step: int):
+    if ENABLED:
+        get_recorder().step = step
+
+
+def _round(value, digits=6):
+    return None if value is None else round(value, digits)
+
+
+def _is_error_reply(text) -> bool:
+    return not text or text.startswith("[ERROR]") or "An unexpected error occurred during API call" in text
+
+
+def wrap_llm(fn, connector):
+    """
+    Records every call of a get_ai_response_with_history-style function. Usage, time to
+    first token and retries come from connector.last_call; if the API did not report
+    usage (e.g. a stream cut off at [CMD_END]) the token counts are estimated.
+    """
+    if not ENABLED:
+        return fn
+
+    @functools.wraps(fn)
+    def measured(system_prompt, history, *args, **kwargs):
+        connector.last_call = {}
+        started = time.perf_counter()
+        response, error = None, ""
+        try:
+            response = fn(system_prompt, history, *args, **kwargs)
+            return response
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            latency = time.perf_counter() - started
+            call = getattr(connector, "last_call", None) or {}
+            model = call.get("model") or kwargs.get("model_name") or (args[0] if args else None) or "unknown"
+            prompt_tokens, completion_tokens = call.get("prompt_tokens"), call.get("completion_tokens")
+            estimated = prompt_tokens is None or completion_tokens is None
+            if prompt_tokens is None:
+                prompt_tokens = estimate_tokens(system_prompt) + sum(estimate_message_tokens(m) for m in history)
+            if completion_tokens is None:
+                completion_tokens = estimate_tokens(response) if response else 0
+            price = PRICES.get(model)
+            cost = (prompt_tokens * price[0] + completion_tokens * price[1]) / 1e6 if price else None
+            if not error and _is_error_reply(response):
+                error = call.get("error") or (response or "empty reply")[:200]
+            get_recorder().record(
+                "llm", model=model, stream=bool(kwargs.get("stream")), cached=not call,
+                prompt_tokens=prompt_tokens, completion_tokens=completion_tokens, tokens_estimated=estimated,
+                ttft_s=_round(call.get("ttft_s")), latency_s=round(latency, 6), api_latency_s=_round(call.get("latency_s")),
+                retries=call.get("retries", 0), cost_usd=_round(cost, 8), error=error,
+            )
+
+    return measured
+
+
+def wrap_tool(fn, flow_exceptions=()):
+    """Records every call of an execute_command-style function (command string -> output)."""
+    if not ENABLED:
+        return fn
+
+    @functools.wraps(fn)
+    def measured(command_str, *args, **kwargs):
+        parts = command_str.split(None, 1)
+        tool = parts[0] if parts else ""
+        started = time.perf_counter()
+        result, status = None, "ok"
+        try:
+            result = fn(command_str, *args, **kwargs)
+            if isinstance(result, str) and result.lstrip().startswith(("[ERROR]", "[EXECUTION ERROR]", "[POWERSHELL ERROR]")):
+                status = "error"
+            return result
+        except flow_exceptions:
+            status = "flow"  # task_complete / request_user_input end the step on purpose
+            raise
+        except Exception:
+            status = "exception"
+            raise
+        finally:
+            get_recorder().record(
+                "tool", tool=tool, duration_s=round(time.perf_counter() - started, 6), status=status,
+                output_bytes=len(result.encode('utf-8', errors='ignore')) if isinstance(result, str) else 0,
+            )
+
+    return measured
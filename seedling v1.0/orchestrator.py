@@ -0,0 +1,398 @@
+# MIT License - Copyright (c) 2025 Viktor Kirschner
+"""
+Multi-agent orchestration: fan a goal's subtasks out to worker Seedlings.
+
+The agent starts it with delegate_begin and sends a plan as its next reply:
+
+    {"max_workers": 3,
+     "tasks": [{"name": "parser", "goal": "Refactor src/parser.py to ...",
+                "workdir": "src", "handlers": ["read_file", "apply_patch"],
+                "prompt": "Only touch src/parser.py.", "max_steps": 40}, ...]}
+
+Only "goal" is required. Each task runs as its own worker process: a headless cli_tool
+loop whose cwd is the task's workdir (default: the project root). Its system prompt is
+the priming prompt plus the task's role, and it can use only the listed handlers (default:
+all). Every worker has a state directory (.seedling_cache/workers/<run>/<name>/) for its
+log.html, console output, prompt and handler copies.
+
+At most max_workers workers run at a time, capped by SEEDLING_MAX_WORKERS (default 4).
+A worker ends with task_complete, or when it hits its step limit or SEEDLING_WORKER_TIMEOUT.
+A worker runs in its own process session. On a timeout it gets SIGTERM and closes its
+shells and handler workers, and after STOP_GRACE seconds it and every process it started
+are killed. The parent gets one report with every worker's status and final summary.
+
+Workers cannot delegate further. When nobody is there to answer request_user_input,
+a worker is told to decide for itself.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import signal
+import subprocess
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import message_bus
+import process_runner
+
+SOURCE_DIR = Path(__file__).parent.resolve()
+MAX_WORKERS = int(os.getenv("SEEDLING_MAX_WORKERS", "4"))
+WORKER_TIMEOUT = float(os.getenv("SEEDLING_WORKER_TIMEOUT", "1800"))
+DEFAULT_MAX_STEPS = int(os.getenv("SEEDLING_WORKER_MAX_STEPS", "50"))
+# Seconds a timed-out worker gets to clean up after SIGTERM before everything it started is killed
+STOP_GRACE = 5.0
+WORKERS_DIR = os.path.join(".seedling_cache", "workers")
+# Set in a worker's environment; delegate_begin refuses to run there
+WORKER_ENV = "SEEDLING_WORKER"
+# How many request_user_input questions a worker gets answered before it is stopped
+MAX_AUTO_ANSWERS = 3
+AUTO_ANSWER = ("No user is available: you are running unattended. Make a reasonable decision yourself and continue. "
+               "If the task cannot be finished, call task_complete and explain what is missing.")
+# What a worker does when the agent asks the user something: answer it, or stop as failed / deferred
+INPUT_POLICIES = ("auto", "fail", "defer")
+
+WORKER_PROMPT = """
+
+# WORKER ROLE
+You are worker '{name}', one of several Seedlings working on parts of a larger goal at the same time.
+Your subtask is the goal you are given. Stay within it: other workers handle the other parts.
+Your working directory is {workdir}. No user is watching: do not wait for answers.
+{mailbox}When the subtask is done, call task_complete with a summary the orchestrator can use: what you changed
+(file paths), what you verified, and anything left open. That summary is all it will see.
+{extra}"""
+
+
+class PlanError(Exception):
+    pass
+
+
+def safe_name(name: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in name)[:40].strip("._") or "task"
+
+
+def check_handlers(handlers, handlers_dir: str, owner: str):
+    """A task's "handlers" entry as a list of names (None: all tools); raises PlanError."""
+    if handlers is None:
+        return None
+    if not isinstance(handlers, list):
+        raise PlanError(f'{owner}: "handlers" must be a list of tool names.')
+    handlers = [str(h) for h in handlers]
+    unknown = sorted(set(handlers) - {p.stem for p in Path(handlers_dir).glob("*.py") if not p.name.startswith("_")})
+    if unknown:
+        raise PlanError(f"{owner}: unknown handlers {', '.join(unknown)}.")
+    return handlers
+
+
+def parse_plan(text: str, project_dir: str = None, handlers_dir: str = "handlers") -> tuple:
+    """(tasks, max_workers) from the JSON plan; raises PlanError with a readable message."""
+    project_dir = os.path.abspath(project_dir or os.getcwd())
+    lines = text.strip().split("\n")
+    if lines and lines[0].strip().startswith("```"): lines.pop(0)
+    if lines and lines[-1].strip() == "```": lines.pop(-1)
+    try:
+        plan = json.loads("\n".join(lines))
+    except ValueError as e:
+        raise PlanError(f"The plan is not valid JSON ({e}).")
+    if isinstance(plan, list):
+        plan = {"tasks": plan}
+    if not isinstance(plan, dict) or not isinstance(plan.get("tasks"), list) or not plan["tasks"]:
+        raise PlanError('The plan needs a non-empty "tasks" list.')
+
+    tasks, names = [], set()
+    for number, raw in enumerate(plan["tasks"], 1):
+        if isinstance(raw, str):
+            raw = {"goal": raw}
+        if not isinstance(raw, dict) or not str(raw.get("goal", "")).strip():
+            raise PlanError(f'Task {number} has no "goal".')
+        name = safe_name(str(raw.get("name") or f"task{number}"))
+        while name in names:
+            name += f"-{number}"
+        names.add(name)
+        workdir = os.path.abspath(os.path.join(project_dir, str(raw.get("workdir") or ".")))
+        if os.path.commonpath([project_dir, workdir]) != project_dir:
+            raise PlanError(f"Task '{name}': workdir '{raw.get('workdir')}' is outside the project directory.")
+        handlers = check_handlers(raw.get("handlers"), handlers_dir, f"Task '{name}'")
+        try:
+            max_steps = int(raw.get("max_steps") or DEFAULT_MAX_STEPS)
+        except (TypeError, ValueError):
+            raise PlanError(f'Task \'{name}\': "max_steps" must be a number.')
+        tasks.append({"name": name, "goal": str(raw["goal"]).strip(), "workdir": workdir, "handlers": handlers,
+                      "prompt": str(raw.get("prompt") or ""), "max_steps": max_steps})
+    try:
+        max_workers = int(plan.get("max_workers") or MAX_WORKERS)
+    except (TypeError, ValueError):
+        raise PlanError('"max_workers" must be a number.')
+    return tasks, max(1, min(max_workers, MAX_WORKERS, len(tasks)))
+
+
+# --- Parent side ---
+
+def worker_role(task: dict, others: list) -> str:
+    mailbox = (f"Your mailbox is '{task['name']}'. The other workers ({', '.join(others)}) can be reached with "
+               f"send_message and await_message.\n" if others else "")
+    return WORKER_PROMPT.format(name=task["name"], workdir=task["workdir"], mailbox=mailbox,
+                                extra=f"\nInstructions for this subtask:\n{task['prompt']}\n" if task["prompt"] else "")
+
+
+def prepare_worker(task: dict, state_dir: str, role_prompt: str, handlers_dir: str = "handlers",
+                   priming_prompt_file: str = "priming_prompt.txt", project_dir: str = None) -> str:
+    """
+    Creates a worker's state directory: its system prompt (priming prompt + role_prompt),
+    its handler set and the task file for `orchestrator.py --worker`. Returns the task file.
+    """
+    state_dir = os.path.abspath(state_dir)
+    os.makedirs(state_dir, exist_ok=True)
+    os.makedirs(task["workdir"], exist_ok=True)
+
+    if task["handlers"] is None:
+        worker_handlers = os.path.abspath(handlers_dir)  # shared: tools it creates are kept
+    else:
+        worker_handlers = os.path.join(state_dir, "handlers")
+        os.makedirs(worker_handlers, exist_ok=True)
+        for name in task["handlers"]:
+            for suffix in (".py", ".md"):
+                source = os.path.join(handlers_dir, name + suffix)
+                if os.path.exists(source):
+                    shutil.copy2(source, os.path.join(worker_handlers, name + suffix))
+        # Helper modules (_*.py) that the listed handlers import
+        for helper in Path(handlers_dir).glob("_*.py"):
+            shutil.copy2(helper, os.path.join(worker_handlers, helper.name))
+
+    with open(priming_prompt_file, 'r', encoding='utf-8') as f:
+        prompt = f.read() + role_prompt
+    prompt_file = os.path.join(state_dir, "priming_prompt.txt")
+    with open(prompt_file, 'w', encoding='utf-8') as f:
+        f.write(prompt)
+
+    task_file = os.path.join(state_dir, "task.json")
+    with open(task_file, 'w', encoding='utf-8') as f:
+        json.dump(dict(task, state_dir=state_dir, handlers_dir=worker_handlers, priming_prompt_file=prompt_file,
+                       project_dir=os.path.abspath(project_dir or os.getcwd())), f, indent=2)
+    return task_file
+
+
+def worker_env(api_key: str = None) -> dict:
+    """The environment of a worker process: headless, no nested delegation, shared metrics and bus."""
+    env = dict(os.environ, PYTHONIOENCODING="utf-8", SEEDLING_SKIP_VERIFY="1", SEEDLING_FAST_START="0",
+               PYTHONPATH=os.pathsep.join(filter(None, [str(SOURCE_DIR), os.getenv("PYTHONPATH")])))
+    env[WORKER_ENV] = "1"
+    # Worker metrics go to the parent's file, marked with their own session ids
+    env["SEEDLING_METRICS_FILE"] = os.path.abspath(os.getenv("SEEDLING_METRICS_FILE", os.path.join(".seedling_cache", "metrics.jsonl")))
+    env["SEEDLING_BUS_DIR"] = os.path.abspath(message_bus.BUS_DIR)
+    env["SEEDLING_LLM_CACHE_DIR"] = os.path.abspath(os.getenv("SEEDLING_LLM_CACHE_DIR", os.path.join(".seedling_cache", "llm")))
+    if api_key:
+        env["MOONSHOT_API_KEY"] = api_key
+    return env
+
+
+def _stop_worker(process: subprocess.Popen):
+    """SIGTERM, so the worker closes its shells and handler workers; then kills everything it started."""
+    started = process_runner.descendants(process.pid)  # detached shells are in other sessions
+    if os.name != 'nt':
+        try:
+            process.send_signal(signal.SIGTERM)
+            process.wait(timeout=STOP_GRACE)
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+    process_runner.kill_tree(process)
+    for pid in started + process_runner.descendants(process.pid):
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except OSError:
+            pass  # already gone
+
+
+def _read_progress(state_dir: str) -> dict:
+    """What the worker last wrote about itself (steps so far), also if it never finished."""
+    try:
+        with open(os.path.join(state_dir, "progress.json"), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def run_worker(task: dict, task_file: str, env: dict, timeout: float = WORKER_TIMEOUT) -> dict:
+    """Runs one prepared worker process and returns its result (status, summary, steps, duration_s)."""
+    started = time.monotonic()
+    state_dir = os.path.dirname(task_file)
+    result = {"name": task["name"], "status": "failed", "summary": "", "steps": 0, "state_dir": state_dir}
+    popen_options = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP} if os.name == 'nt' else {"start_new_session": True}
+    try:
+        process = subprocess.Popen([sys.executable, str(SOURCE_DIR / "orchestrator.py"), "--worker", task_file],
+                                   cwd=state_dir, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                                   encoding='utf-8', errors='replace', **popen_options)
+    except OSError as e:
+        result["summary"] = f"The worker could not be started: {e}"
+        result["duration_s"] = time.monotonic() - started
+        return result
+    try:
+        stdout, stderr = process.communicate(timeout=timeout)
+        lines = [l for l in stdout.splitlines() if l.startswith("{")]
+        if lines:
+            result.update(json.loads(lines[-1]))
+        else:
+            result["summary"] = (stderr or stdout or "The worker produced no result.").strip()[-2000:]
+    except subprocess.TimeoutExpired:
+        _stop_worker(process)
+        process.communicate()
+        result["steps"] = _read_progress(state_dir).get("steps", 0)
+        result["summary"] = f"The worker was stopped after {timeout:g} seconds."
+    except ValueError as e:
+        result["summary"] = f"The worker's result could not be read: {e}"
+    result["duration_s"] = time.monotonic() - started
+    return result
+
+
+def run_plan(tasks: list, max_workers: int, handlers_dir: str = "handlers",
+             priming_prompt_file: str = "priming_prompt.txt", api_key: str = None, progress=None) -> list:
+    """Runs every task in a worker process, at most max_workers at a time; results in task order."""
+    run_dir = os.path.join(os.path.abspath(WORKERS_DIR), time.strftime('%Y%m%d-%H%M%S') + f"-{os.getpid()}")
+    env = worker_env(api_key)
+
+    results = [None] * len(tasks)
+    lock = threading.Lock()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {}
+        for index, task in enumerate(tasks):
+            others = [t["name"] for t in tasks if t is not task]
+            task_file = prepare_worker(task, os.path.join(run_dir, task["name"]), worker_role(task, others),
+                                       handlers_dir, priming_prompt_file)
+            futures[pool.submit(run_worker, task, task_file, dict(env, SEEDLING_AGENT_NAME=task["name"]))] = index
+        for future in as_completed(futures):
+            result = future.result()
+            results[futures[future]] = result
+            if progress:
+                with lock:
+                    progress(f"[INFO] Worker '{result['name']}' finished: {result['status']} "
+                             f"({result['steps']} steps, {result['duration_s']:.1f} s).")
+    return results
+
+
+def format_report(results: list, max_workers: int, duration: float) -> str:
+    done = sum(1 for r in results if r["status"] == "complete")
+    tag = "[SUCCESS]" if done == len(results) else "[INFO]"
+    lines = [f"{tag} {done} of {len(results)} subtasks completed ({max_workers} at a time, {duration:.1f} s)."]
+    for i, r in enumerate(results, 1):
+        lines.append(f"\n### [{i}] {r['name']}: {r['status']} ({r['steps']} steps, {r['duration_s']:.1f} s)")
+        lines.append(r["summary"] or "(no summary)")
+        lines.append(f"Details: {os.path.join(r['state_dir'], 'log.html')}")
+    return "\n".join(lines)
+
+
+def delegate(plan_text: str, handlers_dir: str = "handlers", priming_prompt_file: str = "priming_prompt.txt",
+             api_key: str = None, progress=None) -> str:
+    """The delegate_begin command's second step: validate the plan, run the workers, report."""
+    if os.getenv(WORKER_ENV):
+        return "[ERROR] Workers cannot delegate. Do the subtask yourself."
+    try:
+        tasks, max_workers = parse_plan(plan_text, handlers_dir=handlers_dir)
+    except PlanError as e:
+        return f"[ERROR] {e} Nothing was started. Send delegate_begin again, then the corrected plan."
+    if progress:
+        progress(f"[INFO] Starting {len(tasks)} worker(s), {max_workers} at a time: {', '.join(t['name'] for t in tasks)}")
+    started = time.monotonic()
+    results = run_plan(tasks, max_workers, handlers_dir, priming_prompt_file, api_key, progress)
+    return format_report(results, max_workers, time.monotonic() - started)
+
+
+# --- Worker side ---
+
+def _worker_main(task_file: str):
+    with open(task_file, 'r', encoding='utf-8') as f:
+        task = json.load(f)
+    state_dir = task["state_dir"]
+    real_stdout = sys.stdout
+    # The worker's console goes to a file; only the final JSON line goes to the parent
+    console = open(os.path.join(state_dir, "console.txt"), 'w', encoding='utf-8')
+    sys.stdout = console
+    outcome = {"status": "incomplete", "summary": "", "steps": 0}
+    progress_file = os.path.join(state_dir, "progress.json")
+    try:
+        os.chdir(state_dir)
+        import cli_tool
+        import tool_registry, output_store, tracing, shell_session, handler_pool
+        from memory_store import MemoryStore
+
+        def stop(signum, frame):
+            # Timed out: end what this worker started before the parent kills what is left
+            shell_session.close_all()
+            if handler_pool._pool is not None:
+                handler_pool._pool.shutdown()
+            raise SystemExit(f"The worker was stopped by the orchestrator (signal {signum}).")
+        if os.name != 'nt':
+            signal.signal(signal.SIGTERM, stop)
+
+        cli_tool.HANDLERS_DIR = task["handlers_dir"]
+        cli_tool.PRIMING_PROMPT_FILE = task["priming_prompt_file"]
+        cli_tool.MEMORY_FILE = os.path.join(state_dir, "memory.txt")
+        # Everything the worker writes for itself goes to its state directory, not its workdir
+        cli_tool._html_log.path = os.path.join(state_dir, "log.html")
+        # Relevant memories come from the project; workers do not write any
+        cli_tool._memory_store = MemoryStore(task["project_dir"], "memory.txt")
+        cli_tool.process_and_save_memory = lambda *args, **kwargs: None
+        tool_registry.MANIFEST_FILE = os.path.join(state_dir, "tool_manifest.json")
+        output_store.STORE_DIR = os.path.join(state_dir, "output_store")
+        process_runner.SPILL_DIR = os.path.join(state_dir, "outputs")
+        tracing.TRACE_DIR = os.path.join(state_dir, "traces")
+
+        execute_command = cli_tool.execute_command
+        def capture_result(command_str):
+            try:
+                return execute_command(command_str)
+            except cli_tool.TaskComplete as e:
+                outcome["status"], outcome["summary"] = "complete", e.message
+                raise
+            except cli_tool.UserInputRequired as e:
+                outcome["question"] = e.message
+                raise
+        cli_tool.execute_command = capture_result
+
+        ask_model = cli_tool.get_ai_response_with_history
+        def limited(*args, **kwargs):
+            outcome["steps"] += 1
+            with open(progress_file, 'w', encoding='utf-8') as f:
+                json.dump({"steps": outcome["steps"]}, f)
+            if outcome["steps"] > task["max_steps"]:
+                outcome["summary"] = f"Stopped after {task['max_steps']} steps without task_complete."
+                raise RuntimeError(outcome["summary"])
+            return ask_model(*args, **kwargs)
+        cli_tool.get_ai_response_with_history = limited
+
+        answers = {"goal_sent": False, "auto": 0}
+        def scripted_input(*args):
+            if not answers["goal_sent"]:
+                answers["goal_sent"] = True
+                return task["goal"]
+            if outcome["status"] == "complete" or answers["auto"] >= MAX_AUTO_ANSWERS:
+                return "exit"
+            if task.get("on_input", "auto") != "auto":
+                outcome["status"] = "deferred" if task["on_input"] == "defer" else "failed"
+                outcome["question"] = outcome.get("question") or "(the agent stopped and waited for input)"
+                outcome["summary"] = f"Stopped at a question for the user: {outcome['question']}"
+                return "exit"
+            answers["auto"] += 1
+            return AUTO_ANSWER
+        cli_tool.input = scripted_input
+
+        os.chdir(task["workdir"])
+        cli_tool.main()
+        cli_tool._html_log.flush()
+    except BaseException as e:
+        outcome["status"] = "failed"
+        outcome["summary"] = f"{type(e).__name__}: {e}"
+    finally:
+        sys.stdout = real_stdout
+        console.close()
+    if outcome["status"] == "incomplete" and not outcome["summary"]:
+        outcome["summary"] = "The worker stopped without calling task_complete. See its log for the last steps."
+    print(json.dumps(outcome))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--worker":
+        _worker_main(sys.argv[2])
+    else:
+        print("Usage: python orchestrator.py --worker <task.json>  (started by the delegate_begin command)")
@@ -0,0 +1,138 @@
+# MIT License - Copyright (c) 2025 Viktor Kirschner
+"""
+On-disk store for large tool outputs.
+
+A tool result longer than INLINE_CHARS is written to .seedling_cache/output_store/<id>.txt,
+where the id is a prefix of the output's SHA-256: the same output is stored once, however
+often it comes back. The conversation history then holds only a preview (the first and
+last lines) and the id. The model pages through the rest with show_output <id> [page], so
+a big read_file or command dump is not re-sent with every later request.
+
+SEEDLING_OUTPUT_INLINE sets the threshold in characters (0 keeps every output inline).
+"""
+import os
+import hashlib
+
+INLINE_CHARS = int(os.getenv("SEEDLING_OUTPUT_INLINE", "6000"))
+STORE_DIR = os.path.join(".seedling_cache", "output_store")
+PAGE_CHARS = 5000
+PREVIEW_HEAD_CHARS = 1500
+PREVIEW_TAIL_CHARS = 700
+ID_LENGTH = 12
+# Oldest outputs are deleted once the store holds more than this many
+MAX_STORED = 2000
+
+_page_cache = {}  # id -> list of (start, end) offsets into the text
+_pruned = False
+
+
+def output_path(output_id: str) -> str:
+    return os.path.join(STORE_DIR, f"{output_id}.txt")
+
+
+def _prune():
+    global _pruned
+    _pruned = True
+    try:
+        with os.scandir(STORE_DIR) as it:
+            entries = [(e.stat().st_mtime, e.path) for e in it if e.name.endswith(".txt")]
+    except OSError:
+        return
+    entries.sort()
+    for _, path in entries[:max(0, len(entries) - MAX_STORED)]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def store(text: str) -> str:
+    """Saves text (once per distinct content) and returns its id."""
+    output_id = hashlib.sha256(text.encode('utf-8', errors='replace')).hexdigest()[:ID_LENGTH]
+    path = output_path(output_id)
+    if os.path.exists(path):
+        os.utime(path)  # recently used outputs survive pruning
+        return output_id
+    os.makedirs(STORE_DIR, exist_ok=True)
+    if not _pruned:
+        _prune()
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+    return output_id
+
+
+def load(output_id: str):
+    """The stored text, or None if there is no output with that id."""
+    try:
+        with open(output_path(output_id), 'r', encoding='utf-8', newline='') as f:
+            return f.read()
+    except (OSError, ValueError):
+        return None
+
+
+def paginate(text: str, page_chars: int = PAGE_CHARS) -> list:
+    """(start, end) offsets of pages of at most page_chars, cut at line ends where possible."""
+    pages, start = [], 0
+    while start < len(text):
+        end = min(start + page_chars, len(text))
+        if end < len(text):
+            newline = text.rfind("\n", start, end)
+            if newline > start:
+                end = newline + 1
+        pages.append((start, end))
+        start = end
+    return pages or [(0, 0)]
+
+
+def _preview(text: str) -> str:
+    head_end = text.rfind("\n", 0, PREVIEW_HEAD_CHARS)
+    head_end = head_end + 1 if head_end > PREVIEW_HEAD_CHARS // 2 else PREVIEW_HEAD_CHARS
+    tail_start = text.find("\n", len(text) - PREVIEW_TAIL_CHARS)
+    tail_start = tail_start + 1 if -1 < tail_start < len(text) - PREVIEW_TAIL_CHARS // 2 else len(text) - PREVIEW_TAIL_CHARS
+    hidden = text[head_end:tail_start]
+    return (f"{text[:head_end].rstrip()}\n"
+            f"[... {len(hidden):,} characters ({hidden.count(chr(10)):,} lines) not shown ...]\n"
+            f"{text[tail_start:].lstrip(chr(10))}")
+
+
+def compact(text: str) -> str:
+    """
+    The version of a tool result that goes into the conversation history: the text itself
+    if it is short, else a preview plus the id of the stored full text.
+    """
+    if not INLINE_CHARS or not text or len(text) <= INLINE_CHARS:
+        return text
+    try:
+        output_id = store(text)
+    except OSError:
+        return text  # no store, no loss: keep the output inline
+    pages = paginate(text)
+    _page_cache[output_id] = pages
+    return (f"{_preview(text)}\n"
+            f"[OUTPUT STORED] The full output ({len(text):,} characters, {text.count(chr(10)) + 1:,} lines) is stored as "
+            f"'{output_id}' in {len(pages)} pages. Read it with: show_output {output_id} <page>")
+
+
+def show(output_id: str = None, page: str = "1") -> str:
+    """The show_output command: one page of a stored output."""
+    if not output_id:
+        return "[ERROR] Usage: show_output <id> [page]"
+    text = load(output_id)
+    if text is None:
+        return f"[ERROR] No stored output with id '{output_id}'. Use the id from an [OUTPUT STORED] note."
+    try:
+        number = int(page)
+    except ValueError:
+        return f"[ERROR] Invalid page '{page}'. Use a page number."
+    pages = _page_cache.get(output_id) or paginate(text)
+    _page_cache[output_id] = pages
+    if not 1 <= number <= len(pages):
+        return f"[ERROR] Output '{output_id}' has {len(pages)} pages; page {number} does not exist."
+    start, end = pages[number - 1]
+    first_line = text.count("\n", 0, start) + 1
+    footer = f"Next: show_output {output_id} {number + 1}" if number < len(pages) else "This is the last page."
+    return (f"--- Output {output_id}, page {number} of {len(pages)} (from line {first_line}) ---\n"
+            f"{text[start:end].rstrip(chr(10))}\n"
+            f"--- {footer} ---")
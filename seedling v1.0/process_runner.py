@@ -0,0 +1,294 @@
+# MIT License - Copyright (c) 2025 Viktor Kirschner
+"""
+Streaming executor for run_powershell and the handlers that run as a subprocess.
+
+subprocess.run(capture_output=True) shows nothing until the process exits and keeps all
+of its output in memory. run() reads stdout and stderr while the process runs instead:
+
+- Output is echoed live once a command has run for LIVE_AFTER seconds, so a long build
+  shows progress. Quick commands are never echoed; their result is shown as usual.
+- Only the first HEAD_BYTES and the last TAIL_BYTES of each stream are kept for the model.
+  When a stream outgrows that, its full text is spilled to .seedling_cache/outputs/ and
+  the returned text names the file.
+- Besides the wall-clock timeout, an optional idle timeout ends commands that stop
+  producing output (SEEDLING_IDLE_TIMEOUT seconds; off by default, since a quiet build or
+  test run is not necessarily stuck). A timeout kills the whole process tree.
+
+The result mirrors subprocess.run(): a CompletedProcess, or subprocess.TimeoutExpired
+(IdleTimeout for the idle case) carrying whatever output was captured.
+"""
+import os
+import sys
+import time
+import queue
+import codecs
+import signal
+import threading
+import subprocess
+
+DEFAULT_TIMEOUT = float(os.getenv("SEEDLING_COMMAND_TIMEOUT", "300"))
+IDLE_TIMEOUT = float(os.getenv("SEEDLING_IDLE_TIMEOUT", "0"))
+HEAD_BYTES = int(os.getenv("SEEDLING_OUTPUT_HEAD", "16384"))
+TAIL_BYTES = int(os.getenv("SEEDLING_OUTPUT_TAIL", "16384"))
+# Seconds a command runs before its output is echoed live
+LIVE_AFTER = 1.0
+SPILL_DIR = os.path.join(".seedling_cache", "outputs")
+READ_CHUNK = 65536
+
+_spill_counter = 0
+_spill_lock = threading.Lock()
+
+
+class IdleTimeout(subprocess.TimeoutExpired):
+    """The command produced no output for `timeout` seconds."""
+
+    def __str__(self):
+        return f"Command '{self.cmd}' produced no output for {self.timeout:g} seconds"
+
+
+def _spill_path(label: str, stream: str) -> str:
+    global _spill_counter
+    with _spill_lock:
+        _spill_counter += 1
+        number = _spill_counter
+    safe_label = "".join(c if c.isalnum() or c in "-_" else "_" for c in label)[:40] or "output"
+    os.makedirs(SPILL_DIR, exist_ok=True)
+    return os.path.join(SPILL_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{number}-{safe_label}.{stream}.log")
+
+
+class BoundedCapture:
+    """Keeps the head and tail of a byte stream; spills the full stream to a file once it outgrows them."""
+
+    def __init__(self, label: str = "output", stream: str = "stdout", head_bytes: int = HEAD_BYTES, tail_bytes: int = TAIL_BYTES):
+        self.label = label
+        self.stream = stream
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total = 0
+        self.spill_path = None
+        self._spill = None
+
+    def write(self, data: bytes):
+        self.total += len(data)
+        if self._spill is None and self.total > self.head_bytes + self.tail_bytes:
+            # Nothing has been dropped yet, so head + tail + data is still the complete stream
+            try:
+                self.spill_path = _spill_path(self.label, self.stream)
+                self._spill = open(self.spill_path, 'wb')
+                self._spill.write(self.head)
+                self._spill.write(self.tail)
+            except OSError:
+                self._spill = False  # keep going without the full copy
+        if self._spill:
+            self._spill.write(data)
+
+        room = self.head_bytes - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+        if data:
+            self.tail += data
+            if len(self.tail) > self.tail_bytes:
+                del self.tail[:len(self.tail) - self.tail_bytes]
+
+    def close(self):
+        if self._spill:
+            self._spill.close()
+        self._spill = None
+
+    def text(self) -> str:
+        omitted = self.total - len(self.head) - len(self.tail)
+        if omitted <= 0:
+            return (bytes(self.head) + bytes(self.tail)).decode('utf-8', errors='replace').replace('\r\n', '\n')
+        # Cut at line boundaries so neither part starts or ends mid-line
+        head, tail = bytes(self.head), bytes(self.tail)
+        cut = head.rfind(b"\n")
+        if cut > len(head) // 2:
+            omitted += len(head) - cut - 1
+            head = head[:cut + 1]
+        cut = tail.find(b"\n")
+        if -1 < cut < len(tail) // 2:
+            omitted += cut + 1
+            tail = tail[cut + 1:]
+        where = f"Full output: {self.spill_path}" if self.spill_path else "The full output could not be saved"
+        marker = f"\n[... {omitted} bytes of {self.stream} omitted. {where} ...]\n"
+        return (head.decode('utf-8', errors='replace') + marker + tail.decode('utf-8', errors='replace')).replace('\r\n', '\n')
+
+
+def kill_tree(process: subprocess.Popen):
+    try:
+        if os.name == 'nt':
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)], capture_output=True, timeout=10)
+        else:
+            os.killpg(process.pid, signal.SIGKILL)
+    except (OSError, subprocess.SubprocessError):
+        pass
+    try:
+        process.kill()
+    except OSError:
+        pass
+
+
+def descendants(pid: int) -> list:
+    """All descendants of pid (children first), without the pid itself. Empty on Windows."""
+    children = {}
+    if os.path.isdir("/proc"):
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat", 'rb') as f:
+                    # The command name may contain spaces; the ppid follows the closing parenthesis
+                    ppid = int(f.read().rsplit(b")", 1)[1].split()[1])
+                children.setdefault(ppid, []).append(int(entry))
+            except (OSError, IndexError, ValueError):
+                continue
+    elif os.name != 'nt':
+        try:
+            listing = subprocess.run(["ps", "-A", "-o", "pid=,ppid="], capture_output=True, text=True, timeout=10).stdout
+            for line in listing.splitlines():
+                child, parent = map(int, line.split())
+                children.setdefault(parent, []).append(child)
+        except (OSError, ValueError, subprocess.SubprocessError):
+            return []
+    found, todo = [], list(children.get(pid, []))
+    while todo:
+        child = todo.pop()
+        found.append(child)
+        todo.extend(children.get(child, []))
+    return found
+
+
+def _pump(pipe, name: str, chunks: queue.Queue):
+    try:
+        while True:
+            data = pipe.read(READ_CHUNK)
+            if not data:
+                break
+            chunks.put((name, data))
+    except (OSError, ValueError):
+        pass
+    finally:
+        chunks.put((name, None))
+
+
+def collect(chunks: queue.Queue, label: str = "command", timeout: float = DEFAULT_TIMEOUT,
+            idle_timeout: float = IDLE_TIMEOUT, echo=None, started: float = None, streams=("stdout", "stderr")) -> tuple:
+    """
+    Reads (stream name, bytes) chunks from a queue until every stream has sent None, into a
+    BoundedCapture per stream, and echoes them live once LIVE_AFTER seconds have passed.
+    Returns (captures, streamed, expired): expired is None, subprocess.TimeoutExpired or
+    IdleTimeout. Shared by run() and the warm handler workers (handler_pool).
+    """
+    captures = {name: BoundedCapture(label, name) for name in streams}
+    decoders = {name: codecs.getincrementaldecoder('utf-8')(errors='replace') for name in captures}
+    started = started or time.monotonic()
+    last_output = started
+    open_streams = len(captures)
+    live = False
+    pending, pending_bytes = [], 0  # output held back until the command counts as long-running
+
+    def show(name, data):
+        text = decoders[name].decode(data)
+        if text:
+            echo(name, text.replace('\r\n', '\n'))
+
+    try:
+        while open_streams:
+            now = time.monotonic()
+            if now - started >= timeout:
+                return captures, live, subprocess.TimeoutExpired
+            if idle_timeout and now - last_output >= idle_timeout:
+                return captures, live, IdleTimeout
+            if echo and not live and (now - started >= LIVE_AFTER or pending_bytes > HEAD_BYTES):
+                live = True
+                for name, data in pending:
+                    show(name, data)
+                pending = []
+            wait = timeout - (now - started)
+            if idle_timeout:
+                wait = min(wait, idle_timeout - (now - last_output))
+            if echo and not live:
+                wait = min(wait, LIVE_AFTER - (now - started))
+            try:
+                name, data = chunks.get(timeout=max(0.01, wait))
+            except queue.Empty:
+                continue
+            if data is None:
+                open_streams -= 1
+                continue
+            last_output = time.monotonic()
+            captures[name].write(data)
+            if echo and live:
+                show(name, data)
+            elif echo:
+                pending.append((name, data))
+                pending_bytes += len(data)
+        return captures, live, None
+    finally:
+        for capture in captures.values():
+            capture.close()
+
+
+def run(cmd: list, timeout: float = DEFAULT_TIMEOUT, idle_timeout: float = IDLE_TIMEOUT,
+        label: str = "command", echo=None, cwd=None, env=None) -> subprocess.CompletedProcess:
+    """
+    Runs cmd, streaming its output. echo(stream_name, text) receives the live output of
+    commands that run longer than LIVE_AFTER seconds. Returns a CompletedProcess whose
+    stdout/stderr hold the bounded text; .streamed tells whether the output was echoed.
+    """
+    popen_options = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP} if os.name == 'nt' else {"start_new_session": True}
+    process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                               bufsize=0, cwd=cwd, env=env, **popen_options)
+    chunks = queue.Queue()
+    for name in ("stdout", "stderr"):
+        threading.Thread(target=_pump, args=(getattr(process, name), name, chunks), daemon=True).start()
+
+    started = time.monotonic()
+    expired = None
+    try:
+        captures, live, expired = collect(chunks, label, timeout, idle_timeout, echo, started)
+        if expired is None:
+            try:
+                # Both pipes are closed; only a detached grandchild could keep us here
+                returncode = process.wait(timeout=max(0.1, timeout - (time.monotonic() - started)))
+            except subprocess.TimeoutExpired:
+                expired = subprocess.TimeoutExpired
+    finally:
+        if expired is not None or process.poll() is None:
+            kill_tree(process)
+
+    stdout, stderr = captures["stdout"].text(), captures["stderr"].text()
+    if expired is not None:
+        raise expired(cmd, idle_timeout if expired is IdleTimeout else timeout, output=stdout, stderr=stderr)
+    result = subprocess.CompletedProcess(cmd, returncode, stdout, stderr)
+    result.streamed = live
+    result.spilled = [c.spill_path for c in captures.values() if c.spill_path]
+    return result
+
+
+def describe_timeout(e: subprocess.TimeoutExpired) -> str:
+    """The timeout message plus the output captured before the process was killed."""
+    parts = [f"{e}. The process was killed."]
+    if e.output:
+        parts.append(f"Output before it was stopped:\n{e.output}")
+    if e.stderr:
+        parts.append(f"Error output:\n{e.stderr}")
+    return "\n".join(parts)
+
+
+if __name__ == "__main__":
+    # python process_runner.py <command> [args...]: run a command the way the agent does
+    if len(sys.argv) < 2:
+        print("Usage: python process_runner.py <command> [args...]")
+        sys.exit(1)
+    try:
+        completed = run(sys.argv[1:], echo=lambda name, text: print(text, end='', file=sys.stderr if name == "stderr" else sys.stdout))
+        if not completed.streamed:
+            print(completed.stdout, end='')
+            print(completed.stderr, end='', file=sys.stderr)
+        print(f"\n[exit code {completed.returncode}]{' spilled: ' + ', '.join(completed.spilled) if completed.spilled else ''}")
+    except subprocess.TimeoutExpired as e:
+        print(f"\n[TIMEOUT] {describe_timeout(e)}")
@@ -0,0 +1,111 @@
+# MIT License - Copyright (c) 2025 Viktor Kirschner
+"""
+Removes repeated tool outputs from the history that is sent to the model.
+
+The agent often runs the same command twice (list_contents handlers after every new
+tool, read_file on a file it already read). Each copy would be sent again with every
+later request. Before a request, dedupe() looks at the tool results in the history,
+newest first:
+
+- An output identical (by hash) to a later one is replaced by a short note pointing to
+  the later copy (SEEDLING_DEDUPE_OUTPUTS=0 turns this off).
+- The output of a read-only command (READ_COMMANDS) that was run again later with the
+  same arguments is replaced by "superseded by a later read", even when the text differs:
+  the later view is the current one (SEEDLING_SUPERSEDE_READS=0 turns this off).
+
+Only the copy that is sent changes; conversation_history keeps every output. The newest
+copy always stays, so nothing the model still needs is lost.
+"""
+import os
+import re
+import shlex
+import hashlib
+
+DEDUPE_IDENTICAL = os.getenv("SEEDLING_DEDUPE_OUTPUTS", "1") != "0"
+SUPERSEDE_READS = os.getenv("SEEDLING_SUPERSEDE_READS", "1") != "0"
+# Commands whose later run with the same arguments makes an earlier output stale
+READ_COMMANDS = {"read_file", "list_contents", "describe_tool", "show_output"}
+# Outputs shorter than this are left alone; the note would not be much shorter
+MIN_CHARS = 300
+
+# The tool feedback messages written by cli_tool.main()
+SINGLE_PREFIX = "The result of your last command was:\n\n"
+SINGLE_SUFFIX = "\n\nBased on this, what is your next action?"
+PARALLEL_PREFIX = "The results of your parallel commands were:\n\n"
+PARALLEL_SECTION = re.compile(r"^### \[(\d+)\] (.*)$", re.M)
+COMMAND_PATTERN = re.compile(r"\[CMD_START\](.*?)(?:\[CMD_END\]|$)", re.S)
+
+_parse_cache = {}  # (hash, length) of a message's content -> its tool outputs
+
+
+def _normalize(command: str) -> str:
+    try:
+        return " ".join(shlex.split(command))
+    except ValueError:
+        return " ".join(command.split())
+
+
+def _outputs(message: dict, previous: dict) -> list:
+    """[(command, start, end, digest)] for every tool output inside one feedback message."""
+    content = message.get("content")
+    if message.get("role") != "user" or not isinstance(content, str):
+        return []
+    key = (hash(content), len(content), previous.get("content") if previous else None)
+    cached = _parse_cache.get(key)
+    if cached is not None:
+        return cached
+
+    found = []
+    if content.startswith(SINGLE_PREFIX) and content.endswith(SINGLE_SUFFIX):
+        match = COMMAND_PATTERN.search(str(previous.get("content", ""))) if previous else None
+        if match:
+            start, end = len(SINGLE_PREFIX), len(content) - len(SINGLE_SUFFIX)
+            found.append((match.group(1).strip(), start, end))
+    elif content.startswith(PARALLEL_PREFIX):
+        headers = list(PARALLEL_SECTION.finditer(content))
+        for i, header in enumerate(headers):
+            start = header.end() + 1
+            end = headers[i + 1].start() - 2 if i + 1 < len(headers) else content.rfind(SINGLE_SUFFIX)
+            if end > start:
+                found.append((header.group(2).strip(), start, end))
+    found = [(cmd, start, end, hashlib.sha1(content[start:end].encode('utf-8', errors='replace')).hexdigest())
+             for cmd, start, end in found]
+    if len(_parse_cache) > 4096:
+        _parse_cache.clear()
+    _parse_cache[key] = found
+    return found
+
+
+def dedupe(history: list) -> list:
+    """The history to send, with older duplicate and superseded outputs replaced by notes."""
+    if not (DEDUPE_IDENTICAL or SUPERSEDE_READS) or len(history) < 4:
+        return history
+
+    seen_outputs = {}   # digest -> command of the newest copy
+    seen_reads = set()  # normalized read-only commands already seen (newer)
+    replacements = {}   # message index -> [(start, end, note)]
+    for index in range(len(history) - 1, 0, -1):
+        for command, start, end, digest in reversed(_outputs(history[index], history[index - 1])):
+            normalized = _normalize(command)
+            name = normalized.split(" ", 1)[0]
+            note = None
+            if end - start >= MIN_CHARS:
+                if SUPERSEDE_READS and name in READ_COMMANDS and normalized in seen_reads:
+                    note = f"[Output omitted: superseded by a later read. The result of the later `{command}` below is current.]"
+                elif DEDUPE_IDENTICAL and digest in seen_outputs:
+                    note = f"[Output omitted: identical to the result of the later `{seen_outputs[digest]}` below.]"
+            if note:
+                replacements.setdefault(index, []).append((start, end, note))
+            seen_outputs.setdefault(digest, command)
+            if name in READ_COMMANDS:
+                seen_reads.add(normalized)
+
+    if not replacements:
+        return history
+    result = list(history)
+    for index, parts in replacements.items():
+        content = history[index]["content"]
+        for start, end, note in sorted(parts, reverse=True):
+            content = content[:start] + note + content[end:]
+        result[index] = dict(history[index], content=content)
+    return result
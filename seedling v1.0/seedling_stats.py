@@ -0,0 +1,123 @@
+# MIT License - Copyright (c) 2025 Viktor Kirschner
+"""
+seedling-stats: summary of the metrics recorded in .seedling_cache/metrics.jsonl.
+
+Usage: python seedling_stats.py [metrics.jsonl ...] [--since=HOURS] [--session=ID]
+
+Prints, per model, the calls, errors, retries, tokens, time to first token, latency and
+cost, and, per tool, the calls, errors, duration and output size (p50/p95 where it
+helps). It ends with the share of wall time spent waiting for the model versus running
+tools. Without file arguments the workspace's metrics file is read.
+"""
+import os
+import sys
+import json
+import time
+
+from metrics import METRICS_FILE, percentile
+
+
+def read_records(paths: list, since: float = None, session: str = None):
+    for path in paths:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # a line cut short by a crash
+                    if since and record.get("ts", 0) < since:
+                        continue
+                    if session and record.get("session") != session:
+                        continue
+                    yield record
+        except OSError as e:
+            print(f"[ERROR] Cannot read '{path}': {e}", file=sys.stderr)
+
+
+def _fmt(value, digits=2) -> str:
+    if value is None:
+        return "-"
+    return f"{value:.{digits}f}" if isinstance(value, float) else str(value)
+
+
+def _table(header: list, rows: list) -> str:
+    widths = [max(len(str(cell)) for cell in column) for column in zip(header, *rows)]
+    lines = ["  ".join(str(cell).rjust(w) if i else str(cell).ljust(w) for i, (cell, w) in enumerate(zip(row, widths)))
+             for row in [header] + rows]
+    lines.insert(1, "-" * len(lines[0]))
+    return "\n".join(lines)
+
+
+def report(records) -> str:
+    models, tools, sessions = {}, {}, set()
+    for r in records:
+        sessions.add(r.get("session"))
+        if r.get("kind") == "llm":
+            models.setdefault(r.get("model") or "unknown", []).append(r)
+        elif r.get("kind") == "tool":
+            tools.setdefault(r.get("tool") or "unknown", []).append(r)
+    if not models and not tools:
+        return "[INFO] No metrics recorded yet."
+
+    output = [f"Sessions: {len(sessions)}"]
+    llm_time = tool_time = 0.0
+
+    rows = []
+    for model, calls in sorted(models.items()):
+        prompt = [c.get("prompt_tokens") or 0 for c in calls]
+        completion = [c.get("completion_tokens") or 0 for c in calls]
+        latency = [c.get("latency_s") or 0.0 for c in calls]
+        ttft = [c["ttft_s"] for c in calls if c.get("ttft_s") is not None]
+        costs = [c["cost_usd"] for c in calls if c.get("cost_usd") is not None]
+        llm_time += sum(latency)
+        rows.append([
+            model, len(calls), sum(1 for c in calls if c.get("error")), sum(c.get("retries") or 0 for c in calls),
+            sum(1 for c in calls if c.get("cached")),
+            sum(prompt), _fmt(percentile(prompt, 0.5), 0), _fmt(percentile(prompt, 0.95), 0), sum(completion),
+            _fmt(percentile(ttft, 0.5)), _fmt(percentile(ttft, 0.95)),
+            _fmt(percentile(latency, 0.5)), _fmt(percentile(latency, 0.95)),
+            f"{sum(costs):.4f}" if costs else "-",
+        ])
+    if rows:
+        output += ["", "Model calls (times in seconds)", _table(
+            ["model", "calls", "errors", "retries", "cached", "prompt tok", "p50", "p95", "completion tok",
+             "ttft p50", "ttft p95", "latency p50", "latency p95", "cost USD"], rows)]
+
+    rows = []
+    for tool, calls in sorted(tools.items(), key=lambda item: -sum(c.get("duration_s") or 0.0 for c in item[1])):
+        durations = [c.get("duration_s") or 0.0 for c in calls]
+        tool_time += sum(durations)
+        rows.append([
+            tool, len(calls), sum(1 for c in calls if c.get("status") in ("error", "exception")),
+            _fmt(percentile(durations, 0.5), 3), _fmt(percentile(durations, 0.95), 3), _fmt(sum(durations), 3),
+            sum(c.get("output_bytes") or 0 for c in calls),
+        ])
+    if rows:
+        output += ["", "Tools (times in seconds)", _table(
+            ["tool", "calls", "errors", "p50", "p95", "total", "output bytes"], rows)]
+
+    total = llm_time + tool_time
+    if total:
+        output += ["", f"Time waiting for the model: {llm_time:.2f} s ({llm_time / total:.0%}), "
+                       f"running tools: {tool_time:.2f} s ({tool_time / total:.0%})"]
+    return "\n".join(output)
+
+
+def main():
+    options = dict(a[2:].split("=", 1) for a in sys.argv[1:] if a.startswith("--") and "=" in a)
+    paths = [a for a in sys.argv[1:] if not a.startswith("--")] or [METRICS_FILE]
+    if not any(os.path.exists(p) for p in paths):
+        print(f"[INFO] No metrics file found at {', '.join(paths)}. Run the agent first (SEEDLING_METRICS=1).")
+        return
+    try:
+        since = time.time() - float(options["since"]) * 3600 if "since" in options else None
+    except ValueError:
+        print(f"[ERROR] Invalid --since value '{options['since']}'. Use a number of hours.")
+        return
+    print(report(read_records(paths, since, options.get("session"))))
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    main()
@@ -0,0 +1,405 @@
+# MIT License - Copyright (c) 2025 Viktor Kirschner
+"""
+Persistent shell sessions for the run_shell command.
+
+Each session is one long-lived shell (bash on Linux and macOS, pwsh or Windows PowerShell
+on Windows), driven over its stdin/stdout pipes. The working directory, environment
+variables and shell functions survive from one command to the next, and no new shell is
+started per command.
+
+Every command is sent as one quoted string and followed by a sentinel line carrying a
+random token and the exit code. Everything before the sentinel is the command's output
+(stdout and stderr merged), bounded and spilled like process_runner output.
+
+On a timeout only the command is stopped; the shell and its state stay. bash runs with job
+control (set -m), so every command of the line gets a process group of its own, and the
+groups the timed-out line started are killed. A USR1 trap then makes the shell unwind to
+the wrapper function the line runs in (a DEBUG trap returns from every function on the
+way), so nothing after the stopped command (`a; b; c`) runs. Other shells (sh, PowerShell),
+or a bash that does not come back within STOP_GRACE seconds, are killed and restarted
+instead: the working directory is kept where it can be read (/proc on Linux), variables
+and functions are lost, and the result says so. If the shell exits (`exit`), the next
+command starts a new one.
+
+Sessions have names ("default" unless --session= is given) and are closed at exit.
+SEEDLING_SHELL picks the shell program.
+"""
+import os
+import sys
+import time
+import queue
+import signal
+import codecs
+import atexit
+import base64
+import shlex
+import shutil
+import secrets
+import threading
+import subprocess
+
+from process_runner import BoundedCapture, DEFAULT_TIMEOUT, IDLE_TIMEOUT, LIVE_AFTER, READ_CHUNK, descendants, kill_tree
+
+STOP_GRACE = 5.0  # seconds a stopped bash gets to come back to its prompt before it is restarted
+
+# Sent to every new bash. __seedling_run runs one command line; USR1 sets the flag that makes
+# the DEBUG trap return from each function (-T: functions inherit it) down to the wrapper.
+BASH_SETUP = r"""set -m -T
+shopt -s extdebug
+__seedling_unwind() { if (( ${#FUNCNAME[@]} > 1 )); then return 2; fi; __seedling_stop=; }
+trap '[[ -z $__seedling_stop ]] || __seedling_unwind' DEBUG
+trap '__seedling_stop=1' USR1
+__seedling_run() { local __seedling_line=$1; shift; eval "$__seedling_line"; }
+"""
+
+
+def default_shell() -> list:
+    """The shell command line: SEEDLING_SHELL if set, else the platform's native shell."""
+    configured = os.getenv("SEEDLING_SHELL")
+    candidates = [configured] if configured else (
+        ["pwsh", "powershell"] if os.name == 'nt' else ["bash", "sh"])
+    for name in candidates:
+        path = shutil.which(name)
+        if path:
+            break
+    else:
+        raise FileNotFoundError(f"No shell found (tried {', '.join(candidates)}). Set SEEDLING_SHELL to a shell program.")
+    if _is_powershell(path):
+        return [path, "-NoLogo", "-NoProfile", "-NonInteractive", "-Command", "-"]
+    if os.path.basename(path).startswith("bash"):
+        return [path, "--noprofile", "--norc"]
+    return [path]
+
+
+def _is_powershell(program: str) -> bool:
+    return os.path.basename(program).lower().split(".")[0] in ("pwsh", "powershell")
+
+
+class ShellSession:
+    """One long-lived shell process; run() executes a command in it and returns (exit_code, output)."""
+
+    def __init__(self, name: str = "default", shell: list = None, cwd: str = None):
+        self.name = name
+        self.shell = shell or default_shell()
+        self.powershell = _is_powershell(self.shell[0])
+        self.bash = os.name != 'nt' and os.path.basename(self.shell[0]).startswith("bash")
+        self.cwd = cwd or os.getcwd()
+        self.process = None
+        self._chunks = None
+        self._lock = threading.Lock()  # one command at a time per session
+
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def _start(self):
+        popen_options = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP} if os.name == 'nt' else {"start_new_session": True}
+        self.process = subprocess.Popen(self.shell, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                        bufsize=0, cwd=self.cwd, env=dict(os.environ, PYTHONIOENCODING="utf-8"), **popen_options)
+        self._chunks = queue.Queue()
+        threading.Thread(target=self._pump, args=(self.process.stdout, self._chunks), daemon=True).start()
+        if self.bash:
+            self.process.stdin.write(BASH_SETUP.encode('utf-8'))
+            self.process.stdin.flush()
+
+    @staticmethod
+    def _pump(pipe, chunks):
+        try:
+            while True:
+                data = pipe.read(READ_CHUNK)
+                if not data:
+                    break
+                chunks.put(data)
+        except (OSError, ValueError):
+            pass
+        finally:
+            chunks.put(None)  # the shell exited
+
+    def _script(self, command: str, token: str) -> str:
+        """The text sent to the shell: the command as one quoted string, then the sentinel."""
+        if self.powershell:
+            encoded = base64.b64encode(command.encode('utf-8')).decode('ascii')
+            return (
+                "$global:LASTEXITCODE = 0; $__ok = $true; "
+                f"try {{ Invoke-Expression ([Text.Encoding]::UTF8.GetString([Convert]::FromBase64String('{encoded}'))) 2>&1 | Out-String -Stream; $__ok = $? }} "
+                "catch { $_ | Out-String -Stream; $__ok = $false }; "
+                "$__code = if ($LASTEXITCODE) { $LASTEXITCODE } elseif ($__ok) { 0 } else { 1 }; "
+                f"[Console]::Out.Write(\"`n__SEEDLING_{token}__$__code`n\"); [Console]::Out.Flush()\n"
+            )
+        quoted = "'" + command.replace("'", "'\\''") + "'"
+        # eval keeps cd/export effects in the shell; a syntax error can't swallow the sentinel
+        runner = "__seedling_run" if self.bash else "eval"
+        return f"{runner} {quoted} < /dev/null 2>&1\nprintf '\\n__SEEDLING_{token}__%d\\n' \"$?\"\n"
+
+    def _stop_command(self, before: set) -> bool:
+        """
+        Kills what the running line started (processes not in `before`) and makes bash skip
+        the rest of the line. False if this shell can't do that and has to be restarted.
+        """
+        if not self.bash:
+            return False
+        shell = self.process.pid  # its own process group (start_new_session)
+        try:
+            # Deferred by bash until the foreground command is gone, then the DEBUG trap unwinds
+            os.kill(shell, signal.SIGUSR1)
+        except OSError:
+            return False
+        kept_groups = set()
+        for pid in before:
+            try:
+                kept_groups.add(os.getpgid(pid))
+            except OSError:
+                pass
+        kept_groups.discard(shell)
+        for pid in descendants(shell):
+            if pid in before:
+                continue
+            try:
+                group = os.getpgid(pid)
+                if group == shell:
+                    os.kill(pid, signal.SIGKILL)  # e.g. a $(...) subshell: shares the shell's group
+                elif group not in kept_groups:  # not a background job of an earlier command
+                    os.killpg(group, signal.SIGKILL)
+            except OSError:
+                pass
+        return True
+
+    def _restart(self) -> bool:
+        """Kills the shell and what it runs; the next command gets a new shell in the same directory if possible."""
+        try:
+            self.cwd = os.readlink(f"/proc/{self.process.pid}/cwd")
+            kept_cwd = True
+        except OSError:
+            kept_cwd = False  # no /proc (macOS, Windows): back to the session's first directory
+        self.close()
+        return kept_cwd
+
+    def close(self):
+        if self.process is not None:
+            try:
+                self.process.stdin.close()
+            except OSError:
+                pass
+            # Under job control the shell's jobs have process groups of their own
+            children = descendants(self.process.pid) if self.bash else []
+            kill_tree(self.process)
+            for pid in children:
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except OSError:
+                    pass
+            self.process = None
+
+    def run(self, command: str, timeout: float = DEFAULT_TIMEOUT, idle_timeout: float = IDLE_TIMEOUT, echo=None):
+        """
+        Runs one command. Returns (exit_code, output, note): exit_code is None when the
+        command was stopped, note explains timeouts and restarts (or is "").
+        """
+        with self._lock:
+            notes = []
+            if not self.alive():
+                if self.process is not None:
+                    notes.append(f"The shell of session '{self.name}' had exited; a new one was started (working directory and variables were reset).")
+                    self.close()
+                self._start()
+
+            token = secrets.token_hex(8)
+            marker = f"\n__SEEDLING_{token}__".encode('ascii')
+            # Processes already there (background jobs) are left alone if this command times out
+            before = set(descendants(self.process.pid)) if self.bash else set()
+            try:
+                self.process.stdin.write(self._script(command, token).encode('utf-8'))
+                self.process.stdin.flush()
+            except OSError as e:
+                self.close()
+                return None, "", f"Could not send the command to the shell: {e}"
+
+            capture = BoundedCapture(f"run_shell-{self.name}", "output")
+            decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+            buffer = b""
+            started = last_output = time.monotonic()
+            live, pending = False, []
+            exit_code = None
+            stopped = None  # when the command was stopped; then only the sentinel is awaited
+
+            def emit(data):
+                capture.write(data)
+                if not echo:
+                    return
+                if live:
+                    text = decoder.decode(data)
+                    if text:
+                        echo("stdout", text.replace('\r\n', '\n'))
+                else:
+                    pending.append(data)
+
+            while True:
+                now = time.monotonic()
+                expired = None
+                if stopped is None:
+                    expired = ("timeout" if now - started >= timeout else
+                               "idle" if idle_timeout and now - last_output >= idle_timeout else None)
+                if expired:
+                    notes.append(f"The command timed out after {timeout:g} seconds." if expired == "timeout"
+                                 else f"The command produced no output for {idle_timeout:g} seconds.")
+                    if self._stop_command(before):
+                        stopped = now
+                        continue
+                if expired or (stopped is not None and now - stopped >= STOP_GRACE):
+                    emit(buffer)
+                    kept_cwd = self._restart()
+                    notes.append(f"The shell of session '{self.name}' was restarted, so the rest of the command line "
+                                 f"did not run; variables and functions were reset"
+                                 + (f" (the working directory {self.cwd} was kept)." if kept_cwd else
+                                    f" and the working directory is {self.cwd} again."))
+                    break
+                if echo and not live and now - started >= LIVE_AFTER:
+                    live = True
+                    for data in pending:
+                        text = decoder.decode(data)
+                        if text:
+                            echo("stdout", text.replace('\r\n', '\n'))
+                    pending = []
+                try:
+                    data = self._chunks.get(timeout=0.05 if echo and not live else 0.25)
+                except queue.Empty:
+                    continue
+                if data is None:
+                    # The command ended the shell (e.g. `exit`); the next call starts a new one
+                    emit(buffer)
+                    notes.append(f"The shell of session '{self.name}' exited; the next command starts a new one.")
+                    self.process.wait()
+                    exit_code = self.process.returncode
+                    self.close()
+                    break
+                last_output = time.monotonic()
+                buffer += data
+                end = buffer.find(marker)
+                if end != -1:
+                    newline = buffer.find(b"\n", end + len(marker))
+                    if newline == -1:
+                        continue  # the exit code line is not complete yet
+                    emit(buffer[:end])
+                    if stopped is not None:
+                        # exit_code stays None: the command was stopped
+                        notes.append("It was stopped and the rest of the command line was skipped; "
+                                     "the session keeps its directory, variables and functions.")
+                        break
+                    try:
+                        exit_code = int(buffer[end + len(marker):newline].strip() or b"0")
+                    except ValueError:
+                        exit_code = None
+                    break
+                # Hold back what could be the start of a sentinel split across reads
+                safe = len(buffer) - len(marker)
+                if safe > 0:
+                    emit(buffer[:safe])
+                    buffer = buffer[safe:]
+
+            capture.close()
+            return exit_code, capture.text(), " ".join(notes)
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(name: str = "default") -> ShellSession:
+    with _sessions_lock:
+        session = _sessions.get(name)
+        if session is None:
+            session = _sessions[name] = ShellSession(name)
+        return session
+
+
+def close_session(name: str) -> bool:
+    with _sessions_lock:
+        session = _sessions.pop(name, None)
+    if session is None:
+        return False
+    session.close()
+    return True
+
+
+@atexit.register
+def close_all():
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
+
+
+def run_shell(command_text: str, echo=None) -> str:
+    """
+    The run_shell command.
+
+    Usage: run_shell [--session=NAME] [--timeout=SECONDS] <command>
+           run_shell --list | --close[=NAME]
+
+    The command runs in a persistent shell: cd, exported variables and functions carry
+    over to the next run_shell call of the same session.
+    """
+    text = command_text.strip()
+    session_name, timeout = "default", DEFAULT_TIMEOUT
+    while text.startswith("--"):
+        option, _, rest = text.partition(" ")
+        name, _, value = option[2:].partition("=")
+        if name == "session" and value:
+            session_name = value
+        elif name == "timeout":
+            try:
+                timeout = float(value)
+            except ValueError:
+                return f"[ERROR] Invalid --timeout value '{value}'. Use a number of seconds."
+        elif name == "list":
+            with _sessions_lock:
+                names = [f"{n} ({'running' if s.alive() else 'not started'})" for n, s in _sessions.items()]
+            return "[INFO] Shell sessions: " + (", ".join(names) if names else "none yet")
+        elif name == "close":
+            target = value or session_name
+            return (f"[SUCCESS] Closed shell session '{target}'." if close_session(target)
+                    else f"[ERROR] No shell session named '{target}'.")
+        else:
+            break  # not one of our options: part of the command itself
+        text = rest.strip()
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in "\"'":
+        # run_shell "ls -la" (quoted like run_powershell) means the command inside the quotes
+        try:
+            parts = shlex.split(text)
+        except ValueError:
+            parts = []
+        if len(parts) == 1:
+            text = parts[0]
+    if not text:
+        return "[ERROR] No command provided to run_shell. Usage: run_shell [--session=NAME] [--timeout=SECONDS] <command>"
+
+    try:
+        session = get_session(session_name)
+        exit_code, output, note = session.run(text, timeout=timeout, echo=echo)
+    except FileNotFoundError as e:
+        return f"[SHELL ERROR] {e}"
+    except Exception as e:
+        return f"[SHELL ERROR] Failed to execute command: {e}"
+
+    output = output.rstrip("\n")
+    if exit_code is None:
+        return f"[SHELL ERROR] {note}\n{output}".rstrip()
+    if note:
+        output = f"{output}\n[INFO] {note}".strip()
+    if exit_code != 0:
+        return f"[SHELL ERROR] Exit code: {exit_code}\n{output}".rstrip()
+    return output if output else "[INFO] Shell command ran with no output."
+
+
+if __name__ == "__main__":
+    # python shell_session.py: a tiny REPL over one persistent session, for trying it out
+    sys.stdout.reconfigure(encoding='utf-8')
+    print(f"Shell: {' '.join(default_shell())} (empty line to quit)")
+    while True:
+        try:
+            line = input("run_shell> ")
+        except EOFError:
+            break
+        if not line.strip():
+            break
+        print(run_shell(line))
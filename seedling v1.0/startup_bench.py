@@ -0,0 +1,57 @@
+# MIT License - Copyright (c) 2025 Viktor Kirschner
+"""
+Start-up benchmark: how long does it take from launching `python cli_tool.py` until the
+"You:" prompt is on screen? Runs cli_tool.py --startup-bench several times in a scratch
+workspace and reports the wall-clock time (including interpreter start-up) and the time
+measured inside the process.
+
+Usage: python startup_bench.py [runs]
+"""
+import os
+import re
+import sys
+import time
+import shutil
+import tempfile
+import statistics
+import subprocess
+from pathlib import Path
+
+SOURCE_DIR = Path(__file__).parent.resolve()
+
+
+def run_once(workspace: str, env: dict):
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, str(SOURCE_DIR / "cli_tool.py"), "--startup-bench"],
+        cwd=workspace, env=env, capture_output=True, text=True, encoding='utf-8', timeout=120
+    )
+    wall = time.perf_counter() - started
+    match = re.search(r"\[STARTUP\] Prompt ready after ([0-9.]+) s", result.stdout)
+    if not match:
+        raise RuntimeError(f"cli_tool.py did not reach the prompt:\n{result.stdout}\n{result.stderr}")
+    return wall, float(match.group(1))
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    env = dict(os.environ, PYTHONIOENCODING="utf-8", SEEDLING_FAST_START="1")
+    # The key is only verified in the background, so a placeholder is enough to reach the prompt
+    env.setdefault("MOONSHOT_API_KEY", "startup-bench-placeholder")
+
+    workspace = tempfile.mkdtemp(prefix="seedling_startup_")
+    try:
+        shutil.copy2(SOURCE_DIR / "priming_prompt.txt", workspace)
+        samples = [run_once(workspace, env) for _ in range(runs)]
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    walls = [s[0] for s in samples]
+    inner = [s[1] for s in samples]
+    print(f"Start-up to prompt over {runs} runs:")
+    print(f"  process start -> prompt : median {statistics.median(walls):.3f} s   min {min(walls):.3f} s   max {max(walls):.3f} s")
+    print(f"  cli_tool import -> prompt: median {statistics.median(inner):.3f} s   min {min(inner):.3f} s   max {max(inner):.3f} s")
+
+
+if __name__ == "__main__":
+    main()
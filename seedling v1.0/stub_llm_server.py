@@ -0,0 +1,180 @@
+# MIT License - Copyright (c) 2025 Viktor Kirschner
+"""
+Local stand-in for the Moonshot/OpenAI API.
+
+Serves /v1/models and /v1/chat/completions (plain and streamed) and answers with
+scripted responses, one per request, in order. Latency is configurable, so the agent
+loop can be measured without depending on a real model.
+
+Point Seedling at it with:
+    set MOONSHOT_BASE_URL=http://127.0.0.1:8765/v1      (GPT-5 connector: OPENAI_BASE_URL)
+
+Usage: python stub_llm_server.py <script.json> [--port=8765] [--latency=0.0] [--chunk-delay=0.0] [--chunk-size=16]
+
+The script is a JSON list of response strings, or an object with a "responses" list.
+When the script runs out, every further request gets FALLBACK_RESPONSE.
+"""
+import sys
+import json
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+FALLBACK_RESPONSE = '[CMD_START]task_complete "The stub server ran out of scripted responses."[CMD_END]'
+
+
+def _estimate_tokens(text: str) -> int:
+    return len(text.encode('utf-8')) // 4 + 1
+
+
+class ScriptedResponses:
+    """Thread-safe queue of canned replies."""
+
+    def __init__(self, responses=None):
+        self._lock = threading.Lock()
+        self._responses = list(responses or [])
+        self.served = 0
+
+    def load(self, responses):
+        with self._lock:
+            self._responses = list(responses)
+            self.served = 0
+
+    def next(self) -> str:
+        with self._lock:
+            self.served += 1
+            if self._responses:
+                return self._responses.pop(0)
+            return FALLBACK_RESPONSE
+
+
+class StubLLMServer:
+    """An OpenAI-compatible HTTP server on a background thread."""
+
+    def __init__(self, responses=None, port: int = 0, latency: float = 0.0,
+                 chunk_delay: float = 0.0, chunk_size: int = 16):
+        self.script = ScriptedResponses(responses)
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.chunk_size = max(1, chunk_size)
+        self.requests = []  # (message count, prompt token estimate) per chat request
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="stub-llm", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass  # keep the console quiet
+
+            def _send_json(self, payload, status=200):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    self._send_json({"object": "list", "data": [
+                        {"id": "seedling-stub", "object": "model", "created": 0, "owned_by": "stub"}
+                    ]})
+                else:
+                    self._send_json({"error": {"message": f"Unknown path {self.path}"}}, 404)
+
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json({"error": {"message": f"Unknown path {self.path}"}}, 404)
+                    return
+                length = int(self.headers.get("Content-Length", "0"))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                messages = request.get("messages", [])
+                prompt_tokens = sum(_estimate_tokens(str(m.get("content", ""))) for m in messages)
+                server.requests.append((len(messages), prompt_tokens))
+
+                text = server.script.next()
+                model = request.get("model", "seedling-stub")
+                created = int(time.time())
+                usage = {"prompt_tokens": prompt_tokens, "completion_tokens": _estimate_tokens(text),
+                         "total_tokens": prompt_tokens + _estimate_tokens(text)}
+                time.sleep(server.latency)
+
+                if not request.get("stream"):
+                    self._send_json({
+                        "id": f"stub-{created}", "object": "chat.completion", "created": created, "model": model,
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                        "usage": usage,
+                    })
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+                try:
+                    for i in range(0, len(text), server.chunk_size):
+                        chunk = {
+                            "id": f"stub-{created}", "object": "chat.completion.chunk", "created": created, "model": model,
+                            "choices": [{"index": 0, "delta": {"content": text[i:i + server.chunk_size]}, "finish_reason": None}],
+                        }
+                        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+                        self.wfile.flush()
+                        if server.chunk_delay:
+                            time.sleep(server.chunk_delay)
+                    final = {
+                        "id": f"stub-{created}", "object": "chat.completion.chunk", "created": created, "model": model,
+                        "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": usage,
+                    }
+                    self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode('utf-8'))
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client cut the stream off at [CMD_END]
+
+        return Handler
+
+
+def load_script(path: str) -> list:
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data["responses"] if isinstance(data, dict) else data
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        return
+    options = dict(arg[2:].split("=", 1) for arg in sys.argv[2:] if arg.startswith("--") and "=" in arg)
+    server = StubLLMServer(
+        load_script(sys.argv[1]),
+        port=int(options.get("port", 8765)),
+        latency=float(options.get("latency", 0.0)),
+        chunk_delay=float(options.get("chunk-delay", 0.0)),
+        chunk_size=int(options.get("chunk-size", 16)),
+    ).start()
+    print(f"[INFO] Stub LLM server listening on {server.base_url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# MIT License - Copyright (c) 2025 Viktor Kirschner
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "handlers"))
+import apply_patch
+
+SOURCE = """def load_users(path):
+    with open(path) as f:
+        rows = f.readlines()
+    return [row.strip() for row in rows]
+
+
+def save_users(path, users):
+    with open(path, 'w') as f:
+        f.write("\\n".join(users))
+
+
+def strip_rows(rows):
+    return [row.strip() for row in rows]
+"""
+
+
+class ApplyPatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.old_cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        Path("users.py").write_text(SOURCE, encoding='utf-8')
+
+    def tearDown(self):
+        os.chdir(self.old_cwd)
+        self.tmp.cleanup()
+
+    def patch(self, text: str) -> str:
+        return apply_patch.run(f"--patch={text}", "--file=users.py")
+
+    def test_near_miss_leaves_file_unchanged(self):
+        # load_items does not exist; load_users is very similar but must not be rewritten
+        result = self.patch("<<<<<<< SEARCH\n"
+                            "def load_items(path):\n"
+                            "    with open(path) as f:\n"
+                            "        rows = f.readlines()\n"
+                            "    return [row.strip() for row in rows]\n"
+                            "=======\n"
+                            "def load_items(path):\n"
+                            "    return []\n"
+                            ">>>>>>> REPLACE\n")
+        self.assertTrue(result.startswith("[ERROR]"), result)
+        self.assertIn("No files were changed", result)
+        self.assertIn("Closest match is lines 1-4", result)
+        self.assertEqual(Path("users.py").read_text(encoding='utf-8'), SOURCE)
+
+    def test_indentation_only_difference_is_applied(self):
+        result = self.patch("<<<<<<< SEARCH\n"
+                            "  with open(path) as f:\n"
+                            "      rows = f.readlines()\n"
+                            "=======\n"
+                            "  with open(path, encoding='utf-8') as f:\n"
+                            "      rows = f.readlines()\n"
+                            ">>>>>>> REPLACE\n")
+        self.assertTrue(result.startswith("[SUCCESS]"), result)
+        self.assertIn("ignoring indentation", result)
+        self.assertIn("    with open(path, encoding='utf-8') as f:\n        rows = f.readlines()\n",
+                      Path("users.py").read_text(encoding='utf-8'))
+
+    def test_ambiguous_indentation_only_match_is_refused(self):
+        # Both return lines match once the indentation is ignored: neither is patched
+        result = self.patch("@@ -4,1 +4,1 @@\n"
+                            "-  return [row.strip() for row in rows]\n"
+                            "+  return [row.rstrip() for row in rows]\n")
+        self.assertTrue(result.startswith("[ERROR]"), result)
+        self.assertEqual(Path("users.py").read_text(encoding='utf-8'), SOURCE)
+
+    def test_wrong_hunk_counts_keep_every_line(self):
+        # The header claims 2 lines each way; the body adds three. None may be dropped.
+        result = self.patch("@@ -1,2 +1,2 @@\n"
+                            " def load_users(path):\n"
+                            "-    with open(path) as f:\n"
+                            "+    with open(path, encoding='utf-8') as f:\n"
+                            "+        # one row per user\n"
+                            "+        pass\n"
+                            "         rows = f.readlines()\n")
+        self.assertTrue(result.startswith("[SUCCESS]"), result)
+        self.assertTrue(Path("users.py").read_text(encoding='utf-8').startswith(
+            "def load_users(path):\n"
+            "    with open(path, encoding='utf-8') as f:\n"
+            "        # one row per user\n"
+            "        pass\n"
+            "        rows = f.readlines()\n"))
+
+    def test_hunk_runs_until_the_next_header(self):
+        hunks = apply_patch.parse_unified_diff("@@ -1,2 +1,2 @@\n a\n-b\n+B1\n+B2\n+B3\n c\n"
+                                               "@@ -9,1 +9,1 @@\n-x\n+y\n", "f.txt")
+        self.assertEqual([(h.old_lines, h.new_lines, h.hint) for h in hunks],
+                         [(["a", "b", "c"], ["a", "B1", "B2", "B3", "c"], 1), (["x"], ["y"], 9)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+# MIT License - Copyright (c) 2025 Viktor Kirschner
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+SEEDLING_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SEEDLING_DIR))
+import cli_tool
+
+
+class DiffModeTest(unittest.TestCase):
+    """modify_file_diff_begin: the reply is a diff against one file."""
+
+    def setUp(self):
+        self.old_cwd, self.old_handlers = os.getcwd(), cli_tool.HANDLERS_DIR
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        cli_tool.HANDLERS_DIR = str(SEEDLING_DIR / "handlers")
+        Path("notes.txt").write_text("a\nb\nc\nd\n", encoding='utf-8')
+
+    def tearDown(self):
+        cli_tool.HANDLERS_DIR = self.old_handlers
+        os.chdir(self.old_cwd)
+        self.tmp.cleanup()
+
+    def test_wrong_hunk_count_applies_the_whole_hunk(self):
+        result = cli_tool.apply_diff_to_file("notes.txt", "@@ -1,2 +1,2 @@\n a\n-b\n+B1\n+B2\n+B3\n c\n")
+        self.assertTrue(result.startswith("[SUCCESS]"), result)
+        self.assertEqual(Path("notes.txt").read_text(encoding='utf-8'), "a\nB1\nB2\nB3\nc\nd\n")
+
+    def test_unmatched_hunk_changes_nothing(self):
+        result = cli_tool.apply_diff_to_file("notes.txt", "@@ -1,2 +1,2 @@\n a\n-x\n+X\n c\n")
+        self.assertTrue(result.startswith("[ERROR]"), result)
+        self.assertIn("The file was not changed", result)
+        self.assertEqual(Path("notes.txt").read_text(encoding='utf-8'), "a\nb\nc\nd\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,306 @@
+# MIT License - Copyright (c) 2025 Viktor Kirschner
+"""
+Content-addressed tool library shared by every Seedling workspace on the machine.
+
+publish_tool <name> stores handlers/<name>.py and its .md file under the SHA-256 of their
+content (~/.seedling/tools/objects/<hash>/, or SEEDLING_TOOL_LIBRARY). An identical tool
+is stored only once, however many workspaces publish it. index.json lists every published
+version with the summary and usage line from tool_registry, and search_tools finds tools
+by name and description, so an agent can reuse a tool another Seedling already built.
+
+install_tool <name> puts a version into handlers/ as a hard link to the stored files.
+SEEDLING_TOOL_LINK picks the method: hardlink (default), reflink or copy. Whichever method
+is chosen, the next one is tried when it is not available (for example, when the library
+is on another file system).
+
+On POSIX the stored files are read-only, so writing through a link fails instead of
+changing the library. cli_tool calls detach() before it writes a file, which replaces the
+link with a private copy; the editing handlers write a temporary file and rename it over
+the link, which has the same effect.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import contextlib
+
+import tool_registry
+from memory_store import tokenize
+
+LIBRARY_DIR = os.getenv("SEEDLING_TOOL_LIBRARY", os.path.join(os.path.expanduser("~"), ".seedling", "tools"))
+LINK_MODE = os.getenv("SEEDLING_TOOL_LINK", "hardlink")
+INDEX_VERSION = 1
+SEARCH_RESULTS = 10
+# A lock older than this is left over from a crashed process
+STALE_LOCK_SECONDS = 30
+FICLONE = 0x40049409  # Linux ioctl: share the data blocks of another file (btrfs, XFS)
+
+
+def _index_file() -> str:
+    return os.path.join(LIBRARY_DIR, "index.json")
+
+
+def object_dir(digest: str) -> str:
+    return os.path.join(LIBRARY_DIR, "objects", digest[:2], digest)
+
+
+def _digest(name: str, code: bytes, doc: bytes) -> str:
+    sha = hashlib.sha256()
+    for part in (name.encode('utf-8'), code, doc):
+        sha.update(len(part).to_bytes(8, 'big'))
+        sha.update(part)
+    return sha.hexdigest()
+
+
+def _read_bytes(path: str) -> bytes:
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return b""
+
+
+@contextlib.contextmanager
+def _locked():
+    """Serializes index updates between Seedlings; works on every platform."""
+    os.makedirs(LIBRARY_DIR, exist_ok=True)
+    lock_path = os.path.join(LIBRARY_DIR, "index.lock")
+    deadline = time.monotonic() + STALE_LOCK_SECONDS
+    while True:
+        try:
+            os.close(os.open(lock_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL))
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > STALE_LOCK_SECONDS or time.monotonic() > deadline:
+                    os.remove(lock_path)
+                    continue
+            except OSError:
+                continue
+            time.sleep(0.02)
+    try:
+        yield
+    finally:
+        try:
+            os.remove(lock_path)
+        except OSError:
+            pass
+
+
+def load_index() -> dict:
+    try:
+        with open(_index_file(), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if index.get("version") == INDEX_VERSION:
+            return index
+    except (OSError, ValueError):
+        pass
+    return {"version": INDEX_VERSION, "tools": {}}
+
+
+def _save_index(index: dict):
+    tmp_path = f"{_index_file()}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, _index_file())
+
+
+# --- Linking ---
+
+def _reflink(source: str, target: str):
+    if not sys.platform.startswith("linux"):
+        raise OSError("reflinks are only supported on Linux")
+    import fcntl
+    try:
+        with open(source, 'rb') as src, open(target, 'wb') as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    except OSError:
+        with contextlib.suppress(OSError):
+            os.remove(target)
+        raise
+
+
+def link_file(source: str, target: str, mode: str = None) -> str:
+    """Materializes source at target (replacing it) and returns the method that worked."""
+    methods = ["hardlink", "reflink", "copy"]
+    mode = mode or LINK_MODE
+    methods = methods[methods.index(mode):] if mode in methods else methods
+    tmp_path = f"{target}.{os.getpid()}.tmp"
+    for method in methods:
+        try:
+            if method == "hardlink":
+                os.link(source, tmp_path)
+            elif method == "reflink":
+                _reflink(source, tmp_path)
+                os.chmod(tmp_path, 0o644)
+            else:
+                shutil.copyfile(source, tmp_path)
+            os.replace(tmp_path, target)
+            return method
+        except OSError:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            if method == "copy":
+                raise
+    raise OSError(f"cannot create {target}")
+
+
+def detach(path) -> bool:
+    """If path is a hard link (e.g. to the tool library), replaces it with a private, writable copy."""
+    try:
+        if os.stat(path).st_nlink < 2:
+            return False
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        shutil.copyfile(path, tmp_path)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+        return True
+    except OSError:
+        return False
+
+
+# --- Commands ---
+
+def publish(name: str, handlers_dir: str = "handlers", note: str = "") -> str:
+    """Stores handlers/<name>.py (+ .md) in the library and indexes it."""
+    py_path = os.path.join(handlers_dir, f"{name}.py")
+    md_path = os.path.join(handlers_dir, f"{name}.md")
+    code, doc = _read_bytes(py_path), _read_bytes(md_path)
+    if not code:
+        return f"[ERROR] No tool '{name}' in {handlers_dir}/ (or {name}.py is empty)."
+    digest = _digest(name, code, doc)
+    entry = tool_registry.describe_source(name, py_path, md_path)
+    if entry["error"]:
+        return f"[ERROR] {name}.py {entry['error']}. Fix it before publishing."
+
+    target_dir = object_dir(digest)
+    try:
+        if not os.path.isdir(target_dir):
+            tmp_dir = f"{target_dir}.{os.getpid()}.tmp"
+            os.makedirs(tmp_dir, exist_ok=True)
+            for file_name, data in (("tool.py", code), ("tool.md", doc)):
+                if file_name == "tool.md" and not data:
+                    continue
+                file_path = os.path.join(tmp_dir, file_name)
+                with open(file_path, 'wb') as f:
+                    f.write(data)
+                if os.name != 'nt':
+                    os.chmod(file_path, 0o444)  # read-only: links into workspaces cannot change it
+            try:
+                os.rename(tmp_dir, target_dir)
+            except OSError:
+                shutil.rmtree(tmp_dir, ignore_errors=True)  # published concurrently by another Seedling
+        with _locked():
+            index = load_index()
+            versions = index["tools"].setdefault(name, [])
+            if any(v["hash"] == digest for v in versions):
+                return f"[INFO] '{name}' version {digest[:12]} is already in the tool library."
+            versions.append({"hash": digest, "summary": entry["summary"], "usage": entry["usage"],
+                             "has_doc": bool(doc), "note": note, "published": time.strftime('%Y-%m-%d %H:%M:%S'),
+                             "source": os.path.abspath(handlers_dir)})
+            _save_index(index)
+    except OSError as e:
+        return f"[ERROR] Could not publish '{name}' to {LIBRARY_DIR}: {e}"
+    return f"[SUCCESS] Published '{name}' as version {digest[:12]} (version {len(versions)} in the tool library)."
+
+
+def _find_version(spec: str):
+    """(name, version entry) for 'name' (newest version) or 'name@hashprefix'; raises KeyError."""
+    name, _, prefix = spec.partition("@")
+    versions = load_index()["tools"].get(name) or []
+    matches = [v for v in versions if v["hash"].startswith(prefix)] if prefix else versions[-1:]
+    if not matches:
+        raise KeyError(f"No version '{prefix}' of '{name}'." if prefix and versions else f"No tool '{name}' in the tool library.")
+    if len(matches) > 1:
+        raise KeyError(f"'{prefix}' matches {len(matches)} versions of '{name}'. Give more of the hash.")
+    return name, matches[0]
+
+
+def install(spec: str, handlers_dir: str = "handlers", force: bool = False) -> str:
+    """Links a library version of a tool into handlers/."""
+    try:
+        name, version = _find_version(spec)
+    except KeyError as e:
+        return f"[ERROR] {e.args[0]} search_tools lists the published tools."
+    source_dir = object_dir(version["hash"])
+    sources = {".py": os.path.join(source_dir, "tool.py")}
+    if version.get("has_doc"):
+        sources[".md"] = os.path.join(source_dir, "tool.md")
+    code, doc = _read_bytes(sources[".py"]), _read_bytes(sources.get(".md", ""))
+    if _digest(name, code, doc) != version["hash"]:
+        return f"[ERROR] The stored copy of '{name}' ({version['hash'][:12]}) is damaged. Publish it again from a good copy."
+
+    py_target = os.path.join(handlers_dir, f"{name}.py")
+    current = _read_bytes(py_target)
+    if current and current != code and not force:
+        return (f"[ERROR] {py_target} already exists and differs from version {version['hash'][:12]}. "
+                f"Use install_tool {spec} --force to replace it.")
+    os.makedirs(handlers_dir, exist_ok=True)
+    try:
+        methods = {link_file(source, os.path.join(handlers_dir, name + suffix)) for suffix, source in sources.items()}
+    except OSError as e:
+        return f"[ERROR] Could not install '{name}': {e}"
+    return (f"[SUCCESS] Installed '{name}' version {version['hash'][:12]} into {handlers_dir}/ "
+            f"({', '.join(sorted(methods))}). Usage: {version['usage']}")
+
+
+def search(query: str = "") -> str:
+    """Published tools matching the words of query (all tools if it is empty), best first."""
+    tools = load_index()["tools"]
+    if not tools:
+        return f"[INFO] The tool library ({LIBRARY_DIR}) is empty. Share a tool with publish_tool <name>."
+    words = set(tokenize(query))
+    ranked = []
+    for name, versions in tools.items():
+        latest = versions[-1]
+        if words:
+            name_tokens = set(tokenize(name))
+            text_tokens = tokenize(" ".join((latest["summary"], latest["usage"], latest.get("note", ""))))
+            score = sum(3 for w in words if w in name_tokens) + sum(1 for t in text_tokens if t in words)
+            if not score:
+                continue
+        else:
+            score = 0
+        ranked.append((-score, name, latest, len(versions)))
+    if not ranked:
+        return f"[INFO] No published tool matches '{query}'."
+    ranked.sort()
+    lines = [f"[INFO] {len(ranked)} tool(s) in the library{' match' if words else ''}"
+             + (f"; the best {SEARCH_RESULTS}:" if len(ranked) > SEARCH_RESULTS else ":")]
+    for _, name, latest, count in ranked[:SEARCH_RESULTS]:
+        lines.append(f"- {latest['usage']} : {latest['summary']} (version {latest['hash'][:12]}"
+                     f"{f', {count} versions' if count > 1 else ''}; install_tool {name})")
+    return "\n".join(lines)
+
+
+def publish_tool(args: list, handlers_dir: str = "handlers") -> str:
+    """The publish_tool command. Usage: publish_tool <name> [--note=<text>]"""
+    names = [a for a in args if not a.startswith("--")]
+    note = next((a.partition("=")[2] for a in args if a.startswith("--note=")), "")
+    if len(names) != 1:
+        return "[ERROR] Usage: publish_tool <name> [--note=<text>]"
+    return publish(names[0], handlers_dir, note)
+
+
+def install_tool(args: list, handlers_dir: str = "handlers") -> str:
+    """The install_tool command. Usage: install_tool <name>[@version] [--force]"""
+    names = [a for a in args if not a.startswith("--")]
+    if len(names) != 1:
+        return "[ERROR] Usage: install_tool <name>[@version] [--force]"
+    return install(names[0], handlers_dir, force="--force" in args)
+
+
+def search_tools(args: list) -> str:
+    """The search_tools command. Usage: search_tools [words]"""
+    return search(" ".join(args))
+
+
+if __name__ == "__main__":
+    # python tool_library.py search|publish|install ...: manage the library by hand
+    commands = {"search": search_tools, "publish": publish_tool, "install": install_tool}
+    if len(sys.argv) < 2 or sys.argv[1] not in commands:
+        print("Usage: python tool_library.py search [words] | publish <name> [--note=<text>] | install <name>[@version] [--force]")
+        sys.exit(1)
+    print(commands[sys.argv[1]](sys.argv[2:]))
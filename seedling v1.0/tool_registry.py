@@ -0,0 +1,199 @@
+# MIT License - Copyright (c) 2025 Viktor Kirschner
+"""
+Tool registry generated from the handlers/ directory.
+
+For every handlers/<name>.py the registry records the module docstring, the run()
+signature and docstring, the "Usage:" line and the sibling <name>.md file, if there is
+one. The handlers are parsed with ast, never imported. Results are cached in a manifest
+(.seedling_cache/tool_manifest.json) keyed on each file's mtime and size, so only new or
+changed tools are parsed again.
+
+The system prompt carries only index_text(): one line per tool with its usage and a
+one-line summary. The full documentation is fetched on demand with describe_tool <name>.
+"""
+import os
+import ast
+import json
+import difflib
+
+MANIFEST_FILE = os.path.join(".seedling_cache", "tool_manifest.json")
+MANIFEST_VERSION = 1
+# Placeholder in priming_prompt.txt that is replaced by the generated index
+INDEX_MARKER = "{{TOOL_INDEX}}"
+# Longest summary kept in the index
+SUMMARY_CHARS = 120
+
+_manifest = None  # in-memory copy of the manifest file
+
+
+def _stamp(path: str):
+    try:
+        st = os.stat(path)
+        return [st.st_mtime_ns, st.st_size]
+    except OSError:
+        return None
+
+
+def _first_sentence(text: str) -> str:
+    """The first sentence of the first paragraph, skipping headings and Usage lines."""
+    paragraph = []
+    for line in (text or "").splitlines():
+        line = line.strip()
+        if line.startswith("#") or line.lower().startswith(("usage:", "mit license")):
+            if paragraph:
+                break
+            continue
+        if not line:
+            if paragraph:
+                break
+            continue
+        paragraph.append(line)
+    summary = " ".join(paragraph)
+    end = summary.find(". ")
+    if end != -1:
+        summary = summary[:end + 1]
+    return summary if len(summary) <= SUMMARY_CHARS else summary[:SUMMARY_CHARS - 3].rstrip() + "..."
+
+
+def _usage_line(*texts) -> str:
+    for text in texts:
+        for line in (text or "").splitlines():
+            line = line.strip()
+            if line.lower().startswith("usage:"):
+                return line[len("usage:"):].strip()
+    return ""
+
+
+def _usage_from_signature(name: str, func: ast.FunctionDef) -> str:
+    params = [f"<{a.arg}>" for a in func.args.posonlyargs + func.args.args]
+    if func.args.vararg:
+        params.append(f"[{func.args.vararg.arg}...]")
+    return " ".join([name] + params)
+
+
+def _signature(func: ast.FunctionDef) -> str:
+    args = func.args
+    params = [a.arg for a in args.posonlyargs + args.args]
+    if args.vararg:
+        params.append(f"*{args.vararg.arg}")
+    params += [a.arg for a in args.kwonlyargs]
+    if args.kwarg:
+        params.append(f"**{args.kwarg.arg}")
+    return f"run({', '.join(params)})"
+
+
+def describe_source(name: str, py_path: str, md_path: str) -> dict:
+    """Parses one handler (and its .md file) into a manifest entry."""
+    entry = {"py": _stamp(py_path), "md": _stamp(md_path), "module_doc": "", "run_doc": "",
+             "signature": "", "usage": name, "md_text": "", "error": ""}
+    try:
+        with open(py_path, 'r', encoding='utf-8') as f:
+            tree = ast.parse(f.read())
+        entry["module_doc"] = ast.get_docstring(tree) or ""
+        run_func = next((n for n in tree.body if isinstance(n, ast.FunctionDef) and n.name == "run"), None)
+        if run_func:
+            entry["run_doc"] = ast.get_docstring(run_func) or ""
+            entry["signature"] = _signature(run_func)
+            entry["usage"] = _usage_from_signature(name, run_func)
+    except (OSError, SyntaxError, ValueError, UnicodeDecodeError) as e:
+        entry["error"] = f"cannot be parsed: {e}"
+    if entry["md"]:
+        try:
+            with open(md_path, 'r', encoding='utf-8') as f:
+                entry["md_text"] = f.read()
+        except (OSError, UnicodeDecodeError):
+            pass
+    entry["usage"] = _usage_line(entry["run_doc"], entry["module_doc"], entry["md_text"]) or entry["usage"]
+    entry["summary"] = (_first_sentence(entry["module_doc"]) or _first_sentence(entry["run_doc"])
+                        or _first_sentence(entry["md_text"]) or "(no description)")
+    return entry
+
+
+def _save(manifest: dict):
+    try:
+        os.makedirs(os.path.dirname(MANIFEST_FILE), exist_ok=True)
+        tmp_path = MANIFEST_FILE + f".{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(tmp_path, MANIFEST_FILE)
+    except OSError:
+        pass  # the registry still works, it is just rebuilt next time
+
+
+def load(handlers_dir: str = "handlers") -> dict:
+    """name -> manifest entry for every tool in handlers_dir, re-parsing only what changed."""
+    global _manifest
+    handlers_key = os.path.abspath(handlers_dir)
+    if _manifest is None:
+        try:
+            with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+                _manifest = json.load(f)
+        except (OSError, ValueError):
+            _manifest = {}
+    if _manifest.get("version") != MANIFEST_VERSION or _manifest.get("handlers_dir") != handlers_key:
+        _manifest = {"version": MANIFEST_VERSION, "handlers_dir": handlers_key, "tools": {}}
+
+    cached = _manifest["tools"]
+    tools = {}
+    changed = False
+    try:
+        with os.scandir(handlers_dir) as it:
+            names = sorted(e.name[:-3] for e in it if e.name.endswith(".py") and e.is_file() and not e.name.startswith("_"))
+    except OSError:
+        names = []
+    for name in names:
+        py_path = os.path.join(handlers_dir, f"{name}.py")
+        md_path = os.path.join(handlers_dir, f"{name}.md")
+        entry = cached.get(name)
+        if not entry or entry["py"] != _stamp(py_path) or entry["md"] != _stamp(md_path):
+            entry = describe_source(name, py_path, md_path)
+            changed = True
+        tools[name] = entry
+    if changed or set(tools) != set(cached):
+        _manifest["tools"] = tools
+        _save(_manifest)
+    return tools
+
+
+def index_text(handlers_dir: str = "handlers") -> str:
+    """The compact tool index for the system prompt: one line per tool."""
+    tools = load(handlers_dir)
+    if not tools:
+        return "(no tools yet)"
+    lines = []
+    for name, entry in tools.items():
+        note = f" [BROKEN: {entry['error']}]" if entry["error"] else ""
+        lines.append(f"- {entry['usage']} : {entry['summary']}{note}")
+    return "\n".join(lines)
+
+
+def render(prompt: str, handlers_dir: str = "handlers") -> str:
+    """Replaces INDEX_MARKER in the prompt with the current tool index."""
+    if INDEX_MARKER not in prompt:
+        return prompt
+    return prompt.replace(INDEX_MARKER, index_text(handlers_dir))
+
+
+def describe(name: str, handlers_dir: str = "handlers") -> str:
+    """Full documentation of one tool, for the describe_tool command."""
+    tools = load(handlers_dir)
+    name = name[:-3] if name.endswith(".py") else name
+    entry = tools.get(name)
+    if entry is None:
+        close = difflib.get_close_matches(name, list(tools), n=3)
+        hint = f" Did you mean: {', '.join(close)}?" if close else ""
+        return f"[ERROR] Unknown tool '{name}'.{hint} The tool index in your instructions lists every tool."
+
+    output = [f"--- Tool: {name} ---", f"Usage: {entry['usage']}"]
+    if entry["signature"]:
+        output.append(f"Signature: {entry['signature']}")
+    if entry["error"]:
+        output.append(f"[WARNING] handlers/{name}.py {entry['error']}.")
+    for doc in (entry["module_doc"], entry["run_doc"]):
+        if doc:
+            output.append("")
+            output.append(doc.strip())
+    if entry["md_text"]:
+        output.append(f"\n--- handlers/{name}.md ---")
+        output.append(entry["md_text"].strip())
+    return "\n".join(output)
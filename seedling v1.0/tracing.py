@@ -0,0 +1,172 @@
+# MIT License - Copyright (c) 2025 Viktor Kirschner
+"""
+Tracing spans for the agent loop, written as Chrome trace-event JSON.
+
+SEEDLING_TRACE=1 writes .seedling_cache/traces/<session>.trace.json (SEEDLING_TRACE=<path>
+picks the file). Open it in chrome://tracing, https://ui.perfetto.dev or speedscope to
+see, per autonomous step, how long prompt assembly, the model call, parsing, command
+execution, logging and memory summarization took. Commands run in parallel show up on
+their own threads.
+
+SEEDLING_PROFILE=1 also runs every handler under cProfile and saves one .prof file per
+call next to the trace (<session>.step<N>.<handler>.<n>.prof). Read them with pstats or
+snakeviz.
+
+Events are appended as they finish, so the trace of a crashed session can still be opened.
+Both flags are off by default, and then span() and wrap() cost nothing.
+"""
+import os
+import json
+import time
+import atexit
+import threading
+import functools
+import contextlib
+
+TRACE_SETTING = os.getenv("SEEDLING_TRACE", "0")
+ENABLED = TRACE_SETTING not in ("", "0")
+PROFILE_HANDLERS = os.getenv("SEEDLING_PROFILE", "0") not in ("", "0")
+TRACE_DIR = os.path.join(".seedling_cache", "traces")
+
+_NULL_SPAN = contextlib.nullcontext()
+
+
+class Tracer:
+    """Collects complete ("X") events and appends them to the trace file as they finish."""
+
+    def __init__(self, path: str = None):
+        self.session = time.strftime('%Y%m%d-%H%M%S') + f"-{os.getpid()}"
+        self.path = path or os.path.join(TRACE_DIR, f"{self.session}.trace.json")
+        self.step = 0
+        self._lock = threading.Lock()
+        self._file = None
+        self._origin = time.perf_counter()
+        self._named_threads = set()
+        self._step_started = None
+        self._profiles = 0
+
+    def _now_us(self) -> float:
+        return (time.perf_counter() - self._origin) * 1e6
+
+    def _write(self, event: dict):
+        tid = event.setdefault("tid", threading.get_ident())
+        event.setdefault("pid", os.getpid())
+        with self._lock:
+            try:
+                if self._file is None:
+                    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                    self._file = open(self.path, 'w', encoding='utf-8')
+                    # JSON array format: viewers accept the array without its closing bracket
+                    self._file.write("[\n")
+                    self._file.write(json.dumps({"name": "process_name", "ph": "M", "pid": event["pid"], "tid": tid,
+                                                 "args": {"name": f"seedling {self.session}"}}) + ",\n")
+                if tid not in self._named_threads:
+                    self._named_threads.add(tid)
+                    name = next((t.name for t in threading.enumerate() if t.ident == tid), str(tid))
+                    self._file.write(json.dumps({"name": "thread_name", "ph": "M", "pid": event["pid"], "tid": tid,
+                                                 "args": {"name": name}}) + ",\n")
+                self._file.write(json.dumps(event, ensure_ascii=False, default=str) + ",\n")
+                self._file.flush()
+            except OSError:
+                pass  # tracing must never break the agent
+
+    @contextlib.contextmanager
+    def span(self, name: str, category: str = "seedling", **args):
+        started = self._now_us()
+        try:
+            yield args  # callers may add details (e.g. the result size) while the span is open
+        finally:
+            self._write({"name": name, "cat": category, "ph": "X", "ts": round(started, 1),
+                         "dur": round(self._now_us() - started, 1), "args": args})
+
+    def begin_step(self, step: int):
+        """Closes the previous step's span and opens the next one."""
+        self.end_step()
+        self.step = step
+        self._step_started = self._now_us()
+
+    def end_step(self):
+        """Closes the open step span, e.g. before waiting for the user."""
+        if self._step_started is None:
+            return
+        started, self._step_started = self._step_started, None
+        self._write({"name": f"step {self.step}", "cat": "step", "ph": "X", "ts": round(started, 1),
+                     "dur": round(self._now_us() - started, 1), "args": {"step": self.step}})
+
+    def profile_path(self, handler_name: str) -> str:
+        """A fresh .prof path next to the trace for one handler call."""
+        with self._lock:
+            self._profiles += 1
+            number = self._profiles
+        base = os.path.splitext(self.path)[0]
+        if base.endswith(".trace"):
+            base = base[:-len(".trace")]
+        os.makedirs(os.path.dirname(base) or ".", exist_ok=True)
+        return os.path.abspath(f"{base}.step{self.step}.{handler_name}.{number}.prof")
+
+    def close(self):
+        self.end_step()
+        with self._lock:
+            if self._file is not None:
+                # The closing bracket makes the file strict JSON for tools that need it
+                self._file.write(json.dumps({"name": "trace_end", "ph": "i", "s": "g", "pid": os.getpid(),
+                                             "tid": threading.get_ident(), "ts": round(self._now_us(), 1)}) + "\n]\n")
+                self._file.close()
+                self._file = None
+
+
+_tracer = None
+
+
+def get_tracer() -> Tracer:
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer(None if TRACE_SETTING in ("1", "true", "yes") else TRACE_SETTING)
+        atexit.register(_tracer.close)
+    return _tracer
+
+
+def span(name: str, **args):
+    """Context manager timing one named span; a no-op while tracing is off."""
+    if not ENABLED:
+        return _NULL_SPAN
+    return get_tracer().span(name, **args)
+
+
+def wrap(fn, name: str = None, name_from_arg: bool = False):
+    """
+    Wraps fn so every call becomes a span. With name_from_arg the first word of the first
+    argument is appended to the name (execute_command -> "execute read_file").
+    """
+    if not ENABLED:
+        return fn
+    span_name = name or fn.__name__
+
+    @functools.wraps(fn)
+    def traced(*args, **kwargs):
+        label = span_name
+        if name_from_arg and args and isinstance(args[0], str):
+            label = f"{span_name} {(args[0].split(None, 1) or [''])[0]}"
+        with get_tracer().span(label):
+            return fn(*args, **kwargs)
+
+    return traced
+
+
+def begin_step(step: int):
+    if ENABLED:
+        get_tracer().begin_step(step)
+    elif PROFILE_HANDLERS:
+        get_tracer().step = step  # only used to name the .prof files
+
+
+def end_step():
+    if ENABLED:
+        get_tracer().end_step()
+
+
+def profile_path(handler_name: str):
+    """Where to save the cProfile stats of one handler call, or None when profiling is off."""
+    if not PROFILE_HANDLERS:
+        return None
+    return get_tracer().profile_path(handler_name)